@@ -1,15 +1,15 @@
 
-from typing import Annotated, Any, Dict, List, Tuple, TypedDict
+from typing import Annotated, Any, Dict, Iterator, List, Optional, Tuple, TypedDict
 import operator
 import os
 import sys
+import time
 from langchain_core.messages import AIMessage, HumanMessage
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langgraph.graph import Graph, MessageGraph
 from langgraph.prebuilt.tool_executor import ToolExecutor
 import json
 import logging
-from sentence_transformers import SentenceTransformer
 from pinecone import Pinecone
 from presidio_analyzer import AnalyzerEngine
 from presidio_anonymizer import AnonymizerEngine
@@ -18,12 +18,18 @@ parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 if parent_dir not in sys.path:
     sys.path.insert(0, parent_dir)
 from util.envutils import EnvUtils
+from util.embedding_backend import get_embedding_backend, validate_index_dimension
 from tools.agent_tools import AgentTools
 from tools.database_manager import DatabaseManager
 from model.fraud_detection import FraudDetectionAgent
-from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_pinecone import PineconeVectorStore
 from langchain.prompts import PromptTemplate
+from tools.document_retriever import DocumentRetriever, COMPLIANCE_SOURCES
+from tools.context_packs import ContextPackStore
+from util.llm_cache import get_llm_cache, response_key
+from tools.prompt_builder import COMPACT_TEMPLATE, CompactPromptBuilder, merge_analysis
+from tools.map_reduce_analysis import MapReduceAnalysis
+from tools.triage import CLEAR, TransactionTriage, TriageStats, clear_result
 
 # Set up logging
 logging.basicConfig(
@@ -41,31 +47,39 @@ class TransactionAnalyzer:
         self.env_utils = EnvUtils()
         self.model_type = self.env_utils.get_required_env("MODEL_TYPE").lower()
         logger.info(f"Initialized with model type: {self.model_type}")
+        self.llm_model = "mistral" if self.model_type == "ollama" else "gpt-4"
+        # single: one prompt with every transaction; map_reduce: parallel calls per fraud type group
+        self.analysis_mode = self.env_utils.get_env("ANALYSIS_MODE", "single").lower()
         self.api_key = self.env_utils.get_required_env("OPENAI_API_KEY")
-        self.model=SentenceTransformer("intfloat/multilingual-e5-large")
-        self.langchain_embeddings = HuggingFaceEmbeddings(model_name="intfloat/multilingual-e5-large")
+        self.model = get_embedding_backend()
+        self.langchain_embeddings = self.model
         self.index_name = self.env_utils.get_required_env("PINECONE_INDEX") 
         self.pinecone_api_key = self.env_utils.get_required_env("PINECONE_API_KEY")
         self.pc = Pinecone(api_key=self.pinecone_api_key)
         self.index = self.pc.Index(self.index_name)
+        validate_index_dimension(self.index, self.model)
         self.vectorstore = PineconeVectorStore(
             index=self.index,
             embedding=self.langchain_embeddings,
             text_key="text"
         )
+        self.retriever = DocumentRetriever(self.vectorstore)
+        self.context_packs = ContextPackStore()
+        self.triage = TransactionTriage()
+        self.triage_stats = TriageStats()
         
     def get_llm(self):
         """Get the appropriate LLM based on environment configuration"""
         if self.model_type == "ollama":
             from langchain_ollama import ChatOllama
             return ChatOllama(
-                model="mistral",
+                model=self.llm_model,
                 temperature=0
             )
         else:
             from langchain_openai import ChatOpenAI
             return ChatOpenAI(
-                model="gpt-4",
+                model=self.llm_model,
                 temperature=0
             )
 
@@ -101,57 +115,157 @@ class TransactionAnalyzer:
         except Exception as e:
             logger.error(f"Error in analyze_transaction: {str(e)}", exc_info=True)
             raise
-    def analyze_transaction(self, state: Dict) -> Dict:
+    def triage_transactions(self, state: Dict) -> Dict:
+        """Triage the customer to decide whether the LLM analysis is needed"""
+        logger.debug("Entering triage_transactions")
+        try:
+           started = time.perf_counter()
+           decision = self.triage.triage(state)
+           self.triage_stats.record_triage(decision["outcome"], time.perf_counter() - started)
+           logger.info(f"Triage outcome: {decision['outcome']} ({'; '.join(decision['reasons']) or 'no flags'})")
+           return {"transactions": state, "triage": decision}
+        except Exception as e:
+            logger.error(f"Error in triage_transactions: {str(e)}", exc_info=True)
+            raise
+
+    def route_triage(self, triaged: Dict) -> str:
+        return "resolve_clear" if triaged["triage"]["outcome"] == CLEAR else "retrieve_context"
+
+    def resolve_clear(self, triaged: Dict) -> str:
+        """Save the templated no-SAR result of a customer triage cleared"""
+        logger.debug("Entering resolve_clear")
+        try:
+           result = clear_result(triaged["transactions"], triaged["triage"])
+           db_manager = DatabaseManager()
+           db_manager.saveSARReport(result)
+           return json.dumps(result)
+        except Exception as e:
+            logger.error(f"Error in resolve_clear: {str(e)}", exc_info=True)
+            raise
+
+    def retrieve_context(self, triaged: Dict) -> Dict:
+        """Retrieve compliance context for the predicted fraud types"""
+        logger.debug("Entering retrieve_context")
+        try:
+           state = triaged["transactions"]
+           fraud_types=self.extract_predicted_fraud_types(state)
+           chunks_by_type = {fraud_type: self.get_document_chunks([fraud_type]) for fraud_type in fraud_types}
+           document_chunks = [chunk for chunks in chunks_by_type.values() for chunk in chunks]
+           return {"transactions": state, "document_chunks": document_chunks, "chunks_by_type": chunks_by_type}
+        except Exception as e:
+            logger.error(f"Error in retrieve_context: {str(e)}", exc_info=True)
+            raise
+
+    def prepare_analysis(self, context: Dict) -> Dict:
+        """Build the compact prompt input and look the prompt up in the LLM response cache"""
+        state = context["transactions"]
+        prompt = CompactPromptBuilder(self.llm_model).build(state, [str(chunk) for chunk in context["document_chunks"]])
+        logger.info(f"Analysis prompt: {prompt['prompt_tokens']} tokens, "
+                    f"{len(prompt['document_chunks'])} context chunks")
+        # The model runs at temperature 0, so an identical prompt can reuse the stored response
+        llm_cache = get_llm_cache()
+        cache_key = response_key(f"{self.model_type}:{self.llm_model}", COMPACT_TEMPLATE, state,
+                                 prompt["document_chunks"])
+        return {
+            "payload": state,
+            "eval_input": prompt["eval_input"],
+            "cache": llm_cache,
+            "cache_key": cache_key,
+            "cached": llm_cache.get(cache_key) if llm_cache else None
+        }
+
+    def get_analysis_chain(self):
+        analysis_prompt = PromptTemplate.from_template(COMPACT_TEMPLATE)
+        self.llm = self.get_llm()
+        return analysis_prompt | self.llm
+
+    def save_analysis(self, request: Dict, evaluation_response: str, latency_ms: float = 0.0) -> Dict:
+        """Merge the model's additions into the customer data, persist the SAR and cache the response"""
+        sar = merge_analysis(request["payload"], evaluation_response)
+        db_manager = DatabaseManager()
+        db_manager.saveSARReport(sar)
+        if not request["cached"]:
+            self.triage_stats.record_llm(latency_ms / 1000)
+            # Cache only responses that merged into a complete SAR
+            if request["cache"] and not sar.get("needs_review"):
+                request["cache"].put(request["cache_key"], self.llm_model, evaluation_response, latency_ms)
+        return sar
+
+    def map_reduce_analysis(self, context: Dict) -> Iterator[Dict]:
+        """
+        Analyze transaction groups in parallel LLM calls and reduce them to
+        the SAR decision, yielding group progress and reduce tokens; the SAR
+        is saved before the final ``complete`` event.
+        """
+        logger.debug("Entering map_reduce_analysis")
+        analysis = MapReduceAnalysis(self.get_llm, self.llm_model, f"{self.model_type}:{self.llm_model}",
+                                     get_llm_cache())
+        for event in analysis.iter_analysis(context["transactions"], context["chunks_by_type"]):
+            if event["event"] != "additions":
+                yield event
+                continue
+            logger.info(f"Map-reduce analysis: {json.dumps(event['stats'])}")
+            self.triage_stats.record_llm(event["stats"]["total_seconds"])
+            sar = merge_analysis(context["transactions"], event["data"])
+            db_manager = DatabaseManager()
+            db_manager.saveSARReport(sar)
+            yield {"event": "complete", "data": {"analysis": sar, "cached": False, "map_reduce": event["stats"]}}
+
+    def analyze_transaction(self, context: Dict) -> str:
         """Analyze the transaction data"""
         logger.debug("Entering analyze_transaction")
         try:
-           
+           if self.analysis_mode == "map_reduce":
+               events = list(self.map_reduce_analysis(context))
+               return json.dumps(events[-1]["data"]["analysis"])
            #state=self.redact_sensitive_data(state)
-           parsed_json = json.dumps(state, indent=3)
-           #print(parsed_json)
-           fraud_types=self.extract_predicted_fraud_types(state)
-           #print(fraud_types)
-           document_chunks=self.get_document_chunks(fraud_types)
-           #print(document_chunks)
-           analysis_prompt = PromptTemplate.from_template(
-                """Analyze the provided transactions based on the additional context retrieved from compliance documents.
-                
-                Transactions JSON:
-                {transaction_json}
-                
-                Retrieved Document Chunks:
-                {document_chunks}
-                
-                Instructions:
-                - Carefully review each transaction in the JSON.
-                - Provide an analysis for each transaction based only on the provided context.
-                - Ensure your response is in the same JSON format as the input, with an additional key "llm_analysis" added to each transaction containing your analysis.
-                - Provide overall analysis of all transactions.Attach the analysis to the JSON with key "overall_analysis".
-                - Provide final SAR Reporting required Yes/No. Attach the analysis to the JSON with key "final_sar_required".
-                - You MUST return all the transactions in the JSON
-                - You MUST return a well-formatted JSON response
-                - You MUST not change the JSON input provided, just append your analysis to same JSON
-                
-                
-                Begin your response with the updated JSON:
-                """
-    )
-           self.llm= self.get_llm()
-           evaluation_chain = analysis_prompt | self.llm
-           eval_input = {
-            "transaction_json": parsed_json,
-            "document_chunks": document_chunks
-          }
-           evaluation_result = evaluation_chain.invoke(eval_input)
-           evaluation_response = evaluation_result.content.strip()
-           db_manager = DatabaseManager()
-           db_manager.saveSARReport(evaluation_response)
+           request = self.prepare_analysis(context)
+           latency_ms = 0.0
+           if request["cached"]:
+               evaluation_response = request["cached"]["response"]
+               logger.info(f"LLM response cache hit, saved {request['cached']['saved_ms']:.0f} ms")
+           else:
+               evaluation_chain = self.get_analysis_chain()
+               started = time.perf_counter()
+               evaluation_result = evaluation_chain.invoke(request["eval_input"])
+               evaluation_response = evaluation_result.content.strip()
+               latency_ms = (time.perf_counter() - started) * 1000
+           sar = self.save_analysis(request, evaluation_response, latency_ms)
            print(f"LLM evaluation response: {evaluation_response}")
-           return evaluation_response
+           return json.dumps(sar)
         except Exception as e:
             logger.error(f"Error in analyze_transaction: {str(e)}", exc_info=True)
             raise
-    
+
+    def stream_analysis(self, context: Dict) -> Iterator[Dict]:
+        """
+        Stream the LLM response as ``token`` events and finish with a
+        ``complete`` event carrying the assembled SAR, which is persisted
+        once the stream has ended.
+        """
+        logger.debug("Entering stream_analysis")
+        if self.analysis_mode == "map_reduce":
+            yield from self.map_reduce_analysis(context)
+            return
+        request = self.prepare_analysis(context)
+        latency_ms = 0.0
+        if request["cached"]:
+            evaluation_response = request["cached"]["response"]
+            logger.info(f"LLM response cache hit, saved {request['cached']['saved_ms']:.0f} ms")
+            yield {"event": "token", "data": {"text": evaluation_response}}
+        else:
+            evaluation_chain = self.get_analysis_chain()
+            parts = []
+            started = time.perf_counter()
+            for chunk in evaluation_chain.stream(request["eval_input"]):
+                if chunk.content:
+                    parts.append(chunk.content)
+                    yield {"event": "token", "data": {"text": chunk.content}}
+            evaluation_response = "".join(parts).strip()
+            latency_ms = (time.perf_counter() - started) * 1000
+        sar = self.save_analysis(request, evaluation_response, latency_ms)
+        yield {"event": "complete", "data": {"analysis": sar, "cached": bool(request["cached"])}}
+
     def extract_predicted_fraud_types(self,transaction_json):
         predicted_fraud_types = set()  # Use a set to avoid duplicates
         for transaction in transaction_json["recentTransactions"]:
@@ -161,16 +275,14 @@ class TransactionAnalyzer:
         return list(predicted_fraud_types)
     def get_document_chunks(self,fraud_types):
         document_chunks = []
-        self.pc = Pinecone(api_key=self.pinecone_api_key)
         for fraud_type in fraud_types:
-            for source in ["AML & KYC Compliance Reports", 
-                       "Internal Fraud Investigation Playbook"
-                       ]:
-            
-                query_string = f"{source} on {fraud_type}"
-                retrieved_docs  = self.vectorstore.similarity_search(query_string, k=5)
-                for i, doc in enumerate(retrieved_docs, 1):
-                    document_chunks.append(doc.page_content)
+            for source in COMPLIANCE_SOURCES:
+                # Packs are built at ingestion time; search only if none was ever built
+                pack = self.context_packs.get(fraud_type, source)
+                if pack is None:
+                    logger.info(f"No context pack for {fraud_type} / {source}, searching")
+                    pack = self.retriever.retrieve(fraud_type, k=5, source=source)
+                document_chunks.extend(pack)
         return document_chunks
     
    
@@ -229,25 +341,60 @@ class TransactionAnalyzer:
         except Exception as e:
             logger.error(f"Error in redact_sensitive_data: {str(e)}", exc_info=True)
             return data  # Return original data if redaction fails
-    def create_workflow(self):
-        """Create the LangGraph workflow"""
+    def create_workflow(self, include_analysis: bool = True):
+        """Create the LangGraph workflow; without analysis it ends after retrieval or triage"""
         logger.debug("Creating workflow")
         try:
             workflow = Graph()
             
             workflow.add_node("get_transaction", self.get_transaction_details)
             workflow.add_node("predict_fraud", self.predict_fraud)
-            workflow.add_node("analyze", self.analyze_transaction)
+            workflow.add_node("triage", self.triage_transactions)
+            workflow.add_node("resolve_clear", self.resolve_clear)
+            workflow.add_node("retrieve_context", self.retrieve_context)
             workflow.add_edge("get_transaction", "predict_fraud")
-            workflow.add_edge("predict_fraud", "analyze")
+            workflow.add_edge("predict_fraud", "triage")
+            # Clear customers get the templated no-SAR result, the rest go on to retrieval and the LLM
+            workflow.add_conditional_edges("triage", self.route_triage,
+                                           {"resolve_clear": "resolve_clear", "retrieve_context": "retrieve_context"})
+            if include_analysis:
+                workflow.add_node("analyze", self.analyze_transaction)
+                workflow.add_edge("retrieve_context", "analyze")
             workflow.set_entry_point("get_transaction")
             return workflow.compile()
         except Exception as e:
             logger.error(f"Error in create_workflow: {str(e)}", exc_info=True)
             raise
 
-    def process_transaction(self, transaction_number: str) -> str:
-        """Process a transaction and return the final AI-generated message."""
+    @staticmethod
+    def parse_analysis(evaluation_response: str) -> Any:
+        """The SAR JSON produced by the LLM, or the raw text if it is not valid JSON"""
+        try:
+            return json.loads(evaluation_response)
+        except (TypeError, json.JSONDecodeError):
+            return evaluation_response
+
+    def progress_event(self, node: str, output: Any) -> Optional[Dict]:
+        """Summarize the output of a workflow node as a progress event"""
+        if node == "get_transaction":
+            details = json.loads(output)
+            if "error" in details:
+                raise ValueError(details["error"])
+            return {"event": "fetched", "data": {"transactions": len(details.get("recentTransactions", []))}}
+        if node == "predict_fraud":
+            counts: Dict[str, int] = {}
+            for transaction in output["recentTransactions"]:
+                fraud_type = transaction.get("predicted_fraud_type")
+                counts[fraud_type] = counts.get(fraud_type, 0) + 1
+            return {"event": "scored", "data": {"predicted_fraud_types": counts}}
+        if node == "triage":
+            return {"event": "triaged", "data": output["triage"]}
+        if node == "retrieve_context":
+            return {"event": "retrieved", "data": {"document_chunks": len(output["document_chunks"])}}
+        return None
+
+    def process_transaction(self, transaction_number: str) -> Any:
+        """Process a transaction and return the SAR analysis."""
         logger.info(f"Processing transaction: {transaction_number}")
         try:
             workflow = self.create_workflow()
@@ -260,15 +407,47 @@ class TransactionAnalyzer:
             #logger.info(f"All outputs: {all_outputs}")
 
             # Iterate through all_outputs to find the 'analyze' result
-            final_message = "Processed all Transactions"
-            #logger.info(f"Final AI-generated message: {final_message}")
-            
-            return final_message
+            evaluation_response = None
+            for output in all_outputs:
+                if "analyze" in output:
+                    evaluation_response = output["analyze"]
+                elif "resolve_clear" in output:
+                    evaluation_response = output["resolve_clear"]
+            return self.parse_analysis(evaluation_response)
             
         except Exception as e:
             logger.error(f"Error processing transaction: {str(e)}", exc_info=True)
             raise
 
+    def stream_transaction(self, transaction_number: str) -> Iterator[Dict]:
+        """
+        Run the workflow up to retrieval, yielding a progress event after
+        each node (fetched, scored, triaged, retrieved), then stream the
+        analysis. Customers triage cleared complete without the LLM.
+        """
+        logger.info(f"Streaming analysis of transaction: {transaction_number}")
+        try:
+            workflow = self.create_workflow(include_analysis=False)
+            state = {
+                "messages": [HumanMessage(content=transaction_number)],
+                "next": ""
+            }
+            context = None
+            for output in workflow.stream(state):
+                for node, value in output.items():
+                    event = self.progress_event(node, value)
+                    if event:
+                        yield event
+                    if node == "retrieve_context":
+                        context = value
+                    elif node == "resolve_clear":
+                        yield {"event": "complete", "data": {"analysis": json.loads(value), "cached": False}}
+            if context is not None:
+                yield from self.stream_analysis(context)
+        except Exception as e:
+            logger.error(f"Error streaming transaction: {str(e)}", exc_info=True)
+            raise
+
  
 def main():
     """Test function"""
@@ -1,4 +1,5 @@
 from fastapi import FastAPI, Query, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Optional
 import json
@@ -75,6 +76,39 @@ async def analyze_transaction(customer_id: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def format_sse(event: str, data) -> str:
+    """Encode one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+@app.get("/analyze-transaction/{customer_id}/stream")
+def stream_transaction_analysis(customer_id: str):
+    """
+    Server-sent events for the analysis of a customer: progress events
+    (fetched, scored, retrieved), the LLM output as token events and a
+    complete event with the SAR, which is saved when the stream ends.
+    """
+    def events():
+        try:
+            for event in analyzer.stream_transaction(customer_id):
+                yield format_sse(event["event"], event["data"])
+        except Exception as e:
+            yield format_sse("error", {"detail": str(e)})
+
+    # The generator is synchronous, so Starlette iterates it in a worker thread
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.get("/triage/stats")
+async def get_triage_stats():
+    """
+    Triage outcome counts and the LLM time saved by clearing customers
+    locally, since this API process started.
+    """
+    return analyzer.triage_stats.stats()
+
+
 @app.get("/reports/")
 async def get_reports():
     """
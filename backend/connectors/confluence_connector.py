@@ -1,16 +1,18 @@
 import os
 import requests
+import threading
+import concurrent.futures
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from langchain.schema import Document
 from bs4 import BeautifulSoup
-from typing import List, Optional
+from typing import Dict, Iterator, List, Optional
 from dotenv import load_dotenv
 from pinecone import Pinecone
-from sentence_transformers import SentenceTransformer
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_community.document_loaders import TextLoader
 from langchain_community.document_loaders.pdf import PyPDFLoader
 import sys
-from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_pinecone import PineconeVectorStore
 from langchain_community.vectorstores import Pinecone as LangchainPinecone
 from langchain.chains import LLMChain
@@ -21,29 +23,48 @@ parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 if parent_dir not in sys.path:
     sys.path.insert(0, parent_dir)
 from util.envutils import EnvUtils
+from util.embedding_backend import get_embedding_backend, validate_index_dimension
+from util.embedding_cache import encode_with_cache, get_embedding_cache
+from util.embedding_workers import get_embedding_encoder
 from connectors.data_connector_base import DataSourceConnector
+from util.document_classes import DocumentClassifier
+from tools.document_retriever import DocumentRetriever
+from tools.context_packs import ContextPackStore
+from connectors.ingestion_manifest import IngestionManifest, chunk_hash
+from connectors.vector_ids import document_id, vector_id, delete_in_batches, VectorChanges
+from connectors.vector_writer import VectorUpsertWriter
 class ConfluenceConnector(DataSourceConnector):
     """
     Connector for monitoring local file system folders.
     """
-    def __init__(self):
+    def __init__(self, index=None):
+        """
+        Args:
+            index: Pinecone compatible index to write to instead of the
+                configured Pinecone index, e.g. a fake index in tests.
+        """
         # Load environment variables
         self.env_utils = EnvUtils()
-        # Initialize Pinecone
-        self.pinecone_api_key = self.env_utils.get_required_env("PINECONE_API_KEY")
-        self.openai_api_key = self.env_utils.get_required_env("OPENAI_API_KEY")
-        self.index_name = self.env_utils.get_required_env("PINECONE_INDEX")
-        if not all([self.pinecone_api_key, self.index_name]):
-            raise ValueError("Missing required environment variables")
-        # Initialize embedding model
-        self.embedding_model = SentenceTransformer("intfloat/multilingual-e5-large")
-        self.langchain_embeddings = HuggingFaceEmbeddings(model_name="intfloat/multilingual-e5-large")
-        
-        # Initialize Pinecone
-        self.pc = Pinecone(api_key=self.pinecone_api_key)
-        
-        # Get or create index
-        self.index = self.pc.Index('ragindex')
+        # Initialize embedding model (shared per process, configured via EMBEDDING_* settings)
+        self.embedding_model = get_embedding_backend()
+        self.langchain_embeddings = self.embedding_model
+        # Chunk batches are encoded on EMBEDDING_WORKERS processes when configured
+        self.embedding_encoder = get_embedding_encoder(self.embedding_model)
+
+        if index is not None:
+            self.index = index
+        else:
+            # Initialize Pinecone
+            self.pinecone_api_key = self.env_utils.get_required_env("PINECONE_API_KEY")
+            self.openai_api_key = self.env_utils.get_required_env("OPENAI_API_KEY")
+            self.index_name = self.env_utils.get_required_env("PINECONE_INDEX")
+            if not all([self.pinecone_api_key, self.index_name]):
+                raise ValueError("Missing required environment variables")
+            self.pc = Pinecone(api_key=self.pinecone_api_key)
+
+            # Get or create index
+            self.index = self.pc.Index('ragindex')
+        validate_index_dimension(self.index, self.embedding_model)
         
         # Initialize text splitter
         self.text_splitter = RecursiveCharacterTextSplitter(
@@ -56,15 +77,145 @@ class ConfluenceConnector(DataSourceConnector):
             embedding=self.langchain_embeddings,
             text_key="text"
         )
+        self.classifier = DocumentClassifier()
+        self.retriever = DocumentRetriever(self.vectorstore, classifier=self.classifier)
+        self.context_packs = ContextPackStore()
+        # Per page vector id registry, keyed by the page identity confluence/<space>/<page id>
+        self.manifest = IngestionManifest()
+        self.delete_batch_size = int(self.env_utils.get_env("VECTOR_DELETE_BATCH_SIZE", 1000))
+        self.writer = VectorUpsertWriter(self.index)
+        # Space crawling: pages fetched and ingested concurrently, listed in pages of page_limit
+        self.concurrency = int(self.env_utils.get_env("CONFLUENCE_CONCURRENCY", 4))
+        self.page_limit = int(self.env_utils.get_env("CONFLUENCE_PAGE_LIMIT", 50))
+        self._session = None
+        self._session_lock = threading.Lock()
         
     def load_data(self, json_data: dict):
-                data_id = json_data['data_id']
+                data_id = json_data.get('data_id')
                 space = json_data['metadata']['space']
-                self.load_from_confluence(space,data_id)
+                if data_id:
+                    self.load_from_confluence(space,data_id)
+                else:
+                    # No page id: sync the whole space
+                    self.crawl_space(space)
                 #DocumentProcessor().process_document(message)
                # self.producer.send(self.kafka_topic, json.dumps(message).encode("utf-8"))
                 
 
+    def _get_session(self) -> requests.Session:
+        """
+        Shared HTTP session with a connection pool sized for the crawl
+        concurrency, and retries of throttled or failed requests.
+        """
+        with self._session_lock:
+            if self._session is None:
+                # Get Confluence credentials using EnvUtils
+                self.confluence_url = self.env_utils.get_required_env("CONFLUENCE_URL").rstrip("/")
+                username = self.env_utils.get_required_env("CONFLUENCE_USERNAME")
+                api_token = self.env_utils.get_required_env("CONFLUENCE_API_TOKEN")
+                session = requests.Session()
+                session.auth = (username, api_token)
+                retry = Retry(total=5, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504),
+                              allowed_methods=("GET",), respect_retry_after_header=True)
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(self.concurrency, 1), max_retries=retry)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._session = session
+            return self._session
+
+    def fetch_page(self, page_id: str) -> dict:
+        """Fetch a page with its storage body and version."""
+        session = self._get_session()
+        response = session.get(f"{self.confluence_url}/rest/api/content/{page_id}",
+                               params={"expand": "body.storage,version"}, timeout=30)
+        response.raise_for_status()
+        return response.json()
+
+    def list_space_pages(self, space_key: str) -> Iterator[dict]:
+        """
+        Enumerate the current pages of a space through the paginated content
+        API, yielding ``{'id', 'title', 'version'}`` without page bodies.
+        """
+        session = self._get_session()
+        start = 0
+        while True:
+            response = session.get(f"{self.confluence_url}/rest/api/content", params={
+                "spaceKey": space_key, "type": "page", "status": "current",
+                "expand": "version", "start": start, "limit": self.page_limit
+            }, timeout=30)
+            response.raise_for_status()
+            data = response.json()
+            results = data.get('results', [])
+            for page in results:
+                yield {'id': str(page['id']), 'title': page.get('title'),
+                       'version': page.get('version', {}).get('number', 0)}
+            if not results or not data.get('_links', {}).get('next'):
+                return
+            start += len(results)
+
+    def crawl_space(self, space_key: str) -> Dict[str, int]:
+        """
+        Sync a whole space: ingest pages that are new or whose version
+        changed since the last sync, and delete the vectors of pages that no
+        longer exist. Changed pages are fetched and ingested by
+        ``CONFLUENCE_CONCURRENCY`` threads.
+        """
+        print(f"Crawling Confluence space {space_key}")
+        prefix = f"confluence/{space_key}/"
+        synced = self.manifest.get_versions(prefix)
+        listed = list(self.list_space_pages(space_key))
+        changed = [page for page in listed if synced.get(prefix + page['id']) != page['version']]
+        summary = {"listed": len(listed), "changed": len(changed), "ingested": 0, "failed": 0,
+                   "vectors": 0, "removed": 0}
+
+        changes = VectorChanges()
+
+        def sync(page: dict) -> int:
+            return self.ingest_page(space_key, self.fetch_page(page['id']), changes)
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            futures = {executor.submit(sync, page): page for page in changed}
+            for future in concurrent.futures.as_completed(futures):
+                try:
+                    summary["vectors"] += future.result()
+                    summary["ingested"] += 1
+                except Exception as e:
+                    summary["failed"] += 1
+                    print(f"Error syncing Confluence page {futures[future]['id']}: {str(e)}")
+
+        listed_ids = {prefix + page['id'] for page in listed}
+        for identity in set(synced) - listed_ids:
+            summary["removed"] += self.remove_page(identity, changes)
+        self.schedule_context_packs(changes)
+        print(f"Confluence space {space_key} synced: {summary}")
+        cache = get_embedding_cache(self.embedding_model)
+        if cache is not None:
+            print(f"Embedding cache: {cache.stats()}")
+        return summary
+
+    def schedule_context_packs(self, changes: VectorChanges) -> None:
+        """
+        Rebuild the context packs of the namespaces a sync wrote to in the
+        background, once Pinecone, which is eventually consistent, serves
+        the sync's upserts and deletes.
+        """
+        namespaces = changes.namespaces()
+        if namespaces:
+            self.context_packs.schedule_build(self.retriever, namespaces, lambda: changes.visible(self.index))
+
+    def remove_page(self, identity: str, changes: Optional[VectorChanges] = None) -> int:
+        """Delete every vector of a page that no longer exists and forget it."""
+        by_namespace: Dict[str, List[str]] = {}
+        for pairs in self.manifest.get_chunks(identity).values():
+            for vid, ns in pairs:
+                by_namespace.setdefault(ns, []).append(vid)
+        for ns, vector_ids in by_namespace.items():
+            delete_in_batches(self.index, vector_ids, ns, self.delete_batch_size)
+            if changes is not None:
+                changes.add(ns, deleted=vector_ids)
+        self.manifest.remove_file(identity)
+        return sum(len(ids) for ids in by_namespace.values())
+
     def load_from_confluence(self, space_key: str, page_id: str) -> None:
         """
         Load and chunk content from a Confluence page, then store in Pinecone.
@@ -76,70 +227,109 @@ class ConfluenceConnector(DataSourceConnector):
         try:
             print(f"Loading content from Confluence page {page_id} in space {space_key}")
             
-            # Get Confluence credentials using EnvUtils
-            env_utils = EnvUtils()
-            confluence_url = env_utils.get_required_env("CONFLUENCE_URL")
-            username = env_utils.get_required_env("CONFLUENCE_USERNAME")
-            api_token = env_utils.get_required_env("CONFLUENCE_API_TOKEN")
-            
-            # Construct API endpoint
-            api_endpoint = f"{confluence_url}/rest/api/content/{page_id}?expand=body.storage,version"
-            
-            # Make API request
-            response = requests.get(api_endpoint, auth=(username, api_token))
-            response.raise_for_status()
-            
-            page_data = response.json()
-            html_content = page_data['body']['storage']['value']
-            page_title = page_data['title']
-            
-            # Convert HTML to text
-            soup = BeautifulSoup(html_content, 'html.parser')
-            text_content = soup.get_text(separator='\n', strip=True)
-            
-            # Create document
-            document = Document(
-                page_content=text_content,
-                metadata={
-                    'source': f"confluence/{space_key}/{page_title}"
-                }
-            )
-            
-            # Split into chunks
-            chunks = self.text_splitter.split_documents([document])
-            
-            # Prepare vectors for Pinecone
-            vectors = []
-            for i, chunk in enumerate(chunks):
-                # Generate embedding
-                embedding = self.embedding_model.encode(chunk.page_content)
-                
-                # Create metadata matching exact file format
-                metadata = {
-                    'text': chunk.page_content,
-                    'source': chunk.metadata['source'],
-                    'chunk_id': i
-                }
-                
-                # Prepare vector for upsert
-                vectors.append((
-                    f"confluence_{space_key}_{page_id}_{i}",  # ID
-                    embedding.tolist(),  # Vector
-                    metadata  # Metadata
-                ))
-            
-            # Upsert to Pinecone in batches
-            batch_size = 100
-            for i in range(0, len(vectors), batch_size):
-                batch = vectors[i:i + batch_size]
-                self.index.upsert(vectors=batch)
+            page_data = self.fetch_page(page_id)
+            changes = VectorChanges()
+            vector_count = self.ingest_page(space_key, page_data, changes)
+            self.schedule_context_packs(changes)
                 
             print(f"Successfully loaded Confluence page {page_id}")
-            print(f"Created {len(vectors)} vectors from page content")
+            print(f"Created {vector_count} vectors from page content")
+            cache = get_embedding_cache(self.embedding_model)
+            if cache is not None:
+                print(f"Embedding cache: {cache.stats()}")
             
         except requests.exceptions.RequestException as e:
             print(f"Error accessing Confluence API: {str(e)}")
             raise
         except Exception as e:
             print(f"Error processing Confluence content: {str(e)}")
-            raise
\ No newline at end of file
+            raise
+
+    def ingest_page(self, space_key: str, page_data: dict, changes: Optional[VectorChanges] = None) -> int:
+        """
+        Chunk, embed and upsert one fetched page and record its version.
+
+        Only chunks that are new for the page are embedded, and vectors of
+        chunks that disappeared are deleted. Written and deleted ids are
+        added to ``changes`` if given. Returns the number of vectors written.
+        """
+        page_id = str(page_data['id'])
+        html_content = page_data['body']['storage']['value']
+        page_title = page_data['title']
+        version = page_data.get('version', {}).get('number', 0)
+        
+        # Convert HTML to text
+        soup = BeautifulSoup(html_content, 'html.parser')
+        text_content = soup.get_text(separator='\n', strip=True)
+        
+        # Create document
+        document = Document(
+            page_content=text_content,
+            metadata={
+                'source': f"confluence/{space_key}/{page_title}"
+            }
+        )
+        
+        # Split into chunks
+        chunks = self.text_splitter.split_documents([document])
+        source_class = self.classifier.classify(page_title)
+        namespace = self.classifier.namespace(source_class)
+
+        # Vector ids are the page identity plus the chunk hash; repeated chunks are stored once
+        identity = f"confluence/{space_key}/{page_id}"
+        doc_id = document_id(identity)
+        registry = self.manifest.get_chunks(identity)
+        current = {}
+        for i, chunk in enumerate(chunks):
+            if chunk.page_content.strip():
+                current.setdefault(chunk_hash(chunk.page_content), (i, chunk))
+        pending = [(h, i, chunk) for h, (i, chunk) in current.items()
+                   if (vector_id(doc_id, h), namespace) not in registry.get(h, [])]
+
+        # Generate embeddings in length-sorted batches, then prepare vectors for Pinecone
+        embeddings = encode_with_cache(self.embedding_encoder, [chunk.page_content for _, _, chunk in pending])
+        vectors = []
+        for (hash_value, i, chunk), embedding in zip(pending, embeddings):
+            # Create metadata matching exact file format
+            metadata = {
+                'text': chunk.page_content,
+                'source': chunk.metadata['source'],
+                'source_class': source_class,
+                'chunk_id': i,
+                'chunk_hash': hash_value
+            }
+            
+            # Prepare vector for upsert
+            vectors.append((
+                vector_id(doc_id, hash_value),  # ID
+                embedding.tolist(),  # Vector
+                metadata  # Metadata
+            ))
+        
+        # Delete vectors of chunks that are no longer on the page (or moved namespace)
+        stale = {}
+        for hash_value, pairs in registry.items():
+            for vid, ns in pairs:
+                if hash_value not in current or (vid, ns) != (vector_id(doc_id, hash_value), namespace):
+                    stale.setdefault(ns, []).append(vid)
+        for ns, vector_ids in stale.items():
+            delete_in_batches(self.index, vector_ids, ns, self.delete_batch_size)
+            self.manifest.delete_chunks(identity, vector_ids)
+            if changes is not None:
+                changes.add(ns, deleted=vector_ids)
+
+        # Upsert to Pinecone in concurrent, size-limited batches; failures are dead-lettered
+        written = set(self.writer.upsert(vectors, namespace, source=identity))
+        if changes is not None:
+            changes.add(namespace, written=[vid for vid, _, _ in vectors if vid in written])
+        self.manifest.record_chunks(identity, [
+            (metadata['chunk_hash'], vid, namespace) for vid, _, metadata in vectors if vid in written
+        ])
+        if len(written) < len(vectors):
+            raise RuntimeError(f"{len(vectors) - len(written)} vectors of page {page_id} could not be "
+                               f"upserted and were written to {self.writer.dead_letter_path}")
+        self.manifest.record_file(identity, len(text_content), 0.0, chunk_hash(text_content))
+        self.manifest.record_version(identity, version, page_title)
+        print(f"Page {page_id} (version {version}): created {len(vectors)} vectors, "
+              f"deleted {sum(len(ids) for ids in stale.values())} stale vectors")
+        return len(vectors)
@@ -0,0 +1,131 @@
+import json
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Tuple
+from urllib.parse import parse_qs, urlparse
+
+
+class StubConfluence:
+    """
+    In-memory Confluence space served over the subset of the REST API the
+    crawler uses: ``GET /rest/api/content`` (paginated listing of a space)
+    and ``GET /rest/api/content/<id>`` (page with storage body and version).
+
+    Point ``CONFLUENCE_URL`` at ``url`` to run the connector against it.
+    Pages can be added, edited and deleted while it runs; editing bumps the
+    page version like Confluence does.
+    """
+
+    def __init__(self, space_key: str = "COMP", host: str = "127.0.0.1", port: int = 0):
+        self.space_key = space_key
+        self.pages: Dict[str, Dict] = {}
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._next_id = 1000
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub._handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.url = f"http://{host}:{self.server.server_address[1]}"
+        self._thread = None
+
+    def add_page(self, title: str, html: str) -> str:
+        with self._lock:
+            self._next_id += 1
+            page_id = str(self._next_id)
+            self.pages[page_id] = {"title": title, "html": html, "version": 1}
+            return page_id
+
+    def edit_page(self, page_id: str, html: str) -> None:
+        with self._lock:
+            self.pages[page_id]["html"] = html
+            self.pages[page_id]["version"] += 1
+
+    def delete_page(self, page_id: str) -> None:
+        with self._lock:
+            del self.pages[page_id]
+
+    def _page_json(self, page_id: str, body: bool) -> Dict:
+        page = self.pages[page_id]
+        data = {"id": page_id, "type": "page", "status": "current", "title": page["title"],
+                "space": {"key": self.space_key}, "version": {"number": page["version"]}}
+        if body:
+            data["body"] = {"storage": {"value": page["html"], "representation": "storage"}}
+        return data
+
+    def _handle(self, handler: BaseHTTPRequestHandler) -> None:
+        url = urlparse(handler.path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        with self._lock:
+            self.requests += 1
+            status, payload = self._route(url.path.rstrip("/"), params)
+        body = json.dumps(payload).encode("utf-8")
+        handler.send_response(status)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    def _route(self, path: str, params: Dict[str, str]) -> Tuple[int, Dict]:
+        if path == "/rest/api/content":
+            if params.get("spaceKey") != self.space_key:
+                return 200, {"results": [], "start": 0, "limit": 0, "size": 0, "_links": {}}
+            start, limit = int(params.get("start", 0)), int(params.get("limit", 25))
+            ids = sorted(self.pages)[start:start + limit]
+            links = {}
+            if start + limit < len(self.pages):
+                links["next"] = f"/rest/api/content?spaceKey={self.space_key}&start={start + limit}&limit={limit}"
+            return 200, {"results": [self._page_json(page_id, body=False) for page_id in ids],
+                         "start": start, "limit": limit, "size": len(ids), "_links": links}
+        if path.startswith("/rest/api/content/"):
+            page_id = path.rsplit("/", 1)[1]
+            if page_id not in self.pages:
+                return 404, {"statusCode": 404, "message": f"No content found with id {page_id}"}
+            return 200, self._page_json(page_id, body=True)
+        return 404, {"statusCode": 404, "message": "Not found"}
+
+    def start(self) -> "StubConfluence":
+        self._thread = threading.Thread(target=self.server.serve_forever, name="stub-confluence", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def sample_space(pages: int = 20, space_key: str = "COMP", port: int = 0) -> StubConfluence:
+    """A stub space with AML/KYC report pages and playbook pages."""
+    stub = StubConfluence(space_key, port=port)
+    for i in range(pages):
+        if i % 2:
+            stub.add_page(f"AML & KYC Compliance Report {i}",
+                          f"<h1>Report {i}</h1><p>Customer made {i + 2} cash deposits below the reporting threshold "
+                          f"across several branches, consistent with structuring.</p>")
+        else:
+            stub.add_page(f"Internal Fraud Investigation Playbook step {i}",
+                          f"<h1>Step {i}</h1><p>Escalate wire transfers to offshore jurisdictions above "
+                          f"{1000 * (i + 1)} USD and review layering through intermediary accounts.</p>")
+    return stub
+
+
+# Example usage
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a stub Confluence space for local crawler runs")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--space", default="COMP")
+    args = parser.parse_args()
+    stub = sample_space(args.pages, args.space, args.port)
+    print(f"Stub Confluence space {args.space} with {args.pages} pages at {stub.url}")
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        stub.server.server_close()
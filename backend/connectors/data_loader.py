@@ -2,31 +2,139 @@ import json
 import importlib
 import os
 import sys
+import threading
+from typing import Dict, List, Optional
 parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 if parent_dir not in sys.path:
     sys.path.insert(0, parent_dir)
-from connectors.local_file_system_connector import LocalFileSystemConnector
 from connectors.data_connector_base import DataSourceConnector
+
+DEFAULT_CONFIG_PATH = os.path.join(os.path.dirname(__file__), '..', 'config', 'connector_mapping.json')
+
+
+class ConnectorRegistry:
+    """
+    Thread-safe cache of connector instances, one per configured source.
+
+    Connector modules are imported and their classes instantiated on first
+    use only, then reused: connectors build Pinecone clients, splitters and
+    embedding models in ``__init__``. ``reload`` re-reads the mapping file
+    and drops the instances whose configuration changed or was removed.
+    """
+
+    def __init__(self, config_path: str = DEFAULT_CONFIG_PATH):
+        self.config_path = config_path
+        self._lock = threading.Lock()
+        self._source_locks: Dict[str, threading.Lock] = {}
+        self._connectors: Dict[str, DataSourceConnector] = {}
+        self._config_mtime = None
+        self.connector_config = {}
+        self.reload()
+
+    def _read_config(self) -> dict:
+        with open(self.config_path, 'r') as f:
+            return json.load(f)
+
+    def reload(self) -> bool:
+        """
+        Re-read the mapping file if it changed since it was last read.
+
+        Returns True when the mapping was reloaded.
+        """
+        mtime = os.path.getmtime(self.config_path)
+        with self._lock:
+            if mtime == self._config_mtime:
+                return False
+            config = self._read_config()
+            old = self.connector_config.get('connectors', {})
+            new = config.get('connectors', {})
+            for source in list(self._connectors):
+                if old.get(source) != new.get(source):
+                    del self._connectors[source]
+            self.connector_config = config
+            self._config_mtime = mtime
+            return True
+
+    def sources(self) -> List[str]:
+        with self._lock:
+            return list(self.connector_config.get('connectors', {}))
+
+    def get(self, source: str) -> DataSourceConnector:
+        """
+        Return the connector for a source, creating it on first use.
+
+        Raises:
+            KeyError: If the source is not configured.
+        """
+        with self._lock:
+            connector = self._connectors.get(source)
+            if connector is not None:
+                return connector
+            connector_info = self.connector_config['connectors'][source]
+            source_lock = self._source_locks.setdefault(source, threading.Lock())
+        # Build outside the registry lock so a slow connector does not block other sources
+        with source_lock:
+            with self._lock:
+                connector = self._connectors.get(source)
+            if connector is None:
+                connector = create_connector(connector_info)
+                with self._lock:
+                    if self.connector_config['connectors'].get(source) == connector_info:
+                        self._connectors[source] = connector
+            return connector
+
+    def clear(self) -> None:
+        with self._lock:
+            self._connectors.clear()
+
+
+def create_connector(connector_info: dict) -> DataSourceConnector:
+    """Import a connector module and instantiate its class."""
+    # Import module and get class directly using module and class_name
+    module = importlib.import_module(connector_info['module'])
+    connector_class = getattr(module, connector_info['class_name'])
+    return connector_class()
+
+
+_registries: Dict[str, ConnectorRegistry] = {}
+_registries_lock = threading.Lock()
+
+
+def get_connector_registry(config_path: str = DEFAULT_CONFIG_PATH) -> ConnectorRegistry:
+    """Process-wide registry for a mapping file."""
+    key = os.path.abspath(config_path)
+    with _registries_lock:
+        registry = _registries.get(key)
+        if registry is None:
+            registry = _registries[key] = ConnectorRegistry(config_path)
+        return registry
+
+
 class DataLoader:
-    def __init__(self):
-        """Initialize DataLoader with connector configuration"""
-        config_path = os.path.join(os.path.dirname(__file__), '..', 'config', 'connector_mapping.json')
-        with open(config_path, 'r') as f:
-            self.connector_config = json.load(f)
+    def __init__(self, config_path: Optional[str] = None):
+        """Initialize DataLoader with the shared connector registry"""
+        self.registry = get_connector_registry(config_path or DEFAULT_CONFIG_PATH)
+        self.connector_config = self.registry.connector_config
+
+    def get_connector(self, source: str) -> DataSourceConnector:
+        """
+        Return the cached connector for a source
+        """
+        return self.registry.get(source)
+
+    def reload(self) -> bool:
+        """
+        Pick up changes to connector_mapping.json; returns True if it changed
+        """
+        changed = self.registry.reload()
+        self.connector_config = self.registry.connector_config
+        return changed
 
     def load_data(self, json_data: dict):
         """
         Load data using the appropriate connector based on source
         """
-        source = json_data['source']
-        connector_info = self.connector_config['connectors'][source]
-        
-        # Import module and get class directly using module and class_name
-        module = importlib.import_module(connector_info['module'])
-        connector_class = getattr(module, connector_info['class_name'])
-        
-        # Create connector instance and load data
-        connector = connector_class()
+        connector = self.get_connector(json_data['source'])
         return connector.load_data(json_data)
 
 
@@ -42,4 +150,4 @@ if __name__ == "__main__":
         }
     }
     loader = DataLoader()
-    result = loader.load_data(test_data)
\ No newline at end of file
+    result = loader.load_data(test_data)
@@ -0,0 +1,236 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import resource
+import threading
+import subprocess
+import numpy as np
+from typing import Any, Dict, List, Optional
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+from data.synthetic_documents import generate_corpus, write_pdf
+from connectors.ingestion_pipeline import current_rss_bytes
+
+
+class TimedIndex:
+    """
+    Pinecone compatible wrapper around a local store that records the
+    latency of every upsert, optionally adding a simulated network delay.
+    """
+
+    def __init__(self, store, upsert_latency_ms: float = 0.0):
+        self.store = store
+        self.upsert_latency_ms = upsert_latency_ms
+        self.upsert_latencies_ms: List[float] = []
+        self.upserted = 0
+        # The local store is not thread-safe; the writer sends batches concurrently
+        self._lock = threading.Lock()
+
+    def upsert(self, vectors, namespace: str = "", **kwargs):
+        started = time.perf_counter()
+        if self.upsert_latency_ms:
+            time.sleep(self.upsert_latency_ms / 1000)
+        with self._lock:
+            result = self.store.upsert(vectors, namespace=namespace)
+            self.upserted += len(vectors)
+            self.upsert_latencies_ms.append((time.perf_counter() - started) * 1000)
+        return result
+
+    def delete(self, ids=None, namespace: str = "", **kwargs):
+        with self._lock:
+            return self.store.delete(ids=ids, namespace=namespace)
+
+    def query(self, *args, **kwargs):
+        with self._lock:
+            return self.store.query(*args, **kwargs)
+
+    def describe_index_stats(self, **kwargs):
+        with self._lock:
+            return self.store.describe_index_stats()
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=parent_dir, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def _peak_rss_mb(who: int) -> float:
+    peak = resource.getrusage(who).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_benchmark(pdfs: int = 4, pages: int = 20, txts: int = 4, txt_kb: int = 256, tables: int = 1,
+                  upsert_latency_ms: float = 0.0, embedding_model: Optional[str] = None,
+                  use_cache: bool = False, work_dir: Optional[str] = None, keep: bool = False) -> Dict[str, Any]:
+    """
+    Generate a synthetic corpus, ingest it with ``LocalFileSystemConnector``
+    into a local in-memory vector store and report throughput.
+
+    Manifest, BM25 index and context packs are written to a scratch
+    directory so runs start cold and leave the real data untouched; the
+    embedding cache is disabled unless ``use_cache`` is set.
+    """
+    work_dir = work_dir or tempfile.mkdtemp(prefix="ingestion_benchmark_")
+    os.environ.update({
+        "INGESTION_MANIFEST_PATH": os.path.join(work_dir, "manifest.db"),
+        "LEXICAL_INDEX_PATH": os.path.join(work_dir, "lexical_index.pkl"),
+        "CONTEXT_PACKS_PATH": os.path.join(work_dir, "context_packs.json"),
+        "VECTOR_DEAD_LETTER_PATH": os.path.join(work_dir, "dead_letter.jsonl"),
+        "EMBEDDING_CACHE_ENABLED": "true" if use_cache else "false",
+    })
+    if embedding_model:
+        os.environ["EMBEDDING_MODEL"] = embedding_model
+    from util.embedding_backend import get_embedding_backend
+    from util.embedding_store import NamespacedEmbeddingStore
+    from connectors.local_file_system_connector import LocalFileSystemConnector
+
+    index = None
+    try:
+        started = time.perf_counter()
+        corpus = generate_corpus(os.path.join(work_dir, "documents"), pdfs, pages, txts, txt_kb, tables)
+        generate_seconds = time.perf_counter() - started
+
+        backend = get_embedding_backend()
+        index = TimedIndex(NamespacedEmbeddingStore(backend.dimension), upsert_latency_ms)
+        connector = LocalFileSystemConnector(index=index)
+
+        # Record the size of every model forward pass to measure batch fill
+        forward_sizes: List[int] = []
+        encode = backend.encode
+
+        def counting_encode(texts, batch_size: int = 32):
+            if not isinstance(texts, str):
+                forward_sizes.append(len(texts))
+            return encode(texts, batch_size=batch_size)
+
+        backend.encode = counting_encode
+        try:
+            started = time.perf_counter()
+            stages = connector.load_files(corpus["pdf"] + corpus["txt"])
+            ingest_seconds = time.perf_counter() - started
+            # Context packs are rebuilt in the background, and written to the scratch directory
+            connector.context_packs.wait()
+        finally:
+            del backend.encode
+
+        by_stage = {stage["stage"]: stage for stage in stages}
+        embed = by_stage.get("embed", {})
+        chunks = index.upserted
+        latencies = index.upsert_latencies_ms or [0.0]
+        return {
+            "commit": _git_commit(),
+            "config": {
+                "pdfs": pdfs, "pages_per_pdf": pages, "tables_per_page": tables, "txts": txts, "txt_kb": txt_kb,
+                "upsert_latency_ms": upsert_latency_ms, "embedding_model": backend.name,
+                "ingest_batch_size": connector.ingest_batch_size, "embedding_batch_size": backend.batch_size,
+                "embedding_cache": use_cache,
+            },
+            "generate_seconds": generate_seconds,
+            "ingest_seconds": ingest_seconds,
+            "pages": corpus["pdf_pages"],
+            "pages_per_sec": corpus["pdf_pages"] / ingest_seconds,
+            "chunks": chunks,
+            "chunks_per_sec": chunks / ingest_seconds,
+            "embedding": {
+                # Chunks per embed call relative to INGEST_BATCH_SIZE, and per forward pass relative to EMBEDDING_BATCH_SIZE
+                "calls": embed.get("items", 0),
+                "ingest_batch_utilization": (embed.get("units", 0) / embed["items"] / connector.ingest_batch_size
+                                             if embed.get("items") else 0.0),
+                "forward_passes": len(forward_sizes),
+                "forward_batch_utilization": (float(np.mean(forward_sizes)) / backend.batch_size
+                                              if forward_sizes else 0.0),
+            },
+            "upsert_latency_ms": {
+                "requests": len(index.upsert_latencies_ms),
+                "mean": float(np.mean(latencies)),
+                "p50": float(np.percentile(latencies, 50)),
+                "p95": float(np.percentile(latencies, 95)),
+                "max": float(np.max(latencies)),
+            },
+            "stages": stages,
+            "peak_rss_mb": _peak_rss_mb(resource.RUSAGE_SELF),
+            "peak_child_rss_mb": _peak_rss_mb(resource.RUSAGE_CHILDREN),
+            "work_dir": work_dir if keep else None,
+        }
+    finally:
+        if index is not None:
+            index.store.close()
+        if not keep:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def pdf_memory_profile(pages: int = 5000, page_window: Optional[int] = None, samples: int = 20,
+                       work_dir: Optional[str] = None, keep: bool = False) -> Dict[str, Any]:
+    """
+    Extract a synthetic PDF of ``pages`` pages in this process and sample
+    RSS along the way.
+
+    Memory should stay flat: ``growth_mb`` compares the mean RSS of the
+    last quarter of the samples with the first quarter.
+    """
+    from connectors.pdf_extraction import iter_pdf_documents
+    work_dir = work_dir or tempfile.mkdtemp(prefix="pdf_memory_profile_")
+    try:
+        path = write_pdf(os.path.join(work_dir, f"synthetic_{pages}_pages.pdf"), pages, lines_per_page=20,
+                         table_rows=4)
+        every = max(pages // samples, 1)
+        rss_mb, last_page = [], -1
+        started = time.perf_counter()
+        for doc in iter_pdf_documents(path, processes=1, page_window=page_window):
+            page = doc.metadata['page']
+            if page != last_page and page % every == 0:
+                rss_mb.append(current_rss_bytes() / (1024 * 1024))
+            last_page = page
+        seconds = time.perf_counter() - started
+        quarter = max(len(rss_mb) // 4, 1)
+        return {
+            "commit": _git_commit(),
+            "pages": pages,
+            "page_window": page_window or int(os.environ.get("PDF_PAGE_WINDOW", 100)),
+            "pages_per_sec": pages / seconds,
+            "rss_mb": [round(value, 1) for value in rss_mb],
+            "growth_mb": float(np.mean(rss_mb[-quarter:]) - np.mean(rss_mb[:quarter])) if rss_mb else 0.0,
+            "work_dir": work_dir if keep else None,
+        }
+    finally:
+        if not keep:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark local file ingestion on a synthetic corpus")
+    parser.add_argument("--pdfs", type=int, default=4)
+    parser.add_argument("--pages", type=int, default=20, help="pages per PDF")
+    parser.add_argument("--tables", type=int, default=1, help="tables per PDF page")
+    parser.add_argument("--txts", type=int, default=4)
+    parser.add_argument("--txt-kb", type=int, default=256, help="size of each TXT file")
+    parser.add_argument("--upsert-latency-ms", type=float, default=0.0, help="simulated vector store latency")
+    parser.add_argument("--embedding-model", default=None, help="e.g. e5-small; defaults to EMBEDDING_MODEL")
+    parser.add_argument("--use-cache", action="store_true", help="keep the embedding cache enabled")
+    parser.add_argument("--keep", action="store_true", help="keep the generated corpus and scratch files")
+    parser.add_argument("--output", default=None, help="write the JSON report to this file")
+    parser.add_argument("--pdf-memory-pages", type=int, default=None,
+                        help="instead of the ingestion run, profile RSS while extracting one PDF of this many pages")
+    args = parser.parse_args()
+    if args.pdf_memory_pages:
+        report = pdf_memory_profile(args.pdf_memory_pages, keep=args.keep)
+    else:
+        report = run_benchmark(args.pdfs, args.pages, args.txts, args.txt_kb, args.tables, args.upsert_latency_ms,
+                               args.embedding_model, args.use_cache, keep=args.keep)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+import os
+import sys
+import hashlib
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+from util.envutils import EnvUtils
+
+DEFAULT_MANIFEST_PATH = os.path.join(parent_dir, "data", "ingestion_manifest.db")
+
+
+def file_hash(file_path: str, block_size: int = 1 << 20) -> str:
+    """SHA-256 of a file's bytes, read in blocks."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def chunk_hash(text: str) -> str:
+    """SHA-256 of a chunk's whitespace-normalised text."""
+    return hashlib.sha256(" ".join(text.split()).encode("utf-8")).hexdigest()
+
+
+class IngestionManifest:
+    """
+    SQLite record of what has been ingested.
+
+    ``files`` holds the size, mtime and content hash of every ingested file;
+    ``chunks`` holds, per file, the content hash of every chunk together
+    with the vector id and namespace it was written to. The connector uses
+    it to skip unchanged files, embed only new chunks of modified files and
+    delete the vectors of chunks that disappeared. ``versions`` holds the
+    last synced version number of sources that have one, such as
+    Confluence pages.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or EnvUtils().get_env("INGESTION_MANIFEST_PATH", DEFAULT_MANIFEST_PATH)
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self.connection = sqlite3.connect(self.path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                size INTEGER,
+                mtime REAL,
+                file_hash TEXT,
+                ingested_at TEXT
+            );
+            CREATE TABLE IF NOT EXISTS chunks (
+                path TEXT,
+                chunk_hash TEXT,
+                vector_id TEXT,
+                namespace TEXT,
+                PRIMARY KEY (path, vector_id)
+            );
+            CREATE INDEX IF NOT EXISTS chunks_by_hash ON chunks (path, chunk_hash);
+            CREATE TABLE IF NOT EXISTS versions (
+                path TEXT PRIMARY KEY,
+                version INTEGER,
+                title TEXT,
+                synced_at TEXT
+            );
+        """)
+        self.connection.commit()
+
+    def get_file(self, file_path: str) -> Optional[Dict]:
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT path, size, mtime, file_hash, ingested_at FROM files WHERE path = ?", (file_path,)
+            ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("path", "size", "mtime", "file_hash", "ingested_at"), row))
+
+    def record_file(self, file_path: str, size: int, mtime: float, content_hash: str) -> None:
+        with self._lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO files (path, size, mtime, file_hash, ingested_at) VALUES (?, ?, ?, ?, ?)",
+                (file_path, size, mtime, content_hash, datetime.now().isoformat())
+            )
+            self.connection.commit()
+
+    def list_files(self, prefix: str = "") -> Dict[str, Tuple[int, float]]:
+        """Map every recorded path starting with ``prefix`` to its ``(size, mtime)``."""
+        with self._lock:
+            rows = self.connection.execute(
+                "SELECT path, size, mtime FROM files WHERE substr(path, 1, ?) = ?", (len(prefix), prefix)
+            ).fetchall()
+        return {path: (size, mtime) for path, size, mtime in rows}
+
+    def get_chunks(self, file_path: str) -> Dict[str, List[Tuple[str, str]]]:
+        """Map chunk hash to the ``(vector_id, namespace)`` pairs stored for a file."""
+        chunks: Dict[str, List[Tuple[str, str]]] = {}
+        with self._lock:
+            rows = self.connection.execute(
+                "SELECT chunk_hash, vector_id, namespace FROM chunks WHERE path = ?", (file_path,)
+            ).fetchall()
+        for hash_value, vector_id, namespace in rows:
+            chunks.setdefault(hash_value, []).append((vector_id, namespace))
+        return chunks
+
+    def record_chunks(self, file_path: str, rows: Iterable[Tuple[str, str, str]]) -> None:
+        """Record ``(chunk_hash, vector_id, namespace)`` rows written for a file."""
+        with self._lock:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO chunks (path, chunk_hash, vector_id, namespace) VALUES (?, ?, ?, ?)",
+                [(file_path, h, v, n) for h, v, n in rows]
+            )
+            self.connection.commit()
+
+    def delete_chunks(self, file_path: str, vector_ids: Iterable[str]) -> None:
+        with self._lock:
+            self.connection.executemany(
+                "DELETE FROM chunks WHERE path = ? AND vector_id = ?",
+                [(file_path, v) for v in vector_ids]
+            )
+            self.connection.commit()
+
+    def get_versions(self, prefix: str = "") -> Dict[str, int]:
+        """Map every versioned path starting with ``prefix`` to its last synced version."""
+        with self._lock:
+            rows = self.connection.execute(
+                "SELECT path, version FROM versions WHERE substr(path, 1, ?) = ?", (len(prefix), prefix)
+            ).fetchall()
+        return dict(rows)
+
+    def record_version(self, path: str, version: int, title: Optional[str] = None) -> None:
+        with self._lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO versions (path, version, title, synced_at) VALUES (?, ?, ?, ?)",
+                (path, version, title, datetime.now().isoformat())
+            )
+            self.connection.commit()
+
+    def remove_file(self, file_path: str) -> None:
+        with self._lock:
+            self.connection.execute("DELETE FROM versions WHERE path = ?", (file_path,))
+            self.connection.execute("DELETE FROM chunks WHERE path = ?", (file_path,))
+            self.connection.execute("DELETE FROM files WHERE path = ?", (file_path,))
+            self.connection.commit()
+
+    def close(self) -> None:
+        self.connection.close()
@@ -0,0 +1,280 @@
+import os
+import sys
+import time
+import queue
+import threading
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from langchain.schema import Document
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+from util.envutils import EnvUtils
+
+_DONE = object()
+
+
+def current_rss_bytes() -> int:
+    """Resident set size of this process (peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+class StageStats:
+    """
+    Throughput counters for one pipeline stage.
+
+    ``units`` counts the stage's natural unit of work (documents extracted,
+    chunks split, chunks embedded, vectors upserted); ``busy_seconds`` is the
+    time workers spent processing and ``blocked_seconds`` the time they spent
+    waiting for room in the next stage's queue.
+    """
+
+    def __init__(self, name: str, workers: int):
+        self.name = name
+        self.workers = workers
+        self.items = 0
+        self.units = 0
+        self.busy_seconds = 0.0
+        self.blocked_seconds = 0.0
+        self.peak_rss_bytes = 0
+        self.started = None
+        self.finished = None
+        self._lock = threading.Lock()
+
+    def record(self, units: int, busy: float, blocked: float, rss: int = 0) -> None:
+        with self._lock:
+            self.items += 1
+            self.units += units
+            self.busy_seconds += busy
+            self.blocked_seconds += blocked
+            self.peak_rss_bytes = max(self.peak_rss_bytes, rss)
+
+    def as_dict(self) -> Dict[str, Any]:
+        wall = max((self.finished or time.perf_counter()) - (self.started or time.perf_counter()), 1e-9)
+        return {
+            "stage": self.name,
+            "workers": self.workers,
+            "items": self.items,
+            "units": self.units,
+            "units_per_sec": self.units / wall,
+            "busy_seconds": self.busy_seconds,
+            "blocked_seconds": self.blocked_seconds,
+            "wall_seconds": wall,
+            "peak_rss_mb": self.peak_rss_bytes / (1024 * 1024),
+            # Share of the stage's worker time spent working; the busiest stage is the bottleneck
+            "utilization": self.busy_seconds / (wall * self.workers),
+        }
+
+
+class _Stage:
+    """A pool of worker threads reading from bounded queues."""
+
+    def __init__(self, name: str, workers: int, handler: Callable, queue_size: int, partition_key: Callable = None,
+                 throttle: Callable[[], None] = None):
+        self.name = name
+        self.workers = max(1, workers)
+        self.handler = handler
+        self.partition_key = partition_key
+        self.throttle = throttle
+        # Partitioned stages give each worker its own queue so one key is always handled by one worker
+        queue_count = self.workers if partition_key else 1
+        self.queues = [queue.Queue(maxsize=queue_size) for _ in range(queue_count)]
+        self.stats = StageStats(name, self.workers)
+        self.downstream: Optional["_Stage"] = None
+        self._threads: List[threading.Thread] = []
+        self._remaining = self.workers
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def put(self, item) -> None:
+        """Blocking put, which is what gives the pipeline its backpressure."""
+        if self.partition_key:
+            self.queues[hash(self.partition_key(item)) % len(self.queues)].put(item)
+        else:
+            self.queues[0].put(item)
+
+    def close(self) -> None:
+        """Signal every worker that no more input will arrive."""
+        if self.partition_key:
+            for q in self.queues:
+                q.put(_DONE)
+        else:
+            for _ in range(self.workers):
+                self.queues[0].put(_DONE)
+
+    def start(self) -> None:
+        self.stats.started = time.perf_counter()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, args=(self.queues[i % len(self.queues)],),
+                                      name=f"ingest-{self.name}-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def join(self) -> None:
+        for thread in self._threads:
+            thread.join()
+
+    def _emit(self, item) -> None:
+        if self.downstream is not None:
+            started = time.perf_counter()
+            if self.throttle is not None:
+                self.throttle()
+            self.downstream.put(item)
+            self._local.blocked += time.perf_counter() - started
+
+    def _work(self, in_queue: queue.Queue) -> None:
+        while True:
+            item = in_queue.get()
+            if item is _DONE:
+                break
+            started = time.perf_counter()
+            self._local.blocked = 0.0
+            try:
+                units = self.handler(item, self._emit)
+            except Exception as e:
+                print(f"Warning: Error in {self.name} stage: {str(e)}")
+                units = 0
+            blocked = self._local.blocked
+            self.stats.record(units or 0, time.perf_counter() - started - blocked, blocked, current_rss_bytes())
+        with self._lock:
+            self._remaining -= 1
+            last = self._remaining == 0
+        if last:
+            self.stats.finished = time.perf_counter()
+            if self.downstream is not None:
+                self.downstream.close()
+
+
+class IngestionPipeline:
+    """
+    Staged extract -> split -> embed -> upsert pipeline with bounded queues.
+
+    Each stage runs its own worker threads, so PDF parsing, embedding and
+    network upserts overlap instead of running one after another. The
+    bounded queues between stages block fast producers when a slower stage
+    falls behind, which caps the number of in-flight pages and batches.
+
+    The stages call back into the connector:
+
+    * ``extract(path)`` yields ``Document`` objects for a file
+    * ``split(document)`` returns its chunks
+    * ``embed(chunks, path, start_idx)`` returns an opaque payload for upsert
+    * ``upsert(payload)`` writes it and returns the number of vectors written
+
+    Chunk numbering is per file and deterministic: all documents of a file
+    go through the same split worker in extraction order.
+
+    With ``INGEST_MEMORY_CEILING_MB`` set, extraction also pauses while the
+    process RSS is above the ceiling and later stages still have queued
+    work, letting them drain before more pages are parsed.
+    """
+
+    def __init__(self, extract: Callable[[str], Iterator[Document]], split: Callable[[Document], List[Document]],
+                 embed: Callable[[List[Document], str, int], Any], upsert: Callable[[Any], int],
+                 batch_size: int = 256):
+        env_utils = EnvUtils()
+        self.extract = extract
+        self.split = split
+        self.embed = embed
+        self.upsert = upsert
+        self.batch_size = batch_size
+        self.queue_size = int(env_utils.get_env("INGEST_QUEUE_SIZE", 16))
+        self.workers = {
+            "extract": int(env_utils.get_env("INGEST_EXTRACT_WORKERS", 2)),
+            "split": int(env_utils.get_env("INGEST_SPLIT_WORKERS", 1)),
+            "embed": int(env_utils.get_env("INGEST_EMBED_WORKERS", 1)),
+            "upsert": int(env_utils.get_env("INGEST_UPSERT_WORKERS", 4)),
+        }
+        self.memory_ceiling_bytes = int(float(env_utils.get_env("INGEST_MEMORY_CEILING_MB", 0)) * 1024 * 1024)
+        self.throttled_seconds = 0.0
+        # Per file split state: pending chunks and the next chunk index
+        self._split_state: Dict[str, Tuple[List[Document], int]] = {}
+        self._stages: List[_Stage] = []
+
+    def _throttle(self) -> None:
+        """Wait while RSS is above the memory ceiling and downstream stages have queued work."""
+        if not self.memory_ceiling_bytes or current_rss_bytes() <= self.memory_ceiling_bytes:
+            return
+        started = time.perf_counter()
+        while current_rss_bytes() > self.memory_ceiling_bytes and any(
+                not q.empty() for stage in self._stages[1:] for q in stage.queues):
+            time.sleep(0.05)
+        self.throttled_seconds += time.perf_counter() - started
+
+    def _extract_stage(self, file_path: str, emit) -> int:
+        count = 0
+        try:
+            for doc in self.extract(file_path):
+                emit(("doc", file_path, doc))
+                count += 1
+        finally:
+            emit(("end", file_path, None))
+        return count
+
+    def _split_stage(self, item, emit) -> int:
+        kind, file_path, doc = item
+        pending, next_idx = self._split_state.get(file_path, ([], 0))
+        count = 0
+        if kind == "doc":
+            chunks = [c for c in self.split(doc) if c.page_content.strip()]
+            pending.extend(chunks)
+            count = len(chunks)
+            while len(pending) >= self.batch_size:
+                batch, pending = pending[:self.batch_size], pending[self.batch_size:]
+                emit((batch, file_path, next_idx))
+                next_idx += len(batch)
+            self._split_state[file_path] = (pending, next_idx)
+        else:
+            if pending:
+                emit((pending, file_path, next_idx))
+            self._split_state.pop(file_path, None)
+        return count
+
+    def _embed_stage(self, item, emit) -> int:
+        chunks, file_path, start_idx = item
+        emit(self.embed(chunks, file_path, start_idx))
+        return len(chunks)
+
+    def _upsert_stage(self, payload, emit) -> int:
+        return self.upsert(payload)
+
+    def run(self, file_paths: Iterable[str]) -> List[Dict[str, Any]]:
+        """Ingest the files and return per-stage statistics."""
+        stages = [
+            _Stage("extract", self.workers["extract"], self._extract_stage, self.queue_size,
+                   throttle=self._throttle),
+            _Stage("split", self.workers["split"], self._split_stage, self.queue_size,
+                   partition_key=lambda item: item[1]),
+            _Stage("embed", self.workers["embed"], self._embed_stage, self.queue_size),
+            _Stage("upsert", self.workers["upsert"], self._upsert_stage, self.queue_size),
+        ]
+        self._stages = stages
+        for upstream, downstream in zip(stages, stages[1:]):
+            upstream.downstream = downstream
+        for stage in stages:
+            stage.start()
+        for file_path in file_paths:
+            stages[0].put(file_path)
+        stages[0].close()
+        for stage in stages:
+            stage.join()
+        stats = [stage.stats.as_dict() for stage in stages]
+        stats[0]["throttled_seconds"] = self.throttled_seconds
+        return stats
+
+
+def format_stage_stats(stats: List[Dict[str, Any]]) -> str:
+    """One line per stage, marking the most utilized stage as the bottleneck."""
+    bottleneck = max(stats, key=lambda s: s["utilization"])["stage"] if stats else None
+    lines = []
+    for s in stats:
+        marker = "  <- bottleneck" if s["stage"] == bottleneck else ""
+        lines.append(f"{s['stage']:>8}: {s['units']} units, {s['units_per_sec']:.1f}/s, "
+                     f"{s['workers']} workers, {s['utilization']:.0%} busy{marker}")
+    return "\n".join(lines)
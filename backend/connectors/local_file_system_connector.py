@@ -1,17 +1,16 @@
 import os
+import re
 import requests
 import itertools
 from langchain.schema import Document
 from bs4 import BeautifulSoup
-from typing import List, Optional, Generator, Tuple, Iterator
+from typing import Dict, List, Optional, Generator, Tuple, Iterator
 from dotenv import load_dotenv
 from pinecone import Pinecone
-from sentence_transformers import SentenceTransformer
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_community.document_loaders import TextLoader
 from langchain_community.document_loaders.pdf import PyPDFLoader
 import sys
-from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_pinecone import PineconeVectorStore
 from langchain_community.vectorstores import Pinecone as LangchainPinecone
 from langchain.chains import LLMChain
@@ -29,31 +28,58 @@ parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 if parent_dir not in sys.path:
     sys.path.insert(0, parent_dir)
 from util.envutils import EnvUtils
+from util.embedding_backend import get_embedding_backend, validate_index_dimension
+from util.embedding_cache import encode_with_cache, get_embedding_cache
+from util.embedding_workers import get_embedding_encoder
 from connectors.data_connector_base import DataSourceConnector
+from util.lexical_index import BM25Index
+from util.document_classes import DocumentClassifier
+from tools.document_retriever import DocumentRetriever
+from tools.context_packs import ContextPackStore
+from connectors.ingestion_pipeline import IngestionPipeline, format_stage_stats
+from connectors.pdf_extraction import iter_pdf_documents
+from connectors.text_streaming import iter_text_chunks
+from connectors.ingestion_manifest import IngestionManifest, file_hash, chunk_hash
+from connectors.vector_ids import (document_id, file_identity, vector_id, delete_in_batches, listing_unsupported,
+                                   VectorChanges)
+from connectors.vector_writer import VectorUpsertWriter
+import threading
 class LocalFileSystemConnector(DataSourceConnector):
-    def __init__(self):
+    def __init__(self, index=None):
+        """
+        Args:
+            index: Pinecone compatible index to write to instead of the
+                configured Pinecone index, e.g. a local store for benchmarks.
+        """
         # Load environment variables
         self.env_utils = EnvUtils()
-        # Initialize Pinecone
-        self.pinecone_api_key = self.env_utils.get_required_env("PINECONE_API_KEY")
-        self.openai_api_key = self.env_utils.get_required_env("OPENAI_API_KEY")
-        self.index_name = self.env_utils.get_required_env("PINECONE_INDEX")
-        if not all([self.pinecone_api_key, self.index_name]):
-            raise ValueError("Missing required environment variables")
-        # Initialize embedding model
-        self.embedding_model = SentenceTransformer("intfloat/multilingual-e5-large")
-        self.langchain_embeddings = HuggingFaceEmbeddings(model_name="intfloat/multilingual-e5-large")
-        
-        # Initialize Pinecone
-        self.pc = Pinecone(api_key=self.pinecone_api_key)
+        # Initialize embedding model (shared per process, configured via EMBEDDING_* settings)
+        self.embedding_model = get_embedding_backend()
+        self.langchain_embeddings = self.embedding_model
+        # Chunk batches are encoded on EMBEDDING_WORKERS processes when configured
+        self.embedding_encoder = get_embedding_encoder(self.embedding_model)
         
-        # Get or create index
-        self.index = self.pc.Index(self.index_name)
+        if index is not None:
+            self.index = index
+        else:
+            # Initialize Pinecone
+            self.pinecone_api_key = self.env_utils.get_required_env("PINECONE_API_KEY")
+            self.openai_api_key = self.env_utils.get_required_env("OPENAI_API_KEY")
+            self.index_name = self.env_utils.get_required_env("PINECONE_INDEX")
+            if not all([self.pinecone_api_key, self.index_name]):
+                raise ValueError("Missing required environment variables")
+            self.pc = Pinecone(api_key=self.pinecone_api_key)
+            
+            # Get or create index
+            self.index = self.pc.Index(self.index_name)
+        validate_index_dimension(self.index, self.embedding_model)
         
         # Initialize text splitter with streaming optimized settings
+        self.chunk_size = 500
+        self.chunk_overlap = 50
         self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=500,
-            chunk_overlap=50,
+            chunk_size=self.chunk_size,
+            chunk_overlap=self.chunk_overlap,
             separators=["\n\n", "\n", ".", "!", "?", ",", " ", ""],
             length_function=len
         )
@@ -62,208 +88,374 @@ class LocalFileSystemConnector(DataSourceConnector):
             embedding=self.langchain_embeddings,
             text_key="text"
         )
+        # Local BM25 index, built alongside the vector index during ingestion
+        self.lexical_index = BM25Index()
+        self.lexical_index.load()
+        self.classifier = DocumentClassifier()
+        self.retriever = DocumentRetriever(self.vectorstore, lexical_index=self.lexical_index,
+                                           classifier=self.classifier)
+        self.context_packs = ContextPackStore()
+        # Chunks per embedding batch handed from the split stage to the embed stage
+        self.ingest_batch_size = int(self.env_utils.get_env("INGEST_BATCH_SIZE", 256))
+        # Content hashes of ingested files and chunks, and per-file state while a file is ingested
+        self.manifest = IngestionManifest()
+        self.delete_batch_size = int(self.env_utils.get_env("VECTOR_DELETE_BATCH_SIZE", 1000))
+        self.writer = VectorUpsertWriter(self.index)
+        self._file_state = {}
+        self._state_lock = threading.Lock()
+        # Concurrent runs, e.g. from several folder watcher workers, finish one at a time
+        self._finish_lock = threading.Lock()
     
     def process_chunk_batch(self, chunks: List[Document], file_path: str, start_idx: int = 0) -> None:
         """
         Process a batch of chunks and upload to Pinecone.
         """
+        self.upsert_vectors(self.embed_chunk_batch(chunks, file_path, start_idx))
+
+    def _claim_new_chunks(self, file_path: str, hashes: List[str]) -> List[bool]:
+        """
+        Mark chunk hashes as present in the current version of a file and
+        return, per hash, whether it still has to be embedded. Chunks already
+        stored for the file and repeats within the file are not re-embedded.
+        """
+        state = self._file_state.get(file_path)
+        if state is None:
+            return [True] * len(hashes)
+        needed = []
+        with self._state_lock:
+            for hash_value in hashes:
+                needed.append(hash_value not in state['seen'] and hash_value not in state['existing'])
+                state['seen'].add(hash_value)
+        return needed
+
+    def embed_chunk_batch(self, chunks: List[Document], file_path: str,
+                          start_idx: int = 0) -> Tuple[str, str, List[tuple]]:
+        """
+        Embed a batch of chunks and return ``(file_path, namespace, vectors)`` for upsert.
+
+        Chunks are tagged with their document class and routed to that
+        class's namespace. Only chunks whose content hash is new for the file
+        are embedded. Vector ids combine the file's identity (its resolved
+        path) with the chunk hash, so they are stable across re-ingestion and
+        never collide between files that share a name.
+        """
+        source_class = self.classifier.classify(os.path.basename(file_path))
+        namespace = self.classifier.namespace(source_class)
+        # Skip empty chunks but keep their position in the chunk numbering
+        indexed_chunks = [(i, chunk) for i, chunk in enumerate(chunks) if chunk.page_content.strip()]
+        hashes = [chunk_hash(chunk.page_content) for _, chunk in indexed_chunks]
+        needed = self._claim_new_chunks(file_path, hashes)
+        pending = [(i, chunk, h) for (i, chunk), h, n in zip(indexed_chunks, hashes, needed) if n]
+        if not pending:
+            return file_path, namespace, []
+        try:
+            embeddings = encode_with_cache(self.embedding_encoder, [chunk.page_content for _, chunk, _ in pending])
+        except Exception as e:
+            print(f"Warning: Error embedding chunks {start_idx}-{start_idx + len(chunks) - 1}: {str(e)}")
+            self._mark_failed(file_path)
+            return file_path, namespace, []
+
+        doc_id = document_id(file_identity(file_path))
         vectors = []
-        for i, chunk in enumerate(chunks):
-            # Skip empty chunks
-            if not chunk.page_content.strip():
-                continue
-                
+        for (i, chunk, hash_value), embedding in zip(pending, embeddings):
+            metadata = {
+                'text': chunk.page_content,
+                'source': file_path,
+                'chunk_id': start_idx + i
+            }
+            
+            if hasattr(chunk, 'metadata'):
+                metadata.update(chunk.metadata)
+            metadata['source_class'] = source_class
+            metadata['chunk_hash'] = hash_value
+            
+            vectors.append((
+                vector_id(doc_id, hash_value),
+                embedding.tolist(),
+                metadata
+            ))
+        return file_path, namespace, vectors
+
+    def upsert_vectors(self, payload: Tuple[str, str, List[tuple]]) -> int:
+        """
+        Upsert embedded vectors to Pinecone and the local BM25 index, and
+        record them in the ingestion manifest under the file's identity.
+
+        Only vectors Pinecone accepted are indexed and recorded. If a batch
+        is dead-lettered, the file is marked failed so the next run retries it.
+        """
+        file_path, namespace, vectors = payload
+        if not vectors:
+            return 0
+        written = set(self.writer.upsert(vectors, namespace, source=file_path))
+        if len(written) < len(vectors):
+            self._mark_failed(file_path)
+        vectors = [vector for vector in vectors if vector[0] in written]
+        for vid, _, metadata in vectors:
+            self.lexical_index.add(vid, metadata['text'], metadata, partition=namespace)
+        state = self._file_state.get(file_path)
+        if state is not None:
+            state['changes'].add(namespace, written=[vid for vid, _, _ in vectors])
+        self.manifest.record_chunks(file_identity(file_path), [
+            (metadata['chunk_hash'], vid, namespace) for vid, _, metadata in vectors
+        ])
+        return len(vectors)
+
+    def _mark_failed(self, file_path: str) -> None:
+        state = self._file_state.get(file_path)
+        if state is not None:
+            state['failed'] = True
+
+    def delete_vectors(self, file_path: str, stale: List[Tuple[str, str]],
+                       changes: Optional[VectorChanges] = None) -> None:
+        """
+        Delete ``(vector_id, namespace)`` pairs of a file from Pinecone, the
+        BM25 index and the manifest, in batches of ``VECTOR_DELETE_BATCH_SIZE``
+        ids per namespace. Deleted ids are added to ``changes`` if given.
+        """
+        identity = file_identity(file_path)
+        by_namespace: Dict[str, List[str]] = {}
+        for stale_id, namespace in stale:
+            by_namespace.setdefault(namespace, []).append(stale_id)
+        for namespace, vector_ids in by_namespace.items():
+            delete_in_batches(self.index, vector_ids, namespace, self.delete_batch_size)
+            self.lexical_index.remove(vector_ids)
+            self.manifest.delete_chunks(identity, vector_ids)
+            if changes is not None:
+                changes.add(namespace, deleted=vector_ids)
+
+    def _legacy_sources(self, vector_ids: List[str], namespace: str) -> Dict[str, Optional[str]]:
+        """Map legacy vector ids to the ``source`` path in their metadata."""
+        sources = {}
+        for start in range(0, len(vector_ids), 100):
+            response = self.index.fetch(ids=vector_ids[start:start + 100], namespace=namespace)
+            vectors = response.vectors if hasattr(response, 'vectors') else response.get('vectors', {})
+            for vid, vector in vectors.items():
+                metadata = vector.metadata if hasattr(vector, 'metadata') else vector.get('metadata')
+                sources[vid] = (metadata or {}).get('source')
+        return sources
+
+    def purge_legacy_vectors(self, file_path: str, changes: Optional[VectorChanges] = None) -> int:
+        """
+        Delete vectors written under the old ``<file name>_<n>`` id scheme.
+
+        Those ids were never recorded in the manifest, so they are found by
+        id prefix. Files with the same name in other folders share that
+        prefix, so only vectors whose ``source`` metadata resolves to this
+        file are deleted. Listing by prefix needs a serverless index; on
+        other indexes this is a no-op. Any other error is raised.
+        """
+        name = os.path.basename(file_path)
+        legacy_id = re.compile(rf"{re.escape(name)}_\d+")
+        identity = file_identity(file_path)
+        namespace = self.classifier.namespace(self.classifier.classify(name))
+        if not hasattr(self.index, 'list'):
+            return 0
+        deleted = 0
+        for ns in {"", namespace}:
             try:
-                embedding = self.embedding_model.encode(chunk.page_content)
-                
-                metadata = {
-                    'text': chunk.page_content,
-                    'source': file_path,
-                    'chunk_id': start_idx + i
-                }
-                
-                if hasattr(chunk, 'metadata'):
-                    metadata.update(chunk.metadata)
-                
-                vectors.append((
-                    f"{os.path.basename(file_path)}_{start_idx + i}",
-                    embedding.tolist(),
-                    metadata
-                ))
+                candidates = [vid for page in self.index.list(prefix=f"{name}_", namespace=ns) for vid in page
+                              if legacy_id.fullmatch(vid)]
             except Exception as e:
-                print(f"Warning: Error processing chunk {i}: {str(e)}")
+                if listing_unsupported(e):
+                    return deleted
+                raise
+            if not candidates:
                 continue
-        
-        if vectors:
-            try:
-                self.index.upsert(vectors=vectors)
-            except Exception as e:
-                print(f"Warning: Error upserting vectors to Pinecone: {str(e)}")
+            legacy_ids = [vid for vid, source in self._legacy_sources(candidates, ns).items()
+                          if source and file_identity(source) == identity]
+            if legacy_ids:
+                delete_in_batches(self.index, legacy_ids, ns, self.delete_batch_size)
+                self.lexical_index.remove(legacy_ids)
+                if changes is not None:
+                    changes.add(ns, deleted=legacy_ids)
+                deleted += len(legacy_ids)
+        return deleted
 
-    def stream_pdf_pages(self, file_path: str) -> Iterator[Document]:
+    def stream_pdf_documents(self, file_path: str) -> Iterator[Document]:
         """
-        Stream pages from a PDF file one at a time using pdfplumber.
+        Stream text and table documents from a PDF, one pdfplumber pass per page.
         """
-        try:
-            with pdfplumber.open(file_path) as pdf:
-                total_pages = len(pdf.pages)
-                
-                for page_num, page in enumerate(pdf.pages):
-                    try:
-                        # Extract text with better encoding handling
-                        text = page.extract_text(x_tolerance=2, y_tolerance=2)
-                        if text and text.strip():  # Only yield if there's actual content
-                            yield Document(
-                                page_content=text,
-                                metadata={
-                                    'source': file_path,
-                                    'page': page_num + 1
-                                }
-                            )
-                    except Exception as e:
-                        print(f"Warning: Error extracting text from page {page_num + 1}: {str(e)}")
-                        continue
-                        
-        except Exception as e:
-            print(f"Error opening PDF {file_path}: {str(e)}")
-            return
+        return iter_pdf_documents(file_path)
 
-    def stream_text_file(self, file_path: str, chunk_size: int = 4096) -> Iterator[Document]:
+    def stream_text_file(self, file_path: str, block_size: Optional[int] = None) -> Iterator[Document]:
         """
-        Stream content from a text file in chunks.
+        Stream a text file as chunks, splitting across block boundaries with
+        the configured chunk size and overlap. Decoding switches from UTF-8
+        to latin-1 at the first byte that is not valid UTF-8.
+        """
+        return iter_text_chunks(file_path, self.text_splitter, block_size, chunk_overlap=self.chunk_overlap,
+                                fallback_encoding='latin-1')
+
+    def split_document(self, doc: Document) -> List[Document]:
+        """
+        Split a document into chunks. Documents that already fit one chunk,
+        such as those from ``stream_text_file``, are passed through. If
+        splitting fails, the document's file is marked failed.
         """
         try:
-            with open(file_path, 'r', encoding='utf-8') as file:
-                chunk_num = 0
-                while True:
-                    chunk = file.read(chunk_size)
-                    if not chunk:
-                        break
-                        
-                    if chunk.strip():  # Only yield if there's actual content
-                        yield Document(
-                            page_content=chunk,
-                            metadata={
-                                'source': file_path,
-                                'chunk_num': chunk_num
-                            }
-                        )
-                    chunk_num += 1
-        except UnicodeDecodeError:
-            # Try with a different encoding if UTF-8 fails
-            try:
-                with open(file_path, 'r', encoding='latin-1') as file:
-                    chunk_num = 0
-                    while True:
-                        chunk = file.read(chunk_size)
-                        if not chunk:
-                            break
-                            
-                        if chunk.strip():
-                            yield Document(
-                                page_content=chunk,
-                                metadata={
-                                    'source': file_path,
-                                    'chunk_num': chunk_num
-                                }
-                            )
-                        chunk_num += 1
-            except Exception as e:
-                print(f"Error reading text file {file_path}: {str(e)}")
-                return
+            if len(doc.page_content) <= self.chunk_size:
+                return [doc]
+            return self.text_splitter.split_documents([doc])
+        except Exception as e:
+            file_path = doc.metadata.get('source')
+            print(f"Warning: Error splitting a document of {file_path}: {str(e)}")
+            self._mark_failed(file_path)
+            return []
 
-    def extract_tables_from_pdf(self, file_path: str) -> Iterator[Document]:
+    def iter_documents(self, file_path: str) -> Iterator[Document]:
         """
-        Extract and stream tables from PDF using pdfplumber.
+        Stream the documents (pages, tables or text blocks) of a supported file.
+
+        An error while reading the file marks it failed, like an embedding
+        error, so its old vectors are kept and the next run retries it.
         """
+        if file_path.endswith('.pdf'):
+            documents = self.stream_pdf_documents(file_path)
+        elif file_path.endswith('.txt'):
+            documents = self.stream_text_file(file_path)
+        else:
+            raise ValueError("Unsupported file type. Only PDF and TXT files are supported.")
         try:
-            with pdfplumber.open(file_path) as pdf:
-                for page_num, page in enumerate(pdf.pages):
-                    try:
-                        tables = page.extract_tables()
-                        
-                        for table_idx, table in enumerate(tables):
-                            if not table:  # Skip empty tables
-                                continue
-                                
-                            # Convert table to DataFrame and then to string
-                            df = pd.DataFrame(table[1:], columns=table[0] if table[0] else None)
-                            table_str = df.to_string(index=False)
-                            
-                            if table_str.strip():  # Only yield if there's actual content
-                                yield Document(
-                                    page_content=f"Table {table_idx+1} on Page {page_num+1}:\n{table_str}",
-                                    metadata={
-                                        'source': file_path,
-                                        'type': 'table',
-                                        'page': page_num + 1,
-                                        'table_index': table_idx
-                                    }
-                                )
-                                
-                    except Exception as e:
-                        print(f"Warning: Error extracting tables from page {page_num + 1}: {str(e)}")
-                        continue
-                        
+            yield from documents
         except Exception as e:
-            print(f"Warning: Error extracting tables from PDF: {str(e)}")
+            print(f"Warning: Error extracting {file_path}: {str(e)}")
+            self._mark_failed(file_path)
 
-    def stream_process_documents(self, document_iterator: Iterator[Document], file_path: str,
-                               batch_size: int = 10) -> None:
+    def create_pipeline(self) -> IngestionPipeline:
+        return IngestionPipeline(
+            extract=self.iter_documents,
+            split=self.split_document,
+            embed=self.embed_chunk_batch,
+            upsert=self.upsert_vectors,
+            batch_size=self.ingest_batch_size
+        )
+
+    def load_files(self, file_paths: List[str]) -> List[dict]:
         """
-        Stream process documents in small batches.
+        Ingest several files through the staged pipeline and return its stage statistics.
+
+        Files whose content hash matches the manifest are skipped. For
+        changed files only new chunks are embedded, and vectors of chunks
+        that no longer exist are deleted once the file has been processed.
+        The manifest is keyed by ``file_identity``, so a file reached through
+        different paths is one entry and is ingested once per call.
         """
-        current_batch = []
-        chunk_idx = 0
-        
-        with tqdm(desc="Processing documents") as pbar:
-            for doc in document_iterator:
+        for file_path in file_paths:
+            if not file_path.endswith(('.pdf', '.txt')):
+                raise ValueError("Unsupported file type. Only PDF and TXT files are supported.")
+
+        changed, identities = [], set()
+        changes = VectorChanges()
+        for file_path in file_paths:
+            identity = file_identity(file_path)
+            if identity in identities:
+                continue
+            identities.add(identity)
+            content_hash = file_hash(file_path)
+            record = self.manifest.get_file(identity)
+            if record and record['file_hash'] == content_hash:
+                # Refresh size and mtime so the startup scan stops flagging a touched but unchanged file
+                stat = os.stat(file_path)
+                self.manifest.record_file(identity, stat.st_size, stat.st_mtime, content_hash)
+                print(f"Skipping unchanged file {file_path}")
+                continue
+            if record is None:
                 try:
-                    # Split document into chunks
-                    chunks = self.text_splitter.split_documents([doc])
-                    
-                    for chunk in chunks:
-                        if chunk.page_content.strip():  # Only process non-empty chunks
-                            current_batch.append(chunk)
-                            
-                            # Process batch if it reaches the desired size
-                            if len(current_batch) >= batch_size:
-                                self.process_chunk_batch(current_batch, file_path, chunk_idx)
-                                chunk_idx += len(current_batch)
-                                current_batch = []
-                                pbar.update(1)
-                                
+                    purged = self.purge_legacy_vectors(file_path, changes)
                 except Exception as e:
-                    print(f"Warning: Error processing document: {str(e)}")
+                    # Ingesting now would record the file and never look for its legacy vectors again
+                    print(f"Warning: Skipping {file_path} until its legacy vectors can be purged: {str(e)}")
                     continue
-        
-        # Process any remaining chunks
-        if current_batch:
-            self.process_chunk_batch(current_batch, file_path, chunk_idx)
-            pbar.update(1)
+                if purged:
+                    print(f"Deleted {purged} vectors with legacy ids for {file_path}")
+            # The manifest is the file's vector id registry; entries under another id
+            # (an older id scheme or a moved file) are re-embedded and deleted as stale
+            doc_id = document_id(identity)
+            registry = self.manifest.get_chunks(identity)
+            with self._state_lock:
+                self._file_state[file_path] = {
+                    'hash': content_hash,
+                    'registry': registry,
+                    'existing': {h for h, pairs in registry.items()
+                                 if any(vid == vector_id(doc_id, h) for vid, _ in pairs)},
+                    'seen': set(),
+                    'failed': False,
+                    'changes': changes,
+                }
+            changed.append(file_path)
+        if not changed:
+            return []
+
+        try:
+            stats = self.create_pipeline().run(changed)
+            with self._finish_lock:
+                print(format_stage_stats(stats))
+                cache = get_embedding_cache(self.embedding_model)
+                if cache is not None:
+                    print(f"Embedding cache: {cache.stats()}")
+                for file_path in changed:
+                    self._finish_file(file_path)
+                self.lexical_index.save()
+                self.schedule_context_packs(changes)
+        finally:
+            with self._state_lock:
+                for file_path in changed:
+                    self._file_state.pop(file_path, None)
+        return stats
+
+    def _finish_file(self, file_path: str) -> None:
+        """Delete vectors of chunks that disappeared and record the file as ingested."""
+        state = self._file_state[file_path]
+        if state['failed']:
+            # Keep old vectors and leave the file hash unrecorded so the next run retries
+            print(f"Warning: {file_path} was only partially ingested and will be retried")
+            return
+        doc_id = document_id(file_identity(file_path))
+        stale = [(vid, namespace) for hash_value, pairs in state['registry'].items()
+                 for vid, namespace in pairs
+                 if hash_value not in state['seen'] or vid != vector_id(doc_id, hash_value)]
+        if stale:
+            self.delete_vectors(file_path, stale, state['changes'])
+            print(f"Deleted {len(stale)} stale vectors for {file_path}")
+        stat = os.stat(file_path)
+        self.manifest.record_file(file_identity(file_path), stat.st_size, stat.st_mtime, state['hash'])
+
+    def remove_document(self, file_path: str) -> int:
+        """
+        Delete every vector recorded for a file that no longer exists and
+        forget the file. Returns the number of vectors deleted.
+        """
+        identity = file_identity(file_path)
+        registry = self.manifest.get_chunks(identity)
+        if self.manifest.get_file(identity) is None and not registry:
+            return 0
+        vectors = [pair for pairs in registry.values() for pair in pairs]
+        changes = VectorChanges()
+        with self._finish_lock:
+            self.delete_vectors(file_path, vectors, changes)
+            self.manifest.remove_file(identity)
+            self.lexical_index.save()
+            self.schedule_context_packs(changes)
+        print(f"Removed {len(vectors)} vectors of deleted file {file_path}")
+        return len(vectors)
+
+    def schedule_context_packs(self, changes: VectorChanges) -> None:
+        """
+        Rebuild the context packs of the namespaces a run wrote to in the
+        background, once Pinecone, which is eventually consistent, serves
+        the run's upserts and deletes.
+        """
+        namespaces = changes.namespaces()
+        if namespaces:
+            self.context_packs.schedule_build(self.retriever, namespaces, lambda: changes.visible(self.index))
 
     def load_from_local(self, file_path: str) -> None:
         """
         Load and chunk a document from local storage, then store in Pinecone.
         """
         print(f"Loading document from {file_path}")
-        
-        if file_path.endswith('.pdf'):
-            # Create iterators for both content and tables
-            content_iterator = self.stream_pdf_pages(file_path)
-            table_iterator = self.extract_tables_from_pdf(file_path)
-            
-            # Combine iterators
-            document_iterator = itertools.chain(content_iterator, table_iterator)
-            
-        elif file_path.endswith('.txt'):
-            document_iterator = self.stream_text_file(file_path)
-        else:
-            raise ValueError("Unsupported file type. Only PDF and TXT files are supported.")
-        
-        # Process documents in streaming fashion
-        self.stream_process_documents(document_iterator, file_path)
-        
+        self.load_files([file_path])
         print(f"Document {file_path} loaded and stored in Pinecone.")
 
     def load_data(self, json_data: dict):
@@ -0,0 +1,149 @@
+import os
+import sys
+import threading
+import multiprocessing
+import concurrent.futures
+from collections import deque
+from typing import Iterator, List, Optional
+import pandas as pd
+import pdfplumber
+from langchain.schema import Document
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+from util.envutils import EnvUtils
+
+
+def extract_page(page, file_path: str, page_num: int) -> List[Document]:
+    """
+    Extract the text and the tables of one pdfplumber page in a single pass.
+
+    Both extractions share the page's parsed layout objects, so the page is
+    only analysed once. The text document comes first, followed by one
+    document per non-empty table.
+    """
+    documents = []
+    try:
+        # Extract text with better encoding handling
+        text = page.extract_text(x_tolerance=2, y_tolerance=2)
+        if text and text.strip():  # Only keep pages with actual content
+            documents.append(Document(
+                page_content=text,
+                metadata={
+                    'source': file_path,
+                    'page': page_num + 1
+                }
+            ))
+    except Exception as e:
+        print(f"Warning: Error extracting text from page {page_num + 1}: {str(e)}")
+
+    try:
+        for table_idx, table in enumerate(page.extract_tables()):
+            if not table:  # Skip empty tables
+                continue
+
+            # Convert table to DataFrame and then to string
+            df = pd.DataFrame(table[1:], columns=table[0] if table[0] else None)
+            table_str = df.to_string(index=False)
+
+            if table_str.strip():
+                documents.append(Document(
+                    page_content=f"Table {table_idx+1} on Page {page_num+1}:\n{table_str}",
+                    metadata={
+                        'source': file_path,
+                        'type': 'table',
+                        'page': page_num + 1,
+                        'table_index': table_idx
+                    }
+                ))
+    except Exception as e:
+        print(f"Warning: Error extracting tables from page {page_num + 1}: {str(e)}")
+    return documents
+
+
+def iter_page_range(file_path: str, start: int, end: int) -> Iterator[Document]:
+    """
+    Stream the documents of pages ``[start, end)`` of a PDF.
+
+    The PDF is opened for just this range and every page's cached layout
+    objects are released as soon as the page has been extracted, so memory
+    depends on the window size rather than on the document length.
+    """
+    with pdfplumber.open(file_path, pages=list(range(start + 1, end + 1))) as pdf:
+        for offset, page in enumerate(pdf.pages):
+            try:
+                documents = extract_page(page, file_path, start + offset)
+            finally:
+                page.close()
+            yield from documents
+
+
+def extract_page_range(file_path: str, start: int, end: int) -> List[Document]:
+    """
+    Extract pages ``[start, end)`` of a PDF. Runs inside pool worker processes.
+    """
+    return list(iter_page_range(file_path, start, end))
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool(processes: int) -> concurrent.futures.ProcessPoolExecutor:
+    """Shared page extraction pool, created on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Spawned workers avoid forking a parent that holds model threads
+            _pool = concurrent.futures.ProcessPoolExecutor(
+                max_workers=processes, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def iter_pdf_documents(file_path: str, processes: Optional[int] = None,
+                       pages_per_task: Optional[int] = None,
+                       parallel_min_pages: Optional[int] = None,
+                       page_window: Optional[int] = None) -> Iterator[Document]:
+    """
+    Stream the text and table documents of a PDF in page order.
+
+    Small PDFs are parsed page by page in this process, reopening the file
+    every ``page_window`` pages so that pdfplumber's per-document caches are
+    dropped along with the page caches. PDFs with at least
+    ``parallel_min_pages`` pages are split into ranges of ``pages_per_task``
+    pages that are parsed by a process pool; results are yielded strictly
+    in range order, with at most two ranges per worker in flight, so the
+    output is deterministic and memory stays bounded. A PDF that cannot be
+    opened or a page range that fails raises, so callers never mistake a
+    partial extraction for the whole document.
+    """
+    env_utils = EnvUtils()
+    processes = int(processes or env_utils.get_env("PDF_EXTRACT_PROCESSES", min(4, os.cpu_count() or 1)))
+    pages_per_task = int(pages_per_task or env_utils.get_env("PDF_PAGES_PER_TASK", 25))
+    parallel_min_pages = int(parallel_min_pages or env_utils.get_env("PDF_PARALLEL_MIN_PAGES", 50))
+    page_window = int(page_window or env_utils.get_env("PDF_PAGE_WINDOW", 100))
+
+    with pdfplumber.open(file_path) as pdf:
+        total_pages = len(pdf.pages)
+
+    if processes <= 1 or total_pages < parallel_min_pages:
+        for start in range(0, total_pages, page_window):
+            yield from iter_page_range(file_path, start, min(start + page_window, total_pages))
+        return
+
+    pool = _get_pool(processes)
+    ranges = deque((start, start + pages_per_task) for start in range(0, total_pages, pages_per_task))
+    in_flight = deque()
+    while ranges or in_flight:
+        while ranges and len(in_flight) < processes * 2:
+            start, end = ranges.popleft()
+            in_flight.append((start, pool.submit(extract_page_range, file_path, start, end)))
+        start, future = in_flight.popleft()
+        try:
+            documents = future.result()
+        except Exception as e:
+            for _, pending in in_flight:
+                pending.cancel()
+            raise RuntimeError(f"Error extracting pages {start + 1}-{start + pages_per_task} of {file_path}: "
+                               f"{str(e)}") from e
+        yield from documents
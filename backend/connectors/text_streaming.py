@@ -0,0 +1,84 @@
+import os
+import sys
+import codecs
+from typing import Iterator, Optional
+from langchain.schema import Document
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+from util.envutils import EnvUtils
+
+
+def _decode_block(decoder, raw: bytes, fallback_encoding: Optional[str]):
+    """
+    Decode the next block of bytes and return ``(text, decoder)``. On the
+    first invalid byte the rest of the file is decoded with
+    ``fallback_encoding``, from exactly that byte on.
+    """
+    try:
+        return decoder.decode(raw, final=not raw), decoder
+    except UnicodeDecodeError as e:
+        if fallback_encoding is None:
+            raise
+        # e.object holds the bytes the decoder kept from the previous block followed by this block
+        decoder = codecs.getincrementaldecoder(fallback_encoding)()
+        return e.object[:e.start].decode(e.encoding) + decoder.decode(e.object[e.start:], final=not raw), decoder
+
+
+def iter_text_chunks(file_path: str, text_splitter, block_size: Optional[int] = None,
+                     encoding: str = 'utf-8', chunk_overlap: int = 0,
+                     fallback_encoding: Optional[str] = None) -> Iterator[Document]:
+    """
+    Split a text file into chunks while reading it block by block.
+
+    Each block is appended to the text carried over from the previous one
+    and split with ``text_splitter``. Every chunk except the last is
+    emitted; the last chunk may continue in the next block, so the text from
+    its start onwards is carried over and split again. Chunk sizes and
+    overlaps therefore follow the splitter's settings across the whole
+    file, not per block, while memory stays at one block plus one chunk.
+
+    The splitter's chunks are exact, whitespace-stripped substrings of the
+    text, so the last chunk ends where the stripped buffer ends and the
+    carry starts ``len(last)`` characters before that. ``chunk_overlap``,
+    the splitter's overlap, bounds where each chunk's ``start_index`` is
+    looked up: at most that far back from the end of the previous chunk.
+
+    Blocks are ``block_size`` bytes. With ``fallback_encoding`` a byte that
+    is invalid in ``encoding`` switches decoding to the fallback from that
+    byte on, so the text decoded so far and its chunks stay as they are.
+    """
+    block_size = int(block_size or EnvUtils().get_env("TEXT_STREAM_BLOCK_SIZE", 65536))
+    chunk_num = 0
+    offset = 0  # file position (in characters) of the start of the carried text
+    carry = ""
+    decoder = codecs.getincrementaldecoder(encoding)()
+    with open(file_path, 'rb') as file:
+        while True:
+            raw = file.read(block_size)
+            block, decoder = _decode_block(decoder, raw, fallback_encoding)
+            buffer = carry + block
+            chunks = text_splitter.split_text(buffer)
+            if raw:
+                # Keep the last chunk back, it may grow with the next block
+                chunks, last = chunks[:-1], (chunks[-1] if chunks else None)
+            start, end = -1, 0
+            for chunk in chunks:
+                # A chunk starts after the previous chunk's start and overlaps at most chunk_overlap of it
+                found = buffer.find(chunk, max(start + 1, end - chunk_overlap))
+                start = found if found >= 0 else end
+                end = start + len(chunk)
+                yield Document(
+                    page_content=chunk,
+                    metadata={
+                        'source': file_path,
+                        'chunk_num': chunk_num,
+                        'start_index': offset + start
+                    }
+                )
+                chunk_num += 1
+            if not raw:
+                return
+            carry_start = len(buffer) if last is None else len(buffer.rstrip()) - len(last)
+            carry = buffer[carry_start:]
+            offset += carry_start
@@ -0,0 +1,86 @@
+import os
+import hashlib
+import threading
+from typing import Dict, Iterable, List, Set
+
+
+def document_id(identity: str) -> str:
+    """
+    Stable short id for a document identity (a resolved file path or a
+    Confluence ``space/page`` key), used as the prefix of its vector ids.
+    """
+    return hashlib.sha1(identity.encode("utf-8")).hexdigest()[:16]
+
+
+def file_identity(file_path: str) -> str:
+    """Identity of a local file: its resolved absolute path."""
+    return os.path.realpath(file_path)
+
+
+def vector_id(doc_id: str, content_hash: str) -> str:
+    """Vector id of a chunk: document id plus chunk content hash."""
+    return f"{doc_id}_{content_hash[:24]}"
+
+
+def listing_unsupported(error: Exception) -> bool:
+    """
+    Whether listing ids by prefix failed because the index does not support
+    it: Pinecone answers 400 for pod-based indexes, as listing needs a
+    serverless index.
+    """
+    status = getattr(error, "status", None) or getattr(error, "status_code", None)
+    message = str(error).lower()
+    return str(status) == "400" and ("serverless" in message or "not supported" in message)
+
+
+def delete_in_batches(index, ids: List[str], namespace: str = "", batch_size: int = 1000) -> int:
+    """
+    Delete vector ids with as few calls as the index allows (Pinecone
+    accepts up to 1000 ids per delete). Returns the number of calls made.
+    """
+    calls = 0
+    for start in range(0, len(ids), batch_size):
+        index.delete(ids=ids[start:start + batch_size], namespace=namespace)
+        calls += 1
+    return calls
+
+
+class VectorChanges:
+    """
+    Vector ids written and deleted per namespace by one ingestion run, used
+    to wait until the index serves them before building context packs.
+    """
+
+    def __init__(self):
+        self.written: Dict[str, List[str]] = {}
+        self.deleted: Dict[str, List[str]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, namespace: str, written: Iterable[str] = (), deleted: Iterable[str] = ()) -> None:
+        with self._lock:
+            self.written.setdefault(namespace, []).extend(written)
+            self.deleted.setdefault(namespace, []).extend(deleted)
+
+    def namespaces(self) -> Set[str]:
+        with self._lock:
+            return {ns for ns in set(self.written) | set(self.deleted) if self.written[ns] or self.deleted[ns]}
+
+    def visible(self, index, sample: int = 100) -> bool:
+        """
+        Whether ``index.fetch`` returns the last ``sample`` written ids and
+        none of the last ``sample`` deleted ids of every namespace. Indexes
+        without ``fetch`` are taken as consistent.
+        """
+        if not hasattr(index, 'fetch'):
+            return True
+        with self._lock:
+            checks = [(ns, self.written[ns][-sample:], self.deleted[ns][-sample:]) for ns in self.written]
+        for namespace, written, deleted in checks:
+            ids = written + deleted
+            if not ids:
+                continue
+            response = index.fetch(ids=ids, namespace=namespace)
+            found = response.vectors if hasattr(response, 'vectors') else response.get('vectors', {})
+            if any(vid not in found for vid in written) or any(vid in found for vid in deleted):
+                return False
+        return True
@@ -0,0 +1,199 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+import concurrent.futures
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+from util.envutils import EnvUtils
+
+DEFAULT_DEAD_LETTER_PATH = os.path.join(parent_dir, "data", "upsert_dead_letter.jsonl")
+# Rough JSON size of one float value plus separator, used to size batches without serialising them
+BYTES_PER_VALUE = 20
+TRANSIENT_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+TRANSIENT_ERROR_NAMES = ("Timeout", "Connection", "ProtocolError", "MaxRetryError", "ServiceException",
+                         "Unavailable")
+
+
+def vector_size(vector: Tuple[str, List[float], Dict[str, Any]]) -> int:
+    """Estimated request bytes of one ``(id, values, metadata)`` vector."""
+    vector_id, values, metadata = vector
+    return len(vector_id) + BYTES_PER_VALUE * len(values) + len(json.dumps(metadata, default=str))
+
+
+def is_transient(error: Exception) -> bool:
+    """Whether an upsert error is worth retrying (throttling, server errors, network failures)."""
+    status = getattr(error, "status", None) or getattr(error, "status_code", None)
+    if status is not None:
+        try:
+            return int(status) in TRANSIENT_STATUS_CODES
+        except (TypeError, ValueError):
+            pass
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    return any(name in type(error).__name__ for name in TRANSIENT_ERROR_NAMES)
+
+
+class VectorUpsertWriter:
+    """
+    Upserts vectors in payload-sized batches sent concurrently, with retries.
+
+    Batches are cut at ``max_batch_bytes`` (estimated request size) or
+    ``max_batch_vectors``, whichever comes first, and sent by a shared pool of
+    ``concurrency`` threads. Transient errors are retried with exponential
+    backoff and jitter; batches that still fail are appended to a JSONL
+    dead-letter file, from which ``replay_dead_letters`` re-sends them.
+    """
+
+    def __init__(self, index, max_batch_bytes: Optional[int] = None, max_batch_vectors: Optional[int] = None,
+                 concurrency: Optional[int] = None, max_retries: Optional[int] = None,
+                 backoff_seconds: Optional[float] = None, dead_letter_path: Optional[str] = None):
+        env_utils = EnvUtils()
+        self.index = index
+        # Pinecone accepts at most 2 MB and 1000 vectors per upsert request
+        self.max_batch_bytes = int(max_batch_bytes or env_utils.get_env("VECTOR_UPSERT_MAX_BYTES", 2 * 1024 * 1024))
+        self.max_batch_vectors = int(max_batch_vectors or env_utils.get_env("VECTOR_UPSERT_MAX_VECTORS", 1000))
+        self.concurrency = int(concurrency or env_utils.get_env("VECTOR_UPSERT_CONCURRENCY", 4))
+        self.max_retries = int(max_retries if max_retries is not None
+                               else env_utils.get_env("VECTOR_UPSERT_RETRIES", 5))
+        self.backoff_seconds = float(backoff_seconds or env_utils.get_env("VECTOR_UPSERT_BACKOFF_SECONDS", 0.5))
+        self.dead_letter_path = dead_letter_path or env_utils.get_env("VECTOR_DEAD_LETTER_PATH",
+                                                                      DEFAULT_DEAD_LETTER_PATH)
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.concurrency,
+                                                               thread_name_prefix="vector-upsert")
+        self._lock = threading.Lock()
+        self.stats = {"batches": 0, "vectors": 0, "retries": 0, "failed_batches": 0, "failed_vectors": 0,
+                      "upsert_seconds": 0.0}
+
+    def batches(self, vectors: Sequence[tuple]) -> List[List[tuple]]:
+        """Split vectors into batches within the byte and count limits."""
+        batches, batch, batch_bytes = [], [], 0
+        for vector in vectors:
+            size = vector_size(vector)
+            if batch and (batch_bytes + size > self.max_batch_bytes or len(batch) >= self.max_batch_vectors):
+                batches.append(batch)
+                batch, batch_bytes = [], 0
+            batch.append(vector)
+            batch_bytes += size
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def _send(self, batch: List[tuple], namespace: str) -> None:
+        """Send one batch, retrying transient errors with exponential backoff."""
+        attempt = 0
+        while True:
+            started = time.perf_counter()
+            try:
+                self.index.upsert(vectors=batch, namespace=namespace)
+                with self._lock:
+                    self.stats["batches"] += 1
+                    self.stats["vectors"] += len(batch)
+                    self.stats["upsert_seconds"] += time.perf_counter() - started
+                return
+            except Exception as e:
+                if attempt >= self.max_retries or not is_transient(e):
+                    raise
+                with self._lock:
+                    self.stats["retries"] += 1
+                delay = self.backoff_seconds * (2 ** attempt)
+                time.sleep(delay + random.uniform(0, delay / 2))
+                attempt += 1
+
+    def upsert(self, vectors: Sequence[tuple], namespace: str = "", source: Optional[str] = None) -> List[str]:
+        """
+        Upsert vectors and return the ids that were written.
+
+        Batches that fail after all retries are dead-lettered together with
+        ``source`` (the file or page they came from) and their ids are left
+        out of the result.
+        """
+        futures = {self._executor.submit(self._send, batch, namespace): batch
+                   for batch in self.batches(vectors)}
+        written = []
+        for future in concurrent.futures.as_completed(futures):
+            batch = futures[future]
+            try:
+                future.result()
+                written.extend(vector[0] for vector in batch)
+            except Exception as e:
+                print(f"Warning: Upsert of {len(batch)} vectors to namespace '{namespace}' failed: {str(e)}")
+                self.dead_letter(batch, namespace, source, e)
+        return written
+
+    def dead_letter(self, batch: List[tuple], namespace: str, source: Optional[str], error: Exception) -> None:
+        """Append a failed batch to the dead-letter file."""
+        record = {
+            "namespace": namespace,
+            "source": source,
+            "error": str(error),
+            "failed_at": time.time(),
+            "vectors": [[vector_id, list(values), metadata] for vector_id, values, metadata in batch],
+        }
+        with self._lock:
+            self.stats["failed_batches"] += 1
+            self.stats["failed_vectors"] += len(batch)
+            os.makedirs(os.path.dirname(os.path.abspath(self.dead_letter_path)), exist_ok=True)
+            with open(self.dead_letter_path, "a") as f:
+                f.write(json.dumps(record, default=str) + "\n")
+
+    def replay_dead_letters(self) -> Dict[str, int]:
+        """
+        Re-send every dead-lettered batch.
+
+        The dead-letter file is first renamed to ``<path>.replaying``, so
+        batches that fail again, and any dead-lettered meanwhile, go to a
+        fresh dead-letter file through ``upsert``. The ``.replaying`` file is
+        deleted only once all of its batches were re-sent; one left behind by
+        an interrupted replay is picked up by the next. Re-sending a batch
+        twice is harmless, as upserts overwrite vectors by id.
+        """
+        replaying_path = f"{self.dead_letter_path}.replaying"
+        with self._lock:
+            if os.path.exists(self.dead_letter_path):
+                if os.path.exists(replaying_path):
+                    # Replay the leftover of an interrupted replay together with the new failures
+                    with open(self.dead_letter_path, "r") as src, open(replaying_path, "a") as dst:
+                        dst.write(src.read())
+                    os.remove(self.dead_letter_path)
+                else:
+                    os.replace(self.dead_letter_path, replaying_path)
+            if not os.path.exists(replaying_path):
+                return {"replayed": 0, "remaining": 0}
+        with open(replaying_path, "r") as f:
+            records = [json.loads(line) for line in f if line.strip()]
+        replayed = 0
+        for record in records:
+            vectors = [tuple(vector) for vector in record["vectors"]]
+            replayed += len(self.upsert(vectors, record["namespace"], record.get("source")))
+        os.remove(replaying_path)
+        remaining = 0
+        if os.path.exists(self.dead_letter_path):
+            with open(self.dead_letter_path, "r") as f:
+                remaining = sum(len(json.loads(line)["vectors"]) for line in f if line.strip())
+        return {"replayed": replayed, "remaining": remaining}
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay dead-lettered vector upserts")
+    parser.add_argument("--path", default=None, help="dead-letter file")
+    args = parser.parse_args()
+    from pinecone import Pinecone
+    env_utils = EnvUtils()
+    index = Pinecone(api_key=env_utils.get_required_env("PINECONE_API_KEY")).Index(
+        env_utils.get_required_env("PINECONE_INDEX"))
+    writer = VectorUpsertWriter(index, dead_letter_path=args.path)
+    print(json.dumps(writer.replay_dead_letters()))
+    writer.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+import os
+import random
+import argparse
+from typing import Dict, List
+
+# Vocabulary for compliance-style filler text
+SUBJECTS = ['The customer', 'The account holder', 'A corporate client', 'The beneficiary', 'The remitter',
+            'An intermediary account', 'The branch', 'The investigator']
+ACTIONS = ['made several cash deposits', 'initiated a wire transfer', 'received funds', 'moved funds',
+           'opened a new account', 'reported unusual activity', 'requested a large withdrawal',
+           'exchanged currency into crypto assets']
+DETAILS = ['just below the reporting threshold', 'to an offshore jurisdiction', 'through multiple branches',
+           'within the same business day', 'from a high risk country', 'without a clear business purpose',
+           'shortly after account opening', 'via a chain of intermediary accounts']
+FOLLOW_UPS = ['This pattern is consistent with structuring.', 'Escalate the case for enhanced due diligence.',
+              'Review the KYC profile and source of funds.', 'File a suspicious activity report if confirmed.',
+              'Layering through shell companies should be considered.', 'No further action is required.']
+TABLE_HEADER = ['Date', 'Account', 'Type', 'Amount', 'Country']
+TRANSACTION_TYPES = ['Cash Deposit', 'Wire Transfer', 'Card Payment', 'Crypto Exchange']
+COUNTRIES = ['USA', 'UK', 'Germany', 'Singapore', 'UAE', 'Cayman Islands', 'Panama']
+
+
+def synthetic_sentence(rng: random.Random) -> str:
+    return (f"{rng.choice(SUBJECTS)} {rng.choice(ACTIONS)} {rng.choice(DETAILS)} "
+            f"amounting to {rng.randint(1, 99) * 100} USD. {rng.choice(FOLLOW_UPS)}")
+
+
+def synthetic_paragraph(rng: random.Random, sentences: int = 5) -> str:
+    return " ".join(synthetic_sentence(rng) for _ in range(sentences))
+
+
+def synthetic_table(rng: random.Random, rows: int) -> List[List[str]]:
+    table = [TABLE_HEADER]
+    for _ in range(rows):
+        table.append([f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}", f"AC{rng.randint(10000, 99999)}",
+                      rng.choice(TRANSACTION_TYPES), str(rng.randint(1, 500) * 100), rng.choice(COUNTRIES)])
+    return table
+
+
+def _pdf_string(text: str) -> str:
+    return "(" + text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") + ")"
+
+
+def _page_content(rng: random.Random, lines: int, tables: int, table_rows: int) -> bytes:
+    """Content stream of one letter page: wrapped text lines, then ruled tables."""
+    ops = ["BT /F1 10 Tf 12 TL 50 750 Td"]
+    words = " ".join(synthetic_sentence(rng) for _ in range(lines)).split()
+    line, written = [], 0
+    for word in words:
+        line.append(word)
+        if len(" ".join(line)) > 95:
+            ops.append(f"{_pdf_string(' '.join(line))} Tj T*")
+            line, written = [], written + 1
+            if written >= lines:
+                break
+    if line and written < lines:
+        ops.append(f"{_pdf_string(' '.join(line))} Tj T*")
+    ops.append("ET")
+
+    top = 740 - 12 * lines - 20
+    col_width, row_height = 100, 16
+    for _ in range(tables):
+        table = synthetic_table(rng, table_rows)
+        height = row_height * len(table)
+        if top - height < 40:
+            break
+        width = col_width * len(TABLE_HEADER)
+        # Ruling lines so that pdfplumber's lattice detection finds the table
+        for r in range(len(table) + 1):
+            ops.append(f"50 {top - r * row_height} m {50 + width} {top - r * row_height} l S")
+        for c in range(len(TABLE_HEADER) + 1):
+            ops.append(f"{50 + c * col_width} {top} m {50 + c * col_width} {top - height} l S")
+        for r, row in enumerate(table):
+            for c, cell in enumerate(row):
+                ops.append(f"BT /F1 8 Tf {54 + c * col_width} {top - (r + 1) * row_height + 5} Td "
+                           f"{_pdf_string(cell)} Tj ET")
+        top -= height + 24
+    return "\n".join(ops).encode("latin-1")
+
+
+def write_pdf(path: str, pages: int, lines_per_page: int = 30, tables_per_page: int = 1,
+              table_rows: int = 8, seed: int = 0) -> str:
+    """
+    Write a PDF of ``pages`` letter pages with text and ruled tables.
+
+    The file is assembled by hand (objects, xref table and trailer) so that
+    no PDF library is needed to generate benchmark input.
+    """
+    rng = random.Random(seed)
+    objects: List[bytes] = []
+
+    def add(body: bytes) -> int:
+        objects.append(body)
+        return len(objects)
+
+    font = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+    pages_ref = add(b"")
+    kids = []
+    for _ in range(pages):
+        content = _page_content(rng, lines_per_page, tables_per_page, table_rows)
+        stream = add(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(content), content))
+        kids.append(add(b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 612 792] "
+                        b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>" % (pages_ref, font, stream)))
+    objects[pages_ref - 1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % kid for kid in kids), len(kids))
+    catalog = add(b"<< /Type /Catalog /Pages %d 0 R >>" % pages_ref)
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(b"%PDF-1.4\n")
+        offsets = []
+        for number, body in enumerate(objects, 1):
+            offsets.append(f.tell())
+            f.write(b"%d 0 obj\n%s\nendobj\n" % (number, body))
+        xref = f.tell()
+        f.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+        f.write(b"".join(b"%010d 00000 n \n" % offset for offset in offsets))
+        f.write(b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, catalog, xref))
+    return path
+
+
+def write_txt(path: str, size_kb: int, seed: int = 0) -> str:
+    """Write a text export of roughly ``size_kb`` kilobytes in paragraphs, streamed to disk."""
+    rng = random.Random(seed)
+    target = size_kb * 1024
+    written = 0
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        while written < target:
+            paragraph = synthetic_paragraph(rng, rng.randint(2, 8)) + "\n\n"
+            f.write(paragraph)
+            written += len(paragraph)
+    return path
+
+
+def generate_corpus(directory: str, pdfs: int = 4, pages_per_pdf: int = 20, txts: int = 4, txt_kb: int = 256,
+                    tables_per_page: int = 1, seed: int = 0) -> Dict[str, List[str]]:
+    """Generate PDF and TXT benchmark documents and return their paths by type."""
+    corpus = {"pdf": [], "txt": [], "pdf_pages": pdfs * pages_per_pdf}
+    for i in range(pdfs):
+        corpus["pdf"].append(write_pdf(os.path.join(directory, f"synthetic_report_{i}.pdf"), pages_per_pdf,
+                                       tables_per_page=tables_per_page, seed=seed + i))
+    for i in range(txts):
+        corpus["txt"].append(write_txt(os.path.join(directory, f"synthetic_export_{i}.txt"), txt_kb,
+                                       seed=seed + 1000 + i))
+    return corpus
+
+
+# Example usage
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic PDF and TXT documents for ingestion runs")
+    parser.add_argument("directory")
+    parser.add_argument("--pdfs", type=int, default=4)
+    parser.add_argument("--pages", type=int, default=20, help="pages per PDF")
+    parser.add_argument("--tables", type=int, default=1, help="tables per PDF page")
+    parser.add_argument("--txts", type=int, default=4)
+    parser.add_argument("--txt-kb", type=int, default=256, help="size of each TXT file")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    corpus = generate_corpus(args.directory, args.pdfs, args.pages, args.txts, args.txt_kb, args.tables, args.seed)
+    print(f"Wrote {len(corpus['pdf'])} PDFs ({corpus['pdf_pages']} pages) and {len(corpus['txt'])} TXT files "
+          f"to {args.directory}")
@@ -5,41 +5,247 @@ if parent_dir not in sys.path:
     sys.path.insert(0, parent_dir)
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
-from connectors.local_file_system_connector import LocalFileSystemConnector
 from connectors.data_loader import DataLoader
+from connectors.vector_ids import file_identity
+from util.envutils import EnvUtils
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+import queue
+import threading
 import time
 
+SUPPORTED_EXTENSIONS = ('.pdf', '.txt')
+
+
+def file_signature(file_path: str) -> Optional[Tuple[int, float]]:
+    """``(size, mtime)`` of a file, or None if it no longer exists."""
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime
+
+
+class IngestionQueue:
+    """
+    Debounced, coalescing queue of file paths processed by a fixed pool of worker threads.
+
+    A path is handed to a worker only after no event arrived for it for
+    ``debounce_seconds`` and its size and mtime stopped changing, so files
+    that are still being copied are not parsed half-written. Repeated events
+    for a pending path collapse into one job; an event for a path that is
+    being processed schedules exactly one follow-up run. Paths that no
+    longer exist are dispatched too, so ``process`` can remove them.
+    """
+
+    def __init__(self, process: Callable[[str], None], debounce_seconds: Optional[float] = None,
+                 workers: Optional[int] = None):
+        env_utils = EnvUtils()
+        self.process = process
+        self.debounce_seconds = float(debounce_seconds if debounce_seconds is not None
+                                      else env_utils.get_env("WATCH_DEBOUNCE_SECONDS", 2.0))
+        self.worker_count = max(1, int(workers or env_utils.get_env("WATCH_WORKERS", 2)))
+        # path -> (due time, signature seen when the timer was armed)
+        self._pending: Dict[str, Tuple[float, Optional[Tuple[int, float]]]] = {}
+        self._in_progress = set()
+        self._rerun = set()
+        self._ready: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._condition = threading.Condition()
+        self._stopped = False
+        self._threads: List[threading.Thread] = []
+
+    def submit(self, file_path: str) -> None:
+        """Schedule a path, restarting its debounce timer."""
+        with self._condition:
+            if file_path in self._in_progress:
+                self._rerun.add(file_path)
+                return
+            self._pending[file_path] = (time.monotonic() + self.debounce_seconds, file_signature(file_path))
+            self._condition.notify()
+
+    def pending(self) -> int:
+        with self._condition:
+            return len(self._pending) + len(self._in_progress) + len(self._rerun)
+
+    def start(self) -> None:
+        self._threads.append(threading.Thread(target=self._dispatch, name="watch-dispatcher", daemon=True))
+        for i in range(self.worker_count):
+            self._threads.append(threading.Thread(target=self._work, name=f"watch-worker-{i}", daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self) -> None:
+        """Stop dispatching; workers finish their current file and exit."""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        for _ in range(self.worker_count):
+            self._ready.put(None)
+        for thread in self._threads:
+            thread.join()
+
+    def _dispatch(self) -> None:
+        with self._condition:
+            while not self._stopped:
+                now = time.monotonic()
+                for file_path, (due, signature) in list(self._pending.items()):
+                    if due > now:
+                        continue
+                    current = file_signature(file_path)
+                    if current != signature:
+                        # Still being written: wait another debounce interval
+                        self._pending[file_path] = (now + self.debounce_seconds, current)
+                        continue
+                    del self._pending[file_path]
+                    self._in_progress.add(file_path)
+                    self._ready.put(file_path)
+                next_due = min((due for due, _ in self._pending.values()), default=None)
+                self._condition.wait(None if next_due is None else max(next_due - now, 0.05))
+
+    def _work(self) -> None:
+        while True:
+            file_path = self._ready.get()
+            if file_path is None:
+                break
+            try:
+                self.process(file_path)
+            except Exception as e:
+                print(f"Error ingesting {file_path}: {str(e)}")
+            finally:
+                with self._condition:
+                    self._in_progress.discard(file_path)
+                    rerun = file_path in self._rerun
+                    self._rerun.discard(file_path)
+                if rerun:
+                    self.submit(file_path)
+
+
 class FolderWatchHandler(FileSystemEventHandler):
-    def __init__(self):
-        pass
+    """
+    Submit supported files to the ingestion queue when they are created,
+    modified, deleted or moved anywhere below the watched folder.
+    """
+    def __init__(self, ingestion_queue: IngestionQueue, manifest=None):
+        self.ingestion_queue = ingestion_queue
+        self.manifest = manifest
+
+    def _submit(self, file_path: str) -> None:
+        if file_path.endswith(SUPPORTED_EXTENSIONS):
+            self.ingestion_queue.submit(file_path)
+
+    def _submit_tree(self, directory: str) -> None:
+        """Submit every file known below a directory and every file now in it."""
+        prefix = os.path.join(file_identity(directory), "")
+        known = self.manifest.list_files(prefix) if self.manifest is not None else {}
+        for file_path in set(known) | {file_identity(path) for path in iter_supported_files(directory)}:
+            self._submit(file_path)
 
     def on_created(self, event):
         if not event.is_directory:
             print(f"New file detected: {event.src_path}")
-            file_path = event.src_path
-            test_data = {
-                "source": "local_filesystem",
-                "data_id": file_path,
-                "metadata": {
-                    "timestamp": "2024-01-28T12:00:00",
-                    "space": ""
-                }
+            self._submit(event.src_path)
+        else:
+            # Files copied in together with a new folder may predate its watch
+            self._submit_tree(event.src_path)
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self._submit(event.src_path)
+
+    def on_deleted(self, event):
+        if not event.is_directory:
+            print(f"File deleted: {event.src_path}")
+            self._submit(event.src_path)
+        else:
+            self._submit_tree(event.src_path)
+
+    def on_moved(self, event):
+        print(f"Moved: {event.src_path} -> {event.dest_path}")
+        if not event.is_directory:
+            self._submit(event.src_path)
+            self._submit(event.dest_path)
+        else:
+            self._submit_tree(event.src_path)
+            self._submit_tree(event.dest_path)
+
+
+def iter_supported_files(directory: str) -> Iterator[str]:
+    """Absolute paths of supported files below a directory."""
+    for root, _, files in os.walk(directory):
+        for name in files:
+            if name.endswith(SUPPORTED_EXTENSIONS):
+                yield os.path.join(root, name)
+
+
+def reconcile_folder(monitor_path: str, manifest, ingestion_queue: IngestionQueue) -> Dict[str, int]:
+    """
+    Enqueue what changed in a folder while nobody was watching.
+
+    Files are compared with the manifest, which is keyed by
+    ``file_identity``, by size and mtime only; files that are new or differ
+    are enqueued (and hashed during ingestion, which still skips files whose
+    content did not change). Manifest entries whose file is gone are
+    enqueued for removal.
+    """
+    known = manifest.list_files(os.path.join(file_identity(monitor_path), ""))
+    counts = {"scanned": 0, "new": 0, "changed": 0, "deleted": 0}
+    for file_path in iter_supported_files(monitor_path):
+        file_path = file_identity(file_path)
+        counts["scanned"] += 1
+        record = known.pop(file_path, None)
+        if record is None:
+            counts["new"] += 1
+        elif tuple(record) != file_signature(file_path):
+            counts["changed"] += 1
+        else:
+            continue
+        ingestion_queue.submit(file_path)
+    for file_path in known:
+        if not os.path.exists(file_path):
+            counts["deleted"] += 1
+            ingestion_queue.submit(file_path)
+    return counts
+
+
+def create_local_ingestion_queue(connector) -> IngestionQueue:
+    """
+    Ingestion queue whose workers share one long-lived local file system
+    connector, so the embedding model and clients are loaded once.
+    """
+    def process(file_path: str) -> None:
+        if not os.path.exists(file_path):
+            connector.remove_document(file_path)
+            return
+        connector.load_data({
+            "source": "local_filesystem",
+            "data_id": file_path,
+            "metadata": {
+                "timestamp": datetime.now().isoformat(),
+                "space": ""
             }
-            print(test_data)
-            loader = DataLoader()
-            result = loader.load_data(test_data)
+        })
+
+    return IngestionQueue(process)
 
 
 def start_folder_watcher(monitor_path):
+    # Resolved like manifest keys, so watcher events and scans name files the same way
+    monitor_path = file_identity(monitor_path)
     print(f"Starting folder watcher for path: {monitor_path}")
-    event_handler = FolderWatchHandler()
+    connector = DataLoader().get_connector("local_filesystem")
+    ingestion_queue = create_local_ingestion_queue(connector)
+    ingestion_queue.start()
+    event_handler = FolderWatchHandler(ingestion_queue, connector.manifest)
     observer = Observer()
-    observer.schedule(event_handler, path=monitor_path, recursive=False)
+    observer.schedule(event_handler, path=monitor_path, recursive=True)
     observer.start()
+    # Scan after the observer started so nothing that changes during the scan is missed
+    print(f"Startup scan: {reconcile_folder(monitor_path, connector.manifest, ingestion_queue)}")
 
     try:
         while True:
             time.sleep(1)
     except KeyboardInterrupt:
         observer.stop()
-    observer.join()
\ No newline at end of file
+    observer.join()
+    ingestion_queue.stop()
@@ -1,8 +1,19 @@
 import xgboost as xgb
 import pandas as pd
+import numpy as np
 import json
 import os
 
+# Fixed label set of the trained model, indexed by predicted class
+FRAUD_LABELS = [
+    "Legitimate Transaction",
+    "Frequent Offshore Transfers",
+    "Layering",
+    "Structuring",
+    "Rapid In-Out",
+    "Large Wire Transfer",
+]
+
 class FraudDetectionAgent:
     def __init__(self, model_path="fraud_detection_model_new.bin"):
         """Load the trained fraud detection model."""
@@ -10,14 +21,7 @@ class FraudDetectionAgent:
         current_dir = os.path.dirname(os.path.abspath(__file__))
         model_path = os.path.join(current_dir, "fraud_detection_model_new.bin")
         self.model.load_model(model_path)
-        self.fraud_labels = [
-            "Legitimate Transaction",
-            "Frequent Offshore Transfers",
-            "Layering",
-            "Structuring",
-            "Rapid In-Out",
-            "Large Wire Transfer",
-        ]
+        self.fraud_labels = list(FRAUD_LABELS)
 
     def preprocess_transaction(self, transaction):
         """Convert transaction details into model input format."""
@@ -46,12 +50,30 @@ class FraudDetectionAgent:
 
         return predicted_label
 
+    def predict_with_confidence(self, transactions):
+        """
+        Predict the fraud type of every transaction in one model call.
+
+        The model's softmax objective only returns class indices, so the
+        confidence is the softmax of the raw class margins for the predicted
+        class.
+        """
+        if not transactions:
+            return []
+        df_input = pd.DataFrame([self.preprocess_transaction(transaction) for transaction in transactions])
+        margins = np.asarray(self.model.predict(xgb.DMatrix(df_input), output_margin=True)).reshape(len(transactions), -1)
+        probabilities = np.exp(margins - margins.max(axis=1, keepdims=True))
+        probabilities /= probabilities.sum(axis=1, keepdims=True)
+        classes = probabilities.argmax(axis=1)
+        return [(self.fraud_labels[int(label)], float(probabilities[i, label])) for i, label in enumerate(classes)]
+
     def process_transactions(self, input_json):
-        """Process recent transactions and append fraud predictions."""
+        """Process recent transactions and append fraud predictions with their confidence."""
         transactions = input_json["recentTransactions"]
 
-        for transaction in transactions:
-            transaction["predicted_fraud_type"] = self.predict_fraud_type(transaction)
+        for transaction, (label, confidence) in zip(transactions, self.predict_with_confidence(transactions)):
+            transaction["predicted_fraud_type"] = label
+            transaction["fraud_confidence"] = round(confidence, 4)
 
         return input_json
 
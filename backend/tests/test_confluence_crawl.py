@@ -0,0 +1,137 @@
+import os
+import sys
+import pytest
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+np = pytest.importorskip("numpy")
+for module in ("requests", "bs4", "pinecone", "langchain_pinecone", "langchain_openai", "langchain_community"):
+    pytest.importorskip(module)
+import connectors.confluence_connector as confluence_connector
+from connectors.confluence_stub_server import StubConfluence
+
+SPACE = "COMP"
+PAGE_LIMIT = 3
+
+
+class FakeIndex:
+    """Pinecone compatible index keeping vectors in dicts per namespace."""
+
+    def __init__(self):
+        self.namespaces = {}
+
+    def upsert(self, vectors, namespace="", **kwargs):
+        for vector_id, values, metadata in vectors:
+            self.namespaces.setdefault(namespace, {})[vector_id] = metadata
+        return {"upserted_count": len(vectors)}
+
+    def delete(self, ids=None, namespace="", **kwargs):
+        for vector_id in ids or []:
+            self.namespaces.get(namespace, {}).pop(vector_id, None)
+
+    def fetch(self, ids, namespace="", **kwargs):
+        stored = self.namespaces.get(namespace, {})
+        return {"vectors": {vector_id: {"metadata": stored[vector_id]} for vector_id in ids if vector_id in stored}}
+
+    def describe_index_stats(self, **kwargs):
+        return {"dimension": FakeEncoder.dimension}
+
+    def ids(self, source_suffix=None):
+        return {vector_id for vectors in self.namespaces.values() for vector_id, metadata in vectors.items()
+                if source_suffix is None or metadata["source"].endswith(source_suffix)}
+
+
+class FakeEncoder:
+    """Embedding backend returning fixed vectors and recording every text it embeds."""
+
+    name = "fake-encoder"
+    dimension = 8
+    batch_size = 32
+
+    def __init__(self):
+        self.texts = []
+
+    def encode_batched(self, texts, batch_size=None):
+        self.texts.extend(texts)
+        return np.array([[float(len(text) % 7 + 1)] * self.dimension for text in texts], dtype=np.float32)
+
+
+def paragraphs(topic, count):
+    # Each paragraph is about 300 characters, so every one becomes its own chunk
+    return "".join(f"<p>{topic} paragraph {i}: " + "cash deposits below the reporting threshold " * 6 + "</p>"
+                   for i in range(count))
+
+
+@pytest.fixture
+def crawl(tmp_path, monkeypatch):
+    stub = StubConfluence(SPACE).start()
+    monkeypatch.setenv("CONFLUENCE_URL", stub.url)
+    monkeypatch.setenv("CONFLUENCE_USERNAME", "user")
+    monkeypatch.setenv("CONFLUENCE_API_TOKEN", "token")
+    monkeypatch.setenv("CONFLUENCE_PAGE_LIMIT", str(PAGE_LIMIT))
+    monkeypatch.setenv("INGESTION_MANIFEST_PATH", str(tmp_path / "manifest.db"))
+    monkeypatch.setenv("LEXICAL_INDEX_PATH", str(tmp_path / "lexical_index.pkl"))
+    monkeypatch.setenv("CONTEXT_PACKS_PATH", str(tmp_path / "context_packs.json"))
+    monkeypatch.setenv("VECTOR_DEAD_LETTER_PATH", str(tmp_path / "dead_letter.jsonl"))
+    monkeypatch.setenv("EMBEDDING_CACHE_ENABLED", "false")
+    monkeypatch.setenv("EMBEDDING_WORKERS", "1")
+    monkeypatch.setenv("RETRIEVAL_MODE", "lexical")
+    encoder = FakeEncoder()
+    monkeypatch.setattr(confluence_connector, "get_embedding_backend", lambda: encoder)
+    monkeypatch.setattr(confluence_connector, "validate_index_dimension", lambda index, backend: None)
+    index = FakeIndex()
+    connector = confluence_connector.ConfluenceConnector(index=index)
+    yield stub, connector, index, encoder
+    connector.context_packs.wait()
+    connector.manifest.close()
+    stub.stop()
+
+
+def test_crawl_pages_through_the_listing_and_skips_unchanged_pages(crawl):
+    stub, connector, index, encoder = crawl
+    page_ids = [stub.add_page(f"AML & KYC Compliance Report {i}", paragraphs(f"Report {i}", 2)) for i in range(7)]
+
+    summary = connector.crawl_space(SPACE)
+    assert summary["listed"] == 7 and summary["ingested"] == 7 and summary["failed"] == 0
+    assert {metadata["source"] for vectors in index.namespaces.values() for metadata in vectors.values()} == \
+        {f"confluence/{SPACE}/AML & KYC Compliance Report {i}" for i in range(7)}
+    assert summary["vectors"] == len(index.ids()) == 14
+
+    requests_before, embedded_before = stub.requests, len(encoder.texts)
+    summary = connector.crawl_space(SPACE)
+    assert summary["listed"] == 7 and summary["changed"] == 0 and summary["ingested"] == 0
+    # Only the three listing pages were requested, no page bodies, and nothing was embedded
+    assert stub.requests - requests_before == -(-len(page_ids) // PAGE_LIMIT)
+    assert len(encoder.texts) == embedded_before
+
+
+def test_edited_page_embeds_only_new_chunks(crawl):
+    stub, connector, index, encoder = crawl
+    page_id = stub.add_page("AML & KYC Compliance Report", paragraphs("Report", 3))
+    connector.crawl_space(SPACE)
+    ids_before = index.ids()
+    embedded_before = len(encoder.texts)
+    assert len(ids_before) == 3
+
+    stub.edit_page(page_id, paragraphs("Report", 3) + paragraphs("Addendum", 1))
+    summary = connector.crawl_space(SPACE)
+    assert summary["changed"] == 1 and summary["ingested"] == 1 and summary["vectors"] == 1
+    new_texts = encoder.texts[embedded_before:]
+    assert len(new_texts) == 1 and new_texts[0].startswith("Addendum paragraph 0")
+    assert ids_before < index.ids() and len(index.ids()) == 4
+
+
+def test_deleted_page_vectors_are_removed(crawl):
+    stub, connector, index, encoder = crawl
+    kept = stub.add_page("Internal Fraud Investigation Playbook", paragraphs("Playbook", 2))
+    deleted = stub.add_page("AML & KYC Compliance Report", paragraphs("Report", 2))
+    connector.crawl_space(SPACE)
+    assert index.ids("Compliance Report") and index.ids("Playbook")
+
+    stub.delete_page(deleted)
+    summary = connector.crawl_space(SPACE)
+    assert summary["removed"] == 2
+    assert not index.ids("Compliance Report")
+    assert len(index.ids("Playbook")) == 2
+    assert set(connector.manifest.get_versions(f"confluence/{SPACE}/")) == {f"confluence/{SPACE}/{kept}"}
@@ -0,0 +1,54 @@
+import os
+import sys
+import pytest
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+np = pytest.importorskip("numpy")
+from util.embedding_cache import EmbeddingCache
+from util.embedding_store import EmbeddingStore
+
+
+@pytest.mark.parametrize("quantization", ["none", "float16"])
+def test_cache_round_trip_and_reload(tmp_path, quantization):
+    vectors = np.random.default_rng(0).standard_normal((3, 8)).astype(np.float32)
+    cache = EmbeddingCache("org/model", 8, str(tmp_path), quantization)
+    cache.put_many(["a", "b", "c"], vectors)
+    reloaded = EmbeddingCache("org/model", 8, str(tmp_path), quantization)
+    found = reloaded.get_many(["c", "missing", "a"])
+    assert sorted(found) == [0, 2]
+    assert found[0].dtype == np.float32
+    np.testing.assert_allclose(found[0], vectors[2], atol=1e-2 if quantization == "float16" else 0)
+    assert reloaded.stats()["bytes"] == 3 * 8 * (2 if quantization == "float16" else 4)
+
+
+def test_cache_drops_a_partial_last_row(tmp_path):
+    cache = EmbeddingCache("model", 4, str(tmp_path))
+    cache.put_many(["a"], np.ones((1, 4), dtype=np.float32))
+    with open(cache.vec_path, "ab") as f:
+        f.write(b"\0" * 6)
+    reloaded = EmbeddingCache("model", 4, str(tmp_path))
+    reloaded.put_many(["b"], np.full((1, 4), 2, dtype=np.float32))
+    assert os.path.getsize(cache.vec_path) == 2 * 16
+    np.testing.assert_array_equal(EmbeddingCache("model", 4, str(tmp_path)).get_many(["b"])[0], [2, 2, 2, 2])
+
+
+@pytest.mark.parametrize("quantization", ["none", "float16", "int8"])
+def test_store_keeps_the_last_of_repeated_ids(quantization):
+    store = EmbeddingStore(4, quantization=quantization)
+    store.upsert([("a", [1, 0, 0, 0], {"v": 1}), ("b", [0, 1, 0, 0], {}), ("a", [0, 0, 1, 0], {"v": 2})])
+    matches = store.query([0, 0, 1, 0], top_k=5)["matches"]
+    assert [match["id"] for match in matches].count("a") == 1
+    assert matches[0]["id"] == "a" and matches[0]["metadata"] == {"v": 2}
+    assert len(store) == 2
+    store.close()
+
+
+def test_store_close_removes_its_own_directory():
+    store = EmbeddingStore(4, quantization="int8")
+    store.upsert([("a", [1, 2, 3, 4], {})])
+    directory = store._owned_dir
+    assert os.path.isdir(directory)
+    store.close()
+    assert not os.path.exists(directory)
@@ -0,0 +1,53 @@
+import os
+import sys
+import pytest
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+pytest.importorskip("pdfplumber")
+from connectors.pdf_extraction import iter_page_range, iter_pdf_documents
+from data.synthetic_documents import write_pdf
+
+PAGES = 7
+
+
+@pytest.fixture(scope="module")
+def pdf_path(tmp_path_factory):
+    return write_pdf(str(tmp_path_factory.mktemp("pdf") / "sample.pdf"), PAGES, lines_per_page=5, table_rows=3)
+
+
+def _pages(documents):
+    return [doc.metadata["page"] for doc in documents]
+
+
+def test_page_range_yields_its_pages_in_order(pdf_path):
+    documents = list(iter_page_range(pdf_path, 2, 5))
+    pages = _pages(documents)
+    assert pages == sorted(pages)
+    assert set(pages) == {3, 4, 5}
+    # The text of a page comes before its tables
+    for page in set(pages):
+        types = [doc.metadata.get("type", "text") for doc in documents if doc.metadata["page"] == page]
+        assert types[0] == "text" and set(types[1:]) <= {"table"}
+
+
+@pytest.mark.parametrize("page_window", [1, 3, PAGES, PAGES + 5])
+def test_page_windows_keep_page_order(pdf_path, page_window):
+    documents = list(iter_pdf_documents(pdf_path, processes=1, page_window=page_window))
+    assert _pages(documents) == _pages(iter_page_range(pdf_path, 0, PAGES))
+    assert set(_pages(documents)) == set(range(1, PAGES + 1))
+
+
+def test_parallel_extraction_matches_sequential(pdf_path):
+    sequential = list(iter_pdf_documents(pdf_path, processes=1))
+    parallel = list(iter_pdf_documents(pdf_path, processes=2, pages_per_task=2, parallel_min_pages=1))
+    assert [(doc.metadata, doc.page_content) for doc in parallel] == \
+           [(doc.metadata, doc.page_content) for doc in sequential]
+
+
+def test_unreadable_pdf_raises(tmp_path):
+    path = tmp_path / "broken.pdf"
+    path.write_bytes(b"not a pdf")
+    with pytest.raises(Exception):
+        list(iter_pdf_documents(str(path), processes=1))
@@ -0,0 +1,22 @@
+import os
+import sys
+import pytest
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+pytest.importorskip("pdfplumber")
+from connectors.ingestion_benchmark import pdf_memory_profile
+
+# Builds and extracts a 600-page PDF; a benchmark rather than coverage
+pytestmark = pytest.mark.slow
+
+PAGES = int(os.environ.get("PDF_MEMORY_TEST_PAGES", 600))
+# Extraction of 5,000 pages stayed within 186-213 MB; keeping every page window open grows by gigabytes
+MAX_GROWTH_MB = float(os.environ.get("PDF_MEMORY_TEST_MAX_GROWTH_MB", 40))
+
+
+def test_pdf_extraction_memory_stays_flat(tmp_path):
+    report = pdf_memory_profile(PAGES, page_window=50, samples=20, work_dir=str(tmp_path))
+    assert len(report["rss_mb"]) >= 8
+    assert report["growth_mb"] < MAX_GROWTH_MB, f"RSS grew by {report['growth_mb']:.1f} MB: {report['rss_mb']}"
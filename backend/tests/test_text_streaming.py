@@ -0,0 +1,68 @@
+import os
+import sys
+import random
+import pytest
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+text_splitter = pytest.importorskip("langchain.text_splitter")
+from connectors.text_streaming import iter_text_chunks
+
+
+@pytest.fixture
+def splitter():
+    return text_splitter.RecursiveCharacterTextSplitter(
+        chunk_size=500, chunk_overlap=50, separators=["\n\n", "\n", ".", "!", "?", ",", " ", ""],
+        length_function=len)
+
+
+def _sample_text(seed: int, words: int) -> str:
+    rng = random.Random(seed)
+    return "".join(rng.choice(["alpha ", "beta. ", "\n\n", "gamma,", "café ", "x" * 40 + " "]) for _ in range(words))
+
+
+@pytest.mark.parametrize("block_size", [97, 1000, 65536])
+def test_chunks_point_at_their_text(tmp_path, splitter, block_size):
+    text = _sample_text(1, 5000)
+    path = tmp_path / "sample.txt"
+    path.write_text(text, encoding="utf-8")
+    chunks = list(iter_text_chunks(str(path), splitter, block_size, chunk_overlap=50))
+    assert [chunk.metadata["chunk_num"] for chunk in chunks] == list(range(len(chunks)))
+    starts = [chunk.metadata["start_index"] for chunk in chunks]
+    assert starts == sorted(starts)
+    for chunk in chunks:
+        start = chunk.metadata["start_index"]
+        assert text[start:start + len(chunk.page_content)] == chunk.page_content
+        assert len(chunk.page_content) <= 500
+
+
+def test_single_block_matches_whole_file_split(tmp_path, splitter):
+    text = _sample_text(2, 3000)
+    path = tmp_path / "sample.txt"
+    path.write_text(text, encoding="utf-8")
+    chunks = list(iter_text_chunks(str(path), splitter, len(text.encode("utf-8")) + 1, chunk_overlap=50))
+    assert [chunk.page_content for chunk in chunks] == splitter.split_text(text)
+
+
+@pytest.mark.parametrize("block_size", [97, 4096, 1 << 20])
+def test_fallback_encoding_starts_at_the_invalid_byte(tmp_path, splitter, block_size):
+    utf8 = _sample_text(3, 2000).encode("utf-8")
+    latin1 = "r\xe9sum\xe9 du caf\xe9. ".encode("latin-1") * 300
+    path = tmp_path / "mixed.txt"
+    path.write_bytes(utf8 + latin1)
+    text = utf8.decode("utf-8") + latin1.decode("latin-1")
+    chunks = list(iter_text_chunks(str(path), splitter, block_size, chunk_overlap=50,
+                                   fallback_encoding="latin-1"))
+    for chunk in chunks:
+        start = chunk.metadata["start_index"]
+        assert text[start:start + len(chunk.page_content)] == chunk.page_content
+    assert chunks[-1].page_content == text.rstrip()[-len(chunks[-1].page_content):]
+    assert "caf\xe9" in chunks[-1].page_content
+
+
+def test_invalid_byte_raises_without_fallback(tmp_path, splitter):
+    path = tmp_path / "latin1.txt"
+    path.write_bytes("caf\xe9 ".encode("latin-1") * 10)
+    with pytest.raises(UnicodeDecodeError):
+        list(iter_text_chunks(str(path), splitter, 16))
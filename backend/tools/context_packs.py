@@ -0,0 +1,231 @@
+import os
+import re
+import sys
+import json
+import time
+import logging
+import tempfile
+import contextlib
+import threading
+import concurrent.futures
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional
+try:
+    import fcntl
+except ImportError:
+    # Not available on Windows; writers there are only serialized within the process
+    fcntl = None
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+from util.envutils import EnvUtils
+from model.fraud_detection import FRAUD_LABELS
+from tools.document_retriever import COMPLIANCE_SOURCES
+
+logger = logging.getLogger("TransactionAnalysis")
+
+DEFAULT_PACKS_PATH = os.path.join(parent_dir, "data", "context_packs.json")
+
+
+class ContextPackStore:
+    """
+    Precomputed compliance context per fraud label and document source.
+
+    Packs are built by the ingestion side and written atomically to a JSON
+    file; the analysis side only reads that file, so no retrieval happens
+    while a customer is being analyzed. After a load, ``schedule_build``
+    rebuilds the packs of the sources whose namespaces changed on a
+    background thread, once the ``ready`` check reports the new vectors
+    visible in Pinecone or after ``CONTEXT_PACK_WAIT_SECONDS``. Builds
+    scheduled while one is waiting are merged into the next one.
+
+    A source whose own partition had no results is packed from the default
+    class, so changes there rebuild it too.
+    """
+
+    def __init__(self, path: Optional[str] = None, pack_size: Optional[int] = None):
+        env_utils = EnvUtils()
+        self.path = path or env_utils.get_env("CONTEXT_PACKS_PATH", DEFAULT_PACKS_PATH)
+        self.pack_size = int(pack_size or env_utils.get_env("CONTEXT_PACK_SIZE", 5))
+        self.wait_seconds = float(env_utils.get_env("CONTEXT_PACK_WAIT_SECONDS", 60))
+        self.poll_seconds = float(env_utils.get_env("CONTEXT_PACK_POLL_SECONDS", 2))
+        self._packs: Dict[str, Dict[str, List[str]]] = {}
+        self._fallback: Dict[str, bool] = {}
+        self._mtime = None
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._pending: List[tuple] = []
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="context-packs")
+
+    @staticmethod
+    def _dedupe_key(text: str) -> str:
+        return re.sub(r"\s+", " ", text).strip().lower()
+
+    def _build_pack(self, retriever, label: str, source: str):
+        """
+        Retrieve one pack and whether it came from the default class. Each
+        pack over-fetches, keeps the retriever's ranking and drops chunks
+        whose whitespace-normalised text was already seen.
+        """
+        texts, fell_back = retriever.retrieve_with_fallback(label, k=self.pack_size * 2, source=source)
+        seen = set()
+        pack = []
+        for text in texts:
+            key = self._dedupe_key(text)
+            if not key or key in seen:
+                continue
+            seen.add(key)
+            pack.append(text)
+            if len(pack) >= self.pack_size:
+                break
+        return pack, fell_back
+
+    def build(self, retriever, sources: Optional[Iterable[str]] = None) -> Dict[str, Dict[str, List[str]]]:
+        """
+        Rebuild the packs of ``sources`` (every source by default) with
+        ``retriever`` and persist them next to the other stored packs.
+        """
+        sources = list(COMPLIANCE_SOURCES if sources is None else sources)
+        built: Dict[str, Dict[str, List[str]]] = {label: {} for label in FRAUD_LABELS}
+        fallback = {}
+        for source in sources:
+            fallback[source] = False
+            for label in FRAUD_LABELS:
+                built[label][source], fell_back = self._build_pack(retriever, label, source)
+                fallback[source] = fallback[source] or fell_back
+        with self._file_lock():
+            stored = self._read()
+            packs = stored.get("packs", {})
+            for label, label_packs in built.items():
+                packs.setdefault(label, {}).update(label_packs)
+            self.save(packs, dict(stored.get("fallback", {}), **fallback))
+        return packs
+
+    def affected_sources(self, namespaces: Iterable[str], classifier) -> List[str]:
+        """
+        Sources whose packs may change after writes to ``namespaces``: those
+        stored in one of them, those packed from the default class when it
+        changed, and those without packs yet.
+        """
+        namespaces = set(namespaces)
+        self.refresh()
+        with self._lock:
+            built = {source for label_packs in self._packs.values() for source in label_packs}
+            fallback = dict(self._fallback)
+        default_changed = classifier.default_namespace in namespaces
+        return [source for source in COMPLIANCE_SOURCES
+                if classifier.namespace(source) in namespaces
+                or (default_changed and fallback.get(source, True))
+                or source not in built]
+
+    def schedule_build(self, retriever, namespaces: Iterable[str],
+                       ready: Optional[Callable[[], bool]] = None) -> concurrent.futures.Future:
+        """
+        Rebuild the packs affected by writes to ``namespaces`` in the
+        background. ``ready`` is polled every ``CONTEXT_PACK_POLL_SECONDS``
+        until it returns True, so retrieval sees the vectors just written.
+        """
+        with self._lock:
+            self._pending.append((set(namespaces), ready))
+        return self._executor.submit(self._run_pending, retriever)
+
+    def _run_pending(self, retriever) -> Optional[Dict[str, Dict[str, List[str]]]]:
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if not pending:
+            # Merged into an earlier build
+            return None
+        try:
+            checks = [ready for _, ready in pending if ready is not None]
+            deadline = time.monotonic() + self.wait_seconds
+            while True:
+                checks = [ready for ready in checks if not self._is_ready(ready)]
+                if not checks or time.monotonic() >= deadline:
+                    break
+                time.sleep(self.poll_seconds)
+            if checks:
+                logger.warning(f"New vectors not visible after {self.wait_seconds:g} seconds, "
+                               f"building context packs anyway")
+            namespaces = set().union(*(namespaces for namespaces, _ in pending))
+            sources = self.affected_sources(namespaces, retriever.classifier)
+            if not sources:
+                return None
+            started = time.perf_counter()
+            packs = self.build(retriever, sources)
+            logger.info(f"Rebuilt context packs for {sources} in {time.perf_counter() - started:.2f}s")
+            return packs
+        except Exception as e:
+            logger.error(f"Context pack build failed: {str(e)}", exc_info=True)
+            return None
+
+    @staticmethod
+    def _is_ready(ready: Callable[[], bool]) -> bool:
+        try:
+            return ready()
+        except Exception as e:
+            logger.warning(f"Could not check vector visibility, building context packs now: {str(e)}")
+            return True
+
+    def wait(self, timeout: Optional[float] = None) -> None:
+        """Block until the builds scheduled so far have finished."""
+        self._executor.submit(lambda: None).result(timeout)
+
+    @contextlib.contextmanager
+    def _file_lock(self):
+        """Serialize read-modify-write of the packs file, across processes where ``flock`` is available."""
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self._write_lock:
+            if fcntl is None:
+                yield
+                return
+            with open(f"{self.path}.lock", "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read(self) -> Dict[str, Any]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def save(self, packs: Dict[str, Dict[str, List[str]]], fallback: Optional[Dict[str, bool]] = None) -> None:
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fallback = fallback or {}
+        # A temporary file of its own per writer, so concurrent saves never interleave
+        fd, tmp_path = tempfile.mkstemp(prefix=f"{os.path.basename(self.path)}.", suffix=".tmp", dir=directory)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"built_at": datetime.now().isoformat(), "packs": packs, "fallback": fallback}, f)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        with self._lock:
+            self._packs = packs
+            self._fallback = fallback
+            self._mtime = os.path.getmtime(self.path)
+
+    def refresh(self) -> None:
+        """Reload the packs file if it changed since the last read."""
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return
+        if mtime == self._mtime:
+            return
+        stored = self._read()
+        with self._lock:
+            self._packs = stored.get("packs", {})
+            self._fallback = stored.get("fallback", {})
+            self._mtime = mtime
+
+    def get(self, label: str, source: str) -> Optional[List[str]]:
+        """Return the pack for a label and source, or None if it was never built."""
+        self.refresh()
+        with self._lock:
+            return self._packs.get(label, {}).get(source)
@@ -45,7 +45,9 @@ class DatabaseManager:
 
     
 
-    def getCustomerDetails(self, customer_id):
+    def getCustomerDetails(self, customer_id, transaction_limit=None):
+        """Customer details, fraud statistics and the most recent transactions (ANALYSIS_TRANSACTION_LIMIT)."""
+        transaction_limit = int(transaction_limit or EnvUtils().get_env("ANALYSIS_TRANSACTION_LIMIT", 10))
         try:
             self.connect()
             
@@ -82,7 +84,7 @@ class DatabaseManager:
                 FROM sentrymind_transactions
                 WHERE customer_id = %s
                 ORDER BY transaction_date DESC
-                LIMIT 10
+                LIMIT %s
             """
             
             fraud_stats_query = """
@@ -99,7 +101,7 @@ class DatabaseManager:
             if not customer_info:
                 return json.dumps({"error": f"Customer {customer_id} not found"})
             
-            self.cursor.execute(transactions_query, (customer_id,))
+            self.cursor.execute(transactions_query, (customer_id, transaction_limit))
             transactions = self.cursor.fetchall()
             
             self.cursor.execute(fraud_stats_query, (customer_id,))
@@ -0,0 +1,93 @@
+import os
+import sys
+import logging
+import concurrent.futures
+from typing import List, Optional, Tuple
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+from util.envutils import EnvUtils
+from util.lexical_index import BM25Index, reciprocal_rank_fusion
+from util.document_classes import DocumentClassifier
+
+logger = logging.getLogger("DocumentRetriever")
+
+RETRIEVAL_MODES = ("dense", "lexical", "hybrid")
+
+# Document collections the SAR analysis draws context from
+COMPLIANCE_SOURCES = [
+    "AML & KYC Compliance Reports",
+    "Internal Fraud Investigation Playbook",
+]
+
+
+class DocumentRetriever:
+    """
+    Retrieves compliance document chunks using dense search, BM25 or both.
+
+    In ``hybrid`` mode the lexical and dense rankings are merged with
+    reciprocal rank fusion. Dense search runs with a deadline; if the vector
+    store does not answer in time the lexical results are returned on their
+    own, so a slow vector store never blocks analysis.
+
+    Passing a ``source`` (document class) restricts both searches to that
+    class's partition: the Pinecone namespace and the BM25 partition. If a
+    partition is empty the default class is searched instead.
+    """
+
+    def __init__(self, vectorstore, lexical_index: Optional[BM25Index] = None,
+                 mode: Optional[str] = None, dense_timeout_ms: Optional[int] = None,
+                 classifier: Optional[DocumentClassifier] = None):
+        env_utils = EnvUtils()
+        self.vectorstore = vectorstore
+        self.mode = (mode or env_utils.get_env("RETRIEVAL_MODE", "hybrid")).lower()
+        if self.mode not in RETRIEVAL_MODES:
+            raise ValueError(f"Unsupported retrieval mode '{self.mode}'. Expected one of {RETRIEVAL_MODES}")
+        self.dense_timeout = int(dense_timeout_ms or env_utils.get_env("DENSE_TIMEOUT_MS", 2000)) / 1000.0
+        self.lexical_index = lexical_index or BM25Index()
+        self.lexical_index.load()
+        self.classifier = classifier or DocumentClassifier()
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=4, thread_name_prefix="dense-search")
+
+    def lexical_search(self, query: str, k: int = 5, namespace: Optional[str] = None) -> List[str]:
+        self.lexical_index.refresh()
+        results = self.lexical_index.search(query, top_k=k, partition=namespace)
+        return [meta.get("text", "") for _, _, meta in results]
+
+    def dense_search(self, query: str, k: int = 5, namespace: Optional[str] = None) -> List[str]:
+        docs = self.vectorstore.similarity_search(query, k=k, namespace=namespace)
+        return [doc.page_content for doc in docs]
+
+    def retrieve(self, query: str, k: int = 5, source: Optional[str] = None) -> List[str]:
+        """Return up to ``k`` chunk texts for the query, optionally from one source."""
+        return self.retrieve_with_fallback(query, k, source)[0]
+
+    def retrieve_with_fallback(self, query: str, k: int = 5,
+                               source: Optional[str] = None) -> Tuple[List[str], bool]:
+        """Like ``retrieve``, also telling whether the default class was searched because ``source`` had no results."""
+        if source is None:
+            return self._retrieve(query, k, None), False
+        results = self._retrieve(query, k, self.classifier.namespace(source))
+        if results:
+            return results, False
+        return self._retrieve(query, k, self.classifier.default_namespace), True
+
+    def _retrieve(self, query: str, k: int, namespace: Optional[str]) -> List[str]:
+        if self.mode == "lexical":
+            return self.lexical_search(query, k, namespace)
+        if self.mode == "dense":
+            return self.dense_search(query, k, namespace)
+
+        lexical = self.lexical_search(query, k, namespace)
+        future = self._executor.submit(self.dense_search, query, k, namespace)
+        try:
+            dense = future.result(timeout=self.dense_timeout)
+        except concurrent.futures.TimeoutError:
+            logger.warning(f"Dense search exceeded {self.dense_timeout:.3f}s, using lexical results only")
+            return lexical
+        except Exception as e:
+            logger.warning(f"Dense search failed, using lexical results only: {str(e)}")
+            return lexical
+        if not lexical:
+            return dense
+        return reciprocal_rank_fusion([dense, lexical])[:k]
@@ -0,0 +1,195 @@
+import os
+import sys
+import json
+import time
+import logging
+import concurrent.futures
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+from langchain.prompts import PromptTemplate
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+from util.envutils import EnvUtils
+from util.llm_cache import response_key
+from tools.prompt_builder import CompactPromptBuilder, parse_additions, review_reasons
+
+logger = logging.getLogger("TransactionAnalysis")
+
+MAP_TEMPLATE = """Review one group of a customer's transactions that share a predicted fraud type, using only the compliance context.
+
+Customer:
+{customer}
+
+Transactions, one per line, fields separated by "|":
+{columns}
+{transactions}
+
+Compliance context:
+{document_chunks}
+
+Reply with JSON only, without repeating the input, with these keys:
+"transactions": object mapping every transaction_id to a short analysis of that transaction
+"group_summary": two or three sentences on what this group of transactions indicates
+"""
+
+REDUCE_TEMPLATE = """Decide whether a Suspicious Activity Report (SAR) is required for the customer, based on the findings for each group of their transactions.
+
+Customer:
+{customer}
+
+Findings per transaction group:
+{groups}
+
+Reply with JSON only, with these keys:
+"overall_analysis": analysis of all transactions together
+"final_sar_required": "Yes" or "No"
+"""
+
+
+def group_transactions(transactions: Sequence[Dict], group_size: int) -> List[Tuple[str, List[Dict]]]:
+    """Group transactions by predicted fraud type, splitting groups larger than ``group_size``."""
+    by_type: Dict[str, List[Dict]] = {}
+    for transaction in transactions:
+        by_type.setdefault(transaction.get("predicted_fraud_type") or "Unclassified", []).append(transaction)
+    return [(fraud_type, members[start:start + group_size])
+            for fraud_type, members in by_type.items()
+            for start in range(0, len(members), group_size)]
+
+
+class MapReduceAnalysis:
+    """
+    SAR analysis of a large transaction set in parallel LLM calls.
+
+    Transactions are grouped by predicted fraud type and every group is
+    analyzed in its own map call, with the context chunks retrieved for
+    that fraud type; at most ``concurrency`` calls run at once. A short
+    reduce call turns the group summaries into the overall analysis and
+    the SAR decision. Groups still running when ``timeout_seconds`` have
+    passed are reported as not analyzed, so the wall-clock time of a
+    customer is bounded however many transactions it has. A reduce result
+    reached while any group failed or timed out is not cached.
+    """
+
+    def __init__(self, get_llm: Callable, model: str, cache_namespace: str, llm_cache=None,
+                 concurrency: Optional[int] = None, group_size: Optional[int] = None,
+                 timeout_seconds: Optional[float] = None):
+        env_utils = EnvUtils()
+        self.get_llm = get_llm
+        self.model = model
+        self.cache_namespace = cache_namespace
+        self.llm_cache = llm_cache
+        self.concurrency = int(concurrency or env_utils.get_env("LLM_MAX_CONCURRENCY", 4))
+        self.group_size = int(group_size or env_utils.get_env("MAP_GROUP_SIZE", 25))
+        self.timeout_seconds = float(timeout_seconds or env_utils.get_env("MAP_REDUCE_TIMEOUT_SECONDS", 90))
+        self.builder = CompactPromptBuilder(model, template=MAP_TEMPLATE)
+
+    def _cached(self, template: str, payload: Any, chunks: Sequence[str]) -> Tuple[str, Optional[Dict]]:
+        key = response_key(self.cache_namespace, template, payload, chunks)
+        return key, (self.llm_cache.get(key) if self.llm_cache else None)
+
+    def _map(self, chain, customer: Dict, fraud_type: str, transactions: List[Dict],
+             chunks: Sequence[str]) -> Dict[str, Any]:
+        payload = dict(customer, recentTransactions=transactions)
+        prompt = self.builder.build(payload, chunks)
+        key, cached = self._cached(MAP_TEMPLATE, payload, prompt["document_chunks"])
+        if cached:
+            response = cached["response"]
+        else:
+            started = time.perf_counter()
+            response = chain.invoke(prompt["eval_input"]).content.strip()
+            latency_ms = (time.perf_counter() - started) * 1000
+        additions = parse_additions(response)
+        if self.llm_cache and not cached:
+            self.llm_cache.put(key, self.model, response, latency_ms)
+        return additions
+
+    @staticmethod
+    def _group_line(fraud_type: str, transactions: List[Dict], summary: str) -> str:
+        total = sum(float(transaction.get("transaction_amount") or 0) for transaction in transactions)
+        return f"- {fraud_type} ({len(transactions)} transactions, {total:.2f} total): {summary}"
+
+    def iter_analysis(self, payload: Dict, chunks_by_type: Dict[str, Sequence[str]]) -> Iterator[Dict]:
+        """
+        Yield an ``analyzed_group`` event as each map call finishes, then
+        the reduce call's output as ``token`` events, and finally an
+        ``additions`` event with the per-transaction analyses, the overall
+        analysis and the SAR decision, in the form ``merge_analysis`` takes.
+        """
+        started = time.perf_counter()
+        customer = {key: value for key, value in payload.items() if key != "recentTransactions"}
+        groups = group_transactions(payload.get("recentTransactions", []), self.group_size)
+        map_chain = PromptTemplate.from_template(MAP_TEMPLATE) | self.get_llm()
+        summaries: Dict[int, str] = {}
+        failed: Dict[int, str] = {}
+        analyses: Dict[str, Any] = {}
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.concurrency)
+        futures = {executor.submit(self._map, map_chain, customer, fraud_type, transactions,
+                                   chunks_by_type.get(fraud_type, [])): position
+                   for position, (fraud_type, transactions) in enumerate(groups)}
+        try:
+            for future in concurrent.futures.as_completed(futures, timeout=self.timeout_seconds):
+                position = futures[future]
+                fraud_type, transactions = groups[position]
+                try:
+                    additions = future.result()
+                    analyses.update({str(key): value for key, value in (additions.get("transactions") or {}).items()})
+                    summaries[position] = additions.get("group_summary", "")
+                except Exception as e:
+                    logger.error(f"Map call for {fraud_type} failed: {str(e)}", exc_info=True)
+                    failed[position] = str(e)
+                yield {"event": "analyzed_group",
+                       "data": {"fraud_type": fraud_type, "transactions": len(transactions),
+                                "failed": position in failed, "completed": len(summaries),
+                                "groups_failed": len(failed), "groups": len(groups)}}
+        except concurrent.futures.TimeoutError:
+            pending = len(groups) - len(summaries) - len(failed)
+            logger.warning(f"{pending} of {len(groups)} transaction groups were not analyzed "
+                           f"within {self.timeout_seconds:g} seconds")
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+        map_seconds = time.perf_counter() - started
+
+        group_lines = [self._group_line(fraud_type, transactions,
+                                        summaries[position] if position in summaries
+                                        else "analysis failed" if position in failed
+                                        else "not analyzed within the time budget")
+                       for position, (fraud_type, transactions) in enumerate(groups)]
+        reduce_input = {"customer": json.dumps(customer, separators=(",", ":"), default=str),
+                        "groups": "\n".join(group_lines)}
+        key, cached = self._cached(REDUCE_TEMPLATE, customer, group_lines)
+        if cached:
+            response = cached["response"]
+            yield {"event": "token", "data": {"text": response}}
+        else:
+            reduce_chain = PromptTemplate.from_template(REDUCE_TEMPLATE) | self.get_llm()
+            parts = []
+            reduce_started = time.perf_counter()
+            for chunk in reduce_chain.stream(reduce_input):
+                if chunk.content:
+                    parts.append(chunk.content)
+                    yield {"event": "token", "data": {"text": chunk.content}}
+            response = "".join(parts).strip()
+        decision = parse_additions(response)
+        # A decision taken while groups failed or timed out, or one that needs review, is not reused
+        if self.llm_cache and not cached and len(summaries) == len(groups) and not review_reasons(decision):
+            self.llm_cache.put(key, self.model, response, (time.perf_counter() - reduce_started) * 1000)
+
+        analyzed = sum(1 for transaction in payload.get("recentTransactions", [])
+                       if str(transaction.get("transaction_id")) in analyses)
+        yield {
+            "event": "additions",
+            "data": {
+                "transactions": analyses,
+                "overall_analysis": decision.get("overall_analysis"),
+                "final_sar_required": decision.get("final_sar_required"),
+            },
+            "stats": {
+                "groups": len(groups),
+                "groups_completed": len(summaries),
+                "groups_failed": len(failed),
+                "transactions": len(payload.get("recentTransactions", [])),
+                "transactions_analyzed": analyzed,
+                "map_seconds": map_seconds,
+                "total_seconds": time.perf_counter() - started,
+            },
+        }
@@ -0,0 +1,219 @@
+import os
+import re
+import sys
+import json
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Union
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+from util.envutils import EnvUtils
+
+logger = logging.getLogger("TransactionAnalysis")
+
+COMPACT_TEMPLATE = """Review the customer's recent transactions for a Suspicious Activity Report (SAR), using only the compliance context.
+
+Customer:
+{customer}
+
+Transactions, one per line, fields separated by "|":
+{columns}
+{transactions}
+
+Compliance context:
+{document_chunks}
+
+Reply with JSON only, without repeating the input, with these keys:
+"transactions": object mapping every transaction_id to a short analysis of that transaction
+"overall_analysis": analysis of all transactions together
+"final_sar_required": "Yes" or "No"
+"""
+
+NOT_ANALYZED = "Not analyzed"
+SAR_DECISIONS = ("Yes", "No")
+NEEDS_REVIEW = "Needs review"
+
+_encodings: Dict[str, Any] = {}
+_encodings_lock = threading.Lock()
+
+
+def _encoding(model: str):
+    with _encodings_lock:
+        if model in _encodings:
+            return _encodings[model]
+        try:
+            import tiktoken
+            try:
+                _encodings[model] = tiktoken.encoding_for_model(model)
+            except KeyError:
+                _encodings[model] = tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            # tiktoken is not installed or its encoding file cannot be downloaded
+            logger.warning(f"No tiktoken encoding for {model}, estimating token counts: {e}")
+            _encodings[model] = None
+        return _encodings[model]
+
+
+def count_tokens(text: str, model: str = "gpt-4") -> int:
+    """
+    Count tokens with tiktoken's encoding for ``model`` (cl100k_base for
+    models it does not know). Without tiktoken, estimate four characters
+    per token.
+    """
+    encoding = _encoding(model)
+    if encoding is None:
+        return -(-len(text) // 4)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def _cell(value: Any) -> str:
+    if value is None:
+        return ""
+    return str(value).replace("|", "/").replace("\n", " ")
+
+
+def columnar_transactions(transactions: Sequence[Dict]) -> Dict[str, str]:
+    """A header line with the field names and one "|" separated line per transaction."""
+    columns: List[str] = []
+    for transaction in transactions:
+        columns.extend(key for key in transaction if key not in columns)
+    rows = ["|".join(_cell(transaction.get(column)) for column in columns) for transaction in transactions]
+    return {"columns": "|".join(columns), "transactions": "\n".join(rows)}
+
+
+class CompactPromptBuilder:
+    """
+    Builds the SAR analysis prompt within a token budget.
+
+    Customer details are compact JSON and transactions are a columnar
+    table, so field names appear once instead of once per transaction. The
+    model is asked only for its additions, which ``merge_analysis`` folds
+    back into the customer payload. Context chunks are added in ranking
+    order while they fit the budget; if the transactions alone exceed it,
+    the oldest are left out. ``template`` may be any template with the same
+    inputs, such as the map prompt of a map-reduce analysis.
+    """
+
+    def __init__(self, model: str = "gpt-4", token_budget: Optional[int] = None, template: str = COMPACT_TEMPLATE):
+        self.model = model
+        self.template = template
+        self.token_budget = int(token_budget or EnvUtils().get_env("PROMPT_TOKEN_BUDGET", 6000))
+
+    def count(self, text: str) -> int:
+        return count_tokens(text, self.model)
+
+    def build(self, payload: Dict, document_chunks: Sequence[str]) -> Dict[str, Any]:
+        """
+        Return the template inputs together with the chunks and transaction
+        ids that made it into the prompt and its token count.
+        """
+        customer = {key: value for key, value in payload.items() if key != "recentTransactions"}
+        transactions = list(payload.get("recentTransactions", []))
+        inputs = {"customer": json.dumps(customer, separators=(",", ":"), default=str), "document_chunks": ""}
+        inputs.update(columnar_transactions(transactions))
+        tokens = self.count(self.template.format(**inputs))
+        # Transactions are newest first; drop from the end until the fixed part fits
+        while tokens > self.token_budget and len(transactions) > 1:
+            transactions.pop()
+            inputs.update(columnar_transactions(transactions))
+            tokens = self.count(self.template.format(**inputs))
+        omitted = len(payload.get("recentTransactions", [])) - len(transactions)
+        if omitted:
+            logger.warning(f"Prompt token budget {self.token_budget} leaves out the {omitted} oldest transactions")
+
+        used_chunks, seen = [], set()
+        for chunk in document_chunks:
+            key = " ".join(str(chunk).split())
+            if not key or key in seen:
+                continue
+            cost = self.count(f"- {key}\n")
+            if tokens + cost > self.token_budget:
+                continue
+            seen.add(key)
+            used_chunks.append(key)
+            tokens += cost
+        inputs["document_chunks"] = "\n".join(f"- {chunk}" for chunk in used_chunks)
+        return {
+            "eval_input": inputs,
+            "document_chunks": used_chunks,
+            "transaction_ids": [transaction.get("transaction_id") for transaction in transactions],
+            "omitted_transactions": omitted,
+            "prompt_tokens": self.count(self.template.format(**inputs)),
+        }
+
+
+def parse_additions(response: str) -> Dict[str, Any]:
+    """Parse the model's JSON reply, tolerating code fences or text around it."""
+    text = re.sub(r"^```(?:json)?\s*|\s*```$", "", response.strip())
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        start, end = text.find("{"), text.rfind("}")
+        if start < 0 or end < start:
+            raise
+        return json.loads(text[start:end + 1])
+
+
+def review_reasons(additions: Dict) -> List[str]:
+    """
+    Why a model reply cannot be taken as is: a missing overall analysis or a
+    ``final_sar_required`` other than "Yes" or "No". Empty for a valid reply.
+    """
+    reasons = []
+    if not str(additions.get("overall_analysis") or "").strip():
+        reasons.append("overall_analysis is missing")
+    decision = additions.get("final_sar_required")
+    if str(decision or "").strip().capitalize() not in SAR_DECISIONS:
+        reasons.append(f"final_sar_required is {decision!r}, expected \"Yes\" or \"No\"")
+    return reasons
+
+
+def merge_analysis(payload: Dict, response: Union[str, Dict]) -> Dict:
+    """
+    Merge the model's additions into a copy of the customer payload: each
+    transaction gets ``llm_analysis`` and the payload gets
+    ``overall_analysis`` and ``final_sar_required``, the SAR layout the
+    reports view reads.
+
+    A reply without a valid decision or overall analysis is never read as
+    "No": its ``final_sar_required`` is "Needs review", and ``needs_review``
+    and ``review_reasons`` are set so callers do not cache it.
+    """
+    additions = parse_additions(response) if isinstance(response, str) else response
+    if not isinstance(additions, dict):
+        raise ValueError(f"Expected a JSON object from the model, got {type(additions).__name__}")
+    analyses = {str(key): value for key, value in (additions.get("transactions") or {}).items()}
+    merged = dict(payload)
+    merged["recentTransactions"] = [
+        dict(transaction, llm_analysis=analyses.get(str(transaction.get("transaction_id")), NOT_ANALYZED))
+        for transaction in payload.get("recentTransactions", [])
+    ]
+    merged["overall_analysis"] = additions.get("overall_analysis") or ""
+    reasons = review_reasons(additions)
+    decision = str(additions.get("final_sar_required") or "").strip().capitalize()
+    merged["final_sar_required"] = decision if decision in SAR_DECISIONS else NEEDS_REVIEW
+    if reasons:
+        logger.warning(f"SAR analysis needs review: {'; '.join(reasons)}")
+        merged["needs_review"] = True
+        merged["review_reasons"] = reasons
+    return merged
+
+
+# Example usage
+if __name__ == "__main__":
+    sample = {
+        "customerInfo": {"customer_id": "42e60d56", "account_number": "1125218191", "name": "Brett Johnson"},
+        "fraudStats": {"total_fraud_transactions": 2, "total_fraud_amount": 17990.0},
+        "recentTransactions": [
+            {"transaction_id": f"TXN_{i}", "transaction_date": f"2025-02-0{i + 1} 15:38:47",
+             "transaction_amount": 8990.0 + i, "transaction_type": "Cash Deposit",
+             "destination_country": "USA", "predicted_fraud_type": "Structuring"}
+            for i in range(5)
+        ],
+    }
+    chunks = ["Cash deposits just below the reporting threshold across branches indicate structuring."]
+    verbose = json.dumps(sample, indent=3)
+    prompt = CompactPromptBuilder().build(sample, chunks)
+    print(COMPACT_TEMPLATE.format(**prompt["eval_input"]))
+    print(f"Transactions JSON: {count_tokens(verbose)} tokens, compact prompt: {prompt['prompt_tokens']} tokens")
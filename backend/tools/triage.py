@@ -0,0 +1,140 @@
+import os
+import sys
+import json
+import threading
+from typing import Any, Dict, List, Optional
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+from util.envutils import EnvUtils
+
+CLEAR = "clear"
+AMBIGUOUS = "ambiguous"
+SUSPICIOUS = "suspicious"
+OUTCOMES = (CLEAR, AMBIGUOUS, SUSPICIOUS)
+
+
+class TransactionTriage:
+    """
+    Decides which customers need the LLM analysis.
+
+    Rules are configured in ``config/triage_rules.json``. A customer is
+    ``clear`` when every recent transaction was predicted legitimate with at
+    least ``min_legitimate_confidence`` and none trips a clear rule (amount,
+    high-risk destination, customer risk level); clear customers get a
+    templated no-SAR result without retrieval or LLM. A customer is
+    ``suspicious`` when a fraud type was predicted with at least
+    ``min_fraud_confidence``, and ``ambiguous`` otherwise; both go on to
+    the full analysis.
+    """
+
+    def __init__(self, config_path: Optional[str] = None):
+        config_path = config_path or os.path.join(os.path.dirname(__file__), '..', 'config', 'triage_rules.json')
+        with open(config_path, 'r') as f:
+            config = json.load(f)
+        self.legitimate_labels = set(config['legitimate_labels'])
+        self.clear_rules: Dict[str, Any] = config['clear']
+        self.suspicious_rules: Dict[str, Any] = config['suspicious']
+        self.enabled = EnvUtils().get_env("TRIAGE_ENABLED", "true").lower() == "true"
+
+    def _escalations(self, payload: Dict) -> List[str]:
+        """Reasons that keep a customer whose transactions all look legitimate out of the clear outcome."""
+        rules = self.clear_rules
+        reasons = []
+        risk_level = str((payload.get("customerInfo") or {}).get("risk_level") or "").lower()
+        if risk_level in {level.lower() for level in rules.get("escalate_risk_levels", [])}:
+            reasons.append(f"customer risk level {risk_level}")
+        for transaction in payload.get("recentTransactions", []):
+            transaction_id = transaction.get("transaction_id")
+            confidence = transaction.get("fraud_confidence")
+            if confidence is not None and confidence < rules["min_legitimate_confidence"]:
+                reasons.append(f"{transaction_id} predicted legitimate with low confidence {confidence:.2f}")
+            amount = transaction.get("transaction_amount") or 0
+            if "max_transaction_amount" in rules and amount > rules["max_transaction_amount"]:
+                reasons.append(f"{transaction_id} amount {amount} above {rules['max_transaction_amount']}")
+            if transaction.get("destination_country") in rules.get("high_risk_countries", []):
+                reasons.append(f"{transaction_id} sent to {transaction['destination_country']}")
+        return reasons
+
+    def triage(self, payload: Dict) -> Dict[str, Any]:
+        """Return ``{"outcome", "reasons"}`` for a customer payload with fraud predictions."""
+        transactions = payload.get("recentTransactions", [])
+        if not self.enabled:
+            return {"outcome": AMBIGUOUS, "reasons": ["triage disabled"]}
+        flagged = [t for t in transactions if t.get("predicted_fraud_type") not in self.legitimate_labels]
+        if not flagged:
+            reasons = self._escalations(payload)
+            if not transactions:
+                reasons.append("no recent transactions")
+            return {"outcome": AMBIGUOUS if reasons else CLEAR, "reasons": reasons}
+        confident = [t for t in flagged
+                     if (t.get("fraud_confidence") or 0) >= self.suspicious_rules["min_fraud_confidence"]]
+        if confident:
+            return {"outcome": SUSPICIOUS,
+                    "reasons": [f"{t.get('transaction_id')} predicted {t['predicted_fraud_type']} "
+                                f"with confidence {t['fraud_confidence']:.2f}" for t in confident]}
+        return {"outcome": AMBIGUOUS,
+                "reasons": [f"{len(flagged)} transactions predicted as fraud with low confidence"]}
+
+
+def clear_result(payload: Dict, decision: Dict) -> Dict:
+    """Templated no-SAR result in the SAR layout the reports view reads."""
+    transactions = payload.get("recentTransactions", [])
+    result = dict(payload)
+    result["recentTransactions"] = [
+        dict(transaction, llm_analysis=(
+            f"Predicted as {transaction.get('predicted_fraud_type')} with confidence "
+            f"{transaction.get('fraud_confidence', 0):.2f}; no triage rule flagged this transaction."))
+        for transaction in transactions
+    ]
+    result["overall_analysis"] = (
+        f"Resolved by triage without LLM review: all {len(transactions)} recent transactions were predicted "
+        f"legitimate with high confidence, with no large amounts, high-risk destinations or elevated customer "
+        f"risk. No suspicious activity was identified.")
+    result["final_sar_required"] = "No"
+    result["triage"] = decision
+    return result
+
+
+class TriageStats:
+    """
+    Triage outcome counts and the LLM time saved by resolving clear
+    customers locally.
+
+    Saved time per clear customer is the mean measured LLM analysis time in
+    this process, or ``TRIAGE_ASSUMED_LLM_SECONDS`` until one was measured,
+    minus the time triage itself took.
+    """
+
+    def __init__(self):
+        self.counts = {outcome: 0 for outcome in OUTCOMES}
+        self.triage_seconds = 0.0
+        self.llm_seconds = 0.0
+        self.llm_calls = 0
+        self.assumed_llm_seconds = float(EnvUtils().get_env("TRIAGE_ASSUMED_LLM_SECONDS", 20))
+        self._lock = threading.Lock()
+
+    def record_triage(self, outcome: str, seconds: float) -> None:
+        with self._lock:
+            self.counts[outcome] += 1
+            self.triage_seconds += seconds
+
+    def record_llm(self, seconds: float) -> None:
+        with self._lock:
+            self.llm_seconds += seconds
+            self.llm_calls += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = sum(self.counts.values())
+            mean_llm = self.llm_seconds / self.llm_calls if self.llm_calls else self.assumed_llm_seconds
+            mean_triage = self.triage_seconds / total if total else 0.0
+            return {
+                "outcomes": dict(self.counts),
+                "customers": total,
+                "llm_skipped_rate": self.counts[CLEAR] / total if total else 0.0,
+                "mean_triage_seconds": mean_triage,
+                "mean_llm_seconds": mean_llm,
+                "llm_seconds_measured": self.llm_calls > 0,
+                "latency_saved_seconds": self.counts[CLEAR] * max(mean_llm - mean_triage, 0.0),
+            }
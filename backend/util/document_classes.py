@@ -0,0 +1,39 @@
+import os
+import json
+from typing import Dict, List, Optional
+
+
+class DocumentClassifier:
+    """
+    Maps documents to a document class and its vector namespace.
+
+    Classes and their file name patterns are configured in
+    ``config/document_classes.json``. A document belongs to the first class
+    with a pattern contained in its lower-cased path or title; anything else
+    goes to the default class.
+    """
+
+    def __init__(self, config_path: Optional[str] = None):
+        config_path = config_path or os.path.join(os.path.dirname(__file__), '..', 'config', 'document_classes.json')
+        with open(config_path, 'r') as f:
+            config = json.load(f)
+        self.default_class = config['default_class']
+        self.classes: List[Dict] = config['classes']
+        self._namespaces = {c['name']: c['namespace'] for c in self.classes}
+        self._namespaces[self.default_class['name']] = self.default_class['namespace']
+
+    def classify(self, name: str) -> str:
+        """Return the document class for a file path or page title."""
+        lowered = name.lower()
+        for doc_class in self.classes:
+            if any(pattern in lowered for pattern in doc_class['patterns']):
+                return doc_class['name']
+        return self.default_class['name']
+
+    def namespace(self, doc_class: str) -> str:
+        """Return the vector namespace that holds a document class."""
+        return self._namespaces.get(doc_class, self.default_class['namespace'])
+
+    @property
+    def default_namespace(self) -> str:
+        return self.default_class['namespace']
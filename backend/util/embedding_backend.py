@@ -0,0 +1,204 @@
+import os
+import sys
+import json
+import time
+import threading
+import numpy as np
+from typing import Any, Dict, List, Optional, Sequence, Union
+from langchain_core.embeddings import Embeddings
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+from util.envutils import EnvUtils
+
+DEFAULT_MODEL = "intfloat/multilingual-e5-large"
+MODEL_ALIASES = {
+    "e5-small": "intfloat/multilingual-e5-small",
+    "e5-base": "intfloat/multilingual-e5-base",
+    "e5-large": "intfloat/multilingual-e5-large",
+}
+RUNTIMES = ("torch", "onnx")
+ONNX_CACHE_DIR = os.path.join(parent_dir, "data", "onnx_models")
+
+
+class EmbeddingBackend(Embeddings):
+    """
+    Sentence embedding model with a configurable runtime.
+
+    Wraps a ``SentenceTransformer`` running on PyTorch or ONNX Runtime
+    (optionally with dynamically quantized int8 weights). The class is also
+    a LangChain ``Embeddings`` implementation, so one loaded model serves both
+    the connectors' direct ``encode`` calls and ``PineconeVectorStore``.
+    """
+
+    def __init__(self, model_name: Optional[str] = None, runtime: Optional[str] = None,
+                 quantize: Optional[bool] = None, num_threads: Optional[int] = None):
+        from sentence_transformers import SentenceTransformer
+        env_utils = EnvUtils()
+        model_name = model_name or env_utils.get_env("EMBEDDING_MODEL", DEFAULT_MODEL)
+        self.model_name = MODEL_ALIASES.get(model_name, model_name)
+        self.runtime = (runtime or env_utils.get_env("EMBEDDING_RUNTIME", "torch")).lower()
+        if self.runtime not in RUNTIMES:
+            raise ValueError(f"Unsupported embedding runtime '{self.runtime}'. Expected one of {RUNTIMES}")
+        if quantize is None:
+            quantize = env_utils.get_env("EMBEDDING_ONNX_QUANTIZE", "false").lower() == "true"
+        self.quantize = quantize and self.runtime == "onnx"
+        num_threads = num_threads or env_utils.get_env("EMBEDDING_THREADS")
+
+        if self.runtime == "torch":
+            if num_threads:
+                import torch
+                torch.set_num_threads(int(num_threads))
+            self.model = SentenceTransformer(self.model_name, device="cpu")
+        elif self.quantize:
+            self.model = SentenceTransformer(self._quantized_onnx_dir(), backend="onnx", device="cpu",
+                                             model_kwargs={"file_name": "onnx/model_qint8_avx2.onnx"})
+        else:
+            self.model = SentenceTransformer(self.model_name, backend="onnx", device="cpu")
+        self.dimension = self.model.get_sentence_embedding_dimension()
+        self.batch_size = int(env_utils.get_env("EMBEDDING_BATCH_SIZE", 64))
+
+    @property
+    def name(self) -> str:
+        """Identifier of the model and runtime, e.g. ``intfloat/multilingual-e5-small:onnx-int8``."""
+        runtime = f"{self.runtime}-int8" if self.quantize else self.runtime
+        return f"{self.model_name}:{runtime}"
+
+    def _quantized_onnx_dir(self) -> str:
+        """Export a dynamically quantized ONNX copy of the model once and return its folder."""
+        from sentence_transformers import SentenceTransformer, export_dynamic_quantized_onnx_model
+        target = os.path.join(ONNX_CACHE_DIR, self.model_name.replace("/", "__"))
+        if not os.path.exists(os.path.join(target, "onnx", "model_qint8_avx2.onnx")):
+            print(f"Exporting quantized ONNX model for {self.model_name} to {target}")
+            model = SentenceTransformer(self.model_name, backend="onnx", device="cpu")
+            model.save_pretrained(target)
+            export_dynamic_quantized_onnx_model(model, "avx2", target)
+        return target
+
+    def encode(self, texts: Union[str, Sequence[str]], batch_size: int = 32) -> np.ndarray:
+        """Encode one text (1-D result) or a list of texts (2-D result)."""
+        return self.model.encode(texts, batch_size=batch_size, convert_to_numpy=True, show_progress_bar=False)
+
+    def encode_batched(self, texts: Sequence[str], batch_size: Optional[int] = None) -> np.ndarray:
+        """
+        Encode many texts in length-sorted buckets of ``batch_size``.
+
+        Sorting by length keeps similarly sized texts in the same batch, so
+        less of each batch is padding. Rows of the result follow the order
+        of ``texts``.
+        """
+        batch_size = batch_size or self.batch_size
+        if not texts:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        embeddings = np.empty((len(texts), self.dimension), dtype=np.float32)
+        for start in range(0, len(order), batch_size):
+            bucket = order[start:start + batch_size]
+            embeddings[bucket] = self.encode([texts[i] for i in bucket], batch_size=len(bucket))
+        return embeddings
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.encode_batched(list(texts)).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.encode(text).tolist()
+
+
+_backends: Dict[tuple, EmbeddingBackend] = {}
+_backends_lock = threading.Lock()
+
+
+def get_embedding_backend(model_name: Optional[str] = None, runtime: Optional[str] = None,
+                          quantize: Optional[bool] = None) -> EmbeddingBackend:
+    """
+    Return the process-wide backend for a configuration, loading it on first use.
+    """
+    key = (model_name, runtime, quantize)
+    with _backends_lock:
+        backend = _backends.get(key)
+        if backend is None:
+            backend = _backends[key] = EmbeddingBackend(model_name, runtime, quantize)
+        return backend
+
+
+def validate_index_dimension(index, backend: EmbeddingBackend) -> None:
+    """
+    Fail fast if the vector index was created for a different embedding size.
+
+    Raises:
+        ValueError: If the index dimension differs from the model's.
+    """
+    stats = index.describe_index_stats()
+    dimension = stats.get("dimension") if isinstance(stats, dict) else getattr(stats, "dimension", None)
+    if dimension and int(dimension) != backend.dimension:
+        raise ValueError(
+            f"Embedding model {backend.name} produces {backend.dimension}-dimensional vectors "
+            f"but the index expects {dimension}. Use a matching EMBEDDING_MODEL or a new index."
+        )
+
+
+def benchmark_backends(documents: List[str], queries: List[str], configs: List[Dict[str, Any]],
+                       reference: Optional[Dict[str, Any]] = None, top_k: int = 5) -> Dict[str, Any]:
+    """
+    Compare embedding backends on throughput, latency and retrieval agreement.
+
+    Each config holds ``EmbeddingBackend`` keyword arguments. For every
+    backend the report contains documents encoded per second, mean and p95
+    single-query latency, and the mean top-k overlap of its document ranking
+    with the reference backend's ranking (the large model by default).
+    """
+    reference = reference or {"model_name": DEFAULT_MODEL, "runtime": "torch", "quantize": False}
+
+    def run(config: Dict[str, Any]) -> Dict[str, Any]:
+        backend = EmbeddingBackend(**config)
+        started = time.perf_counter()
+        doc_vectors = backend.encode_batched(documents)
+        encode_seconds = time.perf_counter() - started
+        latencies, query_vectors = [], []
+        for query in queries:
+            started = time.perf_counter()
+            query_vectors.append(backend.encode(query))
+            latencies.append((time.perf_counter() - started) * 1000)
+        doc_vectors = doc_vectors / np.linalg.norm(doc_vectors, axis=1, keepdims=True)
+        scores = np.asarray(query_vectors) @ doc_vectors.T
+        rankings = [set(np.argsort(-row)[:top_k]) for row in scores]
+        return {
+            "name": backend.name,
+            "dimension": backend.dimension,
+            "docs_per_sec": len(documents) / encode_seconds,
+            "query_latency_ms_mean": float(np.mean(latencies)),
+            "query_latency_ms_p95": float(np.percentile(latencies, 95)),
+            "rankings": rankings,
+        }
+
+    baseline = run(reference)
+    results = []
+    for config in [reference] + list(configs):
+        result = baseline if config is reference else run(config)
+        result = dict(result)
+        rankings = result.pop("rankings")
+        result["agreement_at_k"] = float(np.mean([
+            len(r & b) / top_k for r, b in zip(rankings, baseline["rankings"])
+        ]))
+        results.append(result)
+    return {"documents": len(documents), "queries": len(queries), "top_k": top_k, "backends": results}
+
+
+# Example usage
+if __name__ == "__main__":
+    sample_documents = [
+        f"Transaction review note {i}: customer made {i % 7 + 2} cash deposits just below the reporting "
+        f"threshold across {i % 3 + 1} branches, a pattern consistent with structuring."
+        if i % 2 else
+        f"Playbook step {i}: escalate wire transfers to offshore jurisdictions above {1000 * (i % 9 + 1)} USD "
+        f"and review layering through intermediary accounts."
+        for i in range(500)
+    ]
+    sample_queries = ["Structuring", "Layering", "Rapid In-Out", "Large Wire Transfer",
+                      "Frequent Offshore Transfers"]
+    report = benchmark_backends(sample_documents, sample_queries, [
+        {"model_name": "e5-small", "runtime": "torch"},
+        {"model_name": "e5-base", "runtime": "torch"},
+        {"model_name": "e5-small", "runtime": "onnx", "quantize": True},
+    ])
+    print(json.dumps(report, indent=2))
@@ -0,0 +1,269 @@
+import os
+import re
+import sys
+import json
+import hashlib
+import argparse
+import threading
+import contextlib
+import numpy as np
+from typing import Dict, Iterable, List, Optional, Sequence
+try:
+    import fcntl
+except ImportError:
+    # Not available on Windows; appends there are only serialized within the process
+    fcntl = None
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+from util.envutils import EnvUtils
+
+DEFAULT_CACHE_DIR = os.path.join(parent_dir, "data", "embedding_cache")
+# Serializes appends between caches of this process; flock covers other processes
+_append_lock = threading.RLock()
+# Stored row precision; vectors are always returned as float32
+CACHE_QUANTIZATION_MODES = {"none": np.float32, "float16": np.float16}
+
+
+def text_hash(text: str) -> str:
+    """SHA-256 of whitespace-normalised text, the cache key within one model."""
+    return hashlib.sha256(" ".join(text.split()).encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Persistent, append-only embedding cache for one embedding model.
+
+    Vectors are appended as raw float32 rows to ``<model>.vec`` and read
+    back through a memory map; ``<model>.idx`` is an append-only log of
+    ``<text hash> <row>`` lines loaded into a dict on start-up. Processes
+    sharing the files append under an exclusive ``flock`` on ``<model>.lock``
+    and take their row numbers from its size at that point. A crash can at
+    worst leave a partial last row, truncated on load and before the next
+    append, or a partial last line and unreferenced rows, ignored on load
+    and removed by ``compact``.
+
+    With ``EMBEDDING_CACHE_QUANTIZATION=float16`` rows are stored at half
+    precision in separate ``<model>__float16`` files, halving disk and page
+    cache use; cache hits then upsert vectors rounded to float16.
+    """
+
+    def __init__(self, model_name: str, dimension: int, directory: Optional[str] = None,
+                 quantization: Optional[str] = None):
+        env_utils = EnvUtils()
+        self.model_name = model_name
+        self.dimension = dimension
+        self.quantization = (quantization or env_utils.get_env("EMBEDDING_CACHE_QUANTIZATION", "none")).lower()
+        if self.quantization not in CACHE_QUANTIZATION_MODES:
+            raise ValueError(f"Unsupported embedding cache quantization '{self.quantization}'. "
+                             f"Expected one of {tuple(CACHE_QUANTIZATION_MODES)}")
+        self.dtype = CACHE_QUANTIZATION_MODES[self.quantization]
+        self.row_bytes = np.dtype(self.dtype).itemsize * dimension
+        directory = directory or env_utils.get_env("EMBEDDING_CACHE_DIR", DEFAULT_CACHE_DIR)
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, re.sub(r"[^A-Za-z0-9_.-]+", "__", model_name))
+        if self.quantization != "none":
+            base = f"{base}__{self.quantization}"
+        self.vec_path = f"{base}.vec"
+        self.idx_path = f"{base}.idx"
+        self.meta_path = f"{base}.json"
+        self.lock_path = f"{base}.lock"
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._check_meta()
+        self._load_index()
+
+    def _check_meta(self) -> None:
+        meta = {"model_name": self.model_name, "dimension": self.dimension, "quantization": self.quantization}
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path, "r") as f:
+                stored = json.load(f)
+            if stored.get("dimension") != self.dimension:
+                raise ValueError(f"Embedding cache {self.vec_path} holds {stored.get('dimension')}-dimensional "
+                                 f"vectors, expected {self.dimension}")
+        else:
+            with open(self.meta_path, "w") as f:
+                json.dump(meta, f)
+
+    @contextlib.contextmanager
+    def _locked_vectors(self):
+        """
+        Open ``<model>.vec`` for appending under an exclusive ``flock`` on
+        ``<model>.lock``, shared with other processes. The lock lives in its
+        own file so that ``compact`` replacing the vector file keeps it valid.
+        Without ``fcntl`` only the threads of this process are serialized.
+        """
+        with _append_lock, open(self.lock_path, "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                with open(self.vec_path, "ab") as f:
+                    yield f
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _whole_rows(self, f) -> int:
+        """Number of complete rows in the locked vector file, dropping a partial last row."""
+        rows = f.seek(0, os.SEEK_END) // self.row_bytes
+        if f.tell() != rows * self.row_bytes:
+            f.truncate(rows * self.row_bytes)
+        return rows
+
+    def _read_index(self) -> None:
+        self._index: Dict[str, int] = {}
+        if os.path.exists(self.idx_path):
+            with open(self.idx_path, "r") as f:
+                for line in f:
+                    parts = line.split()
+                    if len(parts) == 2 and line.endswith("\n") and int(parts[1]) < self._rows:
+                        self._index[parts[0]] = int(parts[1])
+        self._view = None
+
+    def _load_index(self) -> None:
+        with self._locked_vectors() as f:
+            self._rows = self._whole_rows(f)
+            self._read_index()
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def _vectors(self) -> np.ndarray:
+        if self._view is None or self._view.shape[0] < self._rows:
+            self._view = np.memmap(self.vec_path, dtype=self.dtype, mode="r", shape=(self._rows, self.dimension))
+        return self._view
+
+    def get_many(self, keys: Sequence[str]) -> Dict[int, np.ndarray]:
+        """Return cached vectors by position in ``keys``; misses are absent."""
+        with self._lock:
+            rows = {i: self._index[key] for i, key in enumerate(keys) if key in self._index}
+            self.hits += len(rows)
+            self.misses += len(keys) - len(rows)
+            if not rows:
+                return {}
+            vectors = self._vectors()
+            return {i: np.array(vectors[row], dtype=np.float32) for i, row in rows.items()}
+
+    def put_many(self, keys: Sequence[str], vectors: np.ndarray) -> None:
+        """Append new vectors. Keys already cached are skipped."""
+        with self._lock:
+            new = [(key, vector) for key, vector in zip(keys, vectors) if key not in self._index]
+            if not new:
+                return
+            data = np.asarray([vector for _, vector in new], dtype=self.dtype)
+            with self._locked_vectors() as f:
+                # Other processes may have appended since this one last wrote
+                start = self._whole_rows(f)
+                f.write(data.tobytes())
+                f.flush()
+                lines = []
+                for offset, (key, _) in enumerate(new):
+                    self._index[key] = start + offset
+                    lines.append(f"{key} {start + offset}\n")
+                with open(self.idx_path, "a") as idx_file:
+                    idx_file.write("".join(lines))
+            self._rows = start + len(new)
+
+    def encode_batched(self, backend, texts: Sequence[str]) -> np.ndarray:
+        """
+        Embed ``texts`` with ``backend``, calling the model only for cache misses.
+        """
+        keys = [text_hash(text) for text in texts]
+        cached = self.get_many(keys)
+        embeddings = np.empty((len(texts), self.dimension), dtype=np.float32)
+        for i, vector in cached.items():
+            embeddings[i] = vector
+        missing = [i for i in range(len(texts)) if i not in cached]
+        if missing:
+            computed = backend.encode_batched([texts[i] for i in missing])
+            embeddings[missing] = computed
+            self.put_many([keys[i] for i in missing], computed)
+        return embeddings
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "model": self.model_name,
+            "quantization": self.quantization,
+            "entries": len(self._index),
+            "rows": self._rows,
+            "bytes": self._rows * self.row_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def compact(self, keep: Optional[Iterable[str]] = None) -> Dict[str, int]:
+        """
+        Rewrite the cache without orphaned rows, optionally keeping only the
+        keys in ``keep``. Both files are replaced atomically. The index is
+        re-read under the lock first, so rows other processes appended are
+        kept; processes that still have the cache open should be restarted
+        afterwards, as their row numbers are no longer valid.
+        """
+        with self._lock, self._locked_vectors() as f:
+            self._rows = self._whole_rows(f)
+            self._read_index()
+            keep = set(keep) if keep is not None else None
+            live = [(key, row) for key, row in self._index.items() if keep is None or key in keep]
+            vectors = self._vectors() if self._rows else None
+            tmp_vec, tmp_idx = f"{self.vec_path}.tmp", f"{self.idx_path}.tmp"
+            with open(tmp_vec, "wb") as vec_file, open(tmp_idx, "w") as idx_file:
+                for new_row, (key, row) in enumerate(live):
+                    vec_file.write(np.asarray(vectors[row], dtype=self.dtype).tobytes())
+                    idx_file.write(f"{key} {new_row}\n")
+            before = self._rows
+            self._view = None
+            os.replace(tmp_vec, self.vec_path)
+            os.replace(tmp_idx, self.idx_path)
+            self._index = {key: new_row for new_row, (key, _) in enumerate(live)}
+            self._rows = len(live)
+            return {"rows_before": before, "rows_after": self._rows}
+
+
+_caches: Dict[str, EmbeddingCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_embedding_cache(backend) -> Optional[EmbeddingCache]:
+    """
+    Return the process-wide cache for a backend, or None when
+    ``EMBEDDING_CACHE_ENABLED`` is false.
+    """
+    if EnvUtils().get_env("EMBEDDING_CACHE_ENABLED", "true").lower() != "true":
+        return None
+    with _caches_lock:
+        cache = _caches.get(backend.name)
+        if cache is None:
+            cache = _caches[backend.name] = EmbeddingCache(backend.name, backend.dimension)
+        return cache
+
+
+def encode_with_cache(backend, texts: Sequence[str]) -> np.ndarray:
+    """Embed texts through the backend's persistent cache when it is enabled."""
+    cache = get_embedding_cache(backend)
+    if cache is None:
+        return backend.encode_batched(texts)
+    return cache.encode_batched(backend, texts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or compact the embedding caches")
+    parser.add_argument("--compact", action="store_true", help="rewrite caches without orphaned rows")
+    parser.add_argument("--dir", default=None, help="cache directory")
+    args = parser.parse_args()
+    directory = args.dir or EnvUtils().get_env("EMBEDDING_CACHE_DIR", DEFAULT_CACHE_DIR)
+    for name in sorted(os.listdir(directory)) if os.path.isdir(directory) else []:
+        if not name.endswith(".json"):
+            continue
+        with open(os.path.join(directory, name), "r") as f:
+            meta = json.load(f)
+        cache = EmbeddingCache(meta["model_name"], meta["dimension"], directory, meta.get("quantization", "none"))
+        if args.compact:
+            print(meta["model_name"], cache.compact())
+        print(json.dumps(cache.stats()))
+
+
+if __name__ == "__main__":
+    main()
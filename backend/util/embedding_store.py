@@ -0,0 +1,343 @@
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import numpy as np
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+from util.envutils import EnvUtils
+
+QUANTIZATION_MODES = ("none", "float16", "int8")
+
+
+class EmbeddingStore:
+    """
+    In-memory vector store with optional scalar quantization.
+
+    Vectors are L2-normalised on insert so scores are cosine similarities,
+    matching the Pinecone index. With ``float16`` or ``int8`` quantization
+    only the quantized matrix is held in RAM; the original float32 vectors
+    are appended to a memory-mapped file and read back only to rescore the
+    top candidates of each search. That file mirrors the in-memory rows of
+    this store only, so an existing one is truncated on open; stores must
+    not share a ``storage_dir``.
+
+    The public methods mirror the subset of the Pinecone ``Index`` API used
+    by the connectors (``upsert``, ``query``, ``delete``), so the ingestion
+    benchmark can run the connector against it instead of Pinecone. No
+    runtime search path uses it; the runtime quantization option is
+    ``EMBEDDING_CACHE_QUANTIZATION`` in ``util.embedding_cache``.
+    """
+
+    def __init__(self, dimension: int, quantization: Optional[str] = None,
+                 rescore_factor: Optional[int] = None, storage_dir: Optional[str] = None):
+        env_utils = EnvUtils()
+        self.dimension = dimension
+        self.quantization = (quantization or env_utils.get_env("EMBEDDING_QUANTIZATION", "none")).lower()
+        if self.quantization not in QUANTIZATION_MODES:
+            raise ValueError(f"Unsupported quantization '{self.quantization}'. "
+                             f"Expected one of {QUANTIZATION_MODES}")
+        self.rescore_factor = int(rescore_factor or env_utils.get_env("EMBEDDING_RESCORE_FACTOR", 4))
+
+        self._ids: List[str] = []
+        self._metadata: List[Dict[str, Any]] = []
+        self._id_to_row: Dict[str, int] = {}
+        self._alive = np.zeros(0, dtype=bool)
+        self._size = 0
+
+        dtype = {"none": np.float32, "float16": np.float16, "int8": np.int8}[self.quantization]
+        self._matrix = np.zeros((0, dimension), dtype=dtype)
+        self._scales = np.zeros(0, dtype=np.float32)
+
+        # Full precision copies used only for rescoring, kept on disk
+        self._float_path = None
+        self._float_file = None
+        self._float_view = None
+        self._owned_dir = None
+        if self.quantization != "none":
+            if storage_dir is None:
+                storage_dir = self._owned_dir = tempfile.mkdtemp(prefix="embedding_store_")
+            os.makedirs(storage_dir, exist_ok=True)
+            self._float_path = os.path.join(storage_dir, "vectors.f32")
+            # Rows left by an earlier store would be misread as this store's rows
+            self._float_file = open(self._float_path, "wb+")
+
+    def __len__(self) -> int:
+        return len(self._id_to_row)
+
+    def _grow(self, extra: int) -> None:
+        """Grow the backing arrays geometrically to fit ``extra`` more rows."""
+        needed = self._size + extra
+        capacity = self._matrix.shape[0]
+        if needed <= capacity:
+            return
+        new_capacity = max(needed, capacity * 2, 1024)
+        matrix = np.zeros((new_capacity, self.dimension), dtype=self._matrix.dtype)
+        matrix[:self._size] = self._matrix[:self._size]
+        self._matrix = matrix
+        scales = np.zeros(new_capacity, dtype=np.float32)
+        scales[:self._size] = self._scales[:self._size]
+        self._scales = scales
+        alive = np.zeros(new_capacity, dtype=bool)
+        alive[:self._size] = self._alive[:self._size]
+        self._alive = alive
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def _quantize(self, vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the stored representation and per-vector scales."""
+        if self.quantization == "int8":
+            scales = np.abs(vectors).max(axis=1) / 127.0
+            scales[scales == 0] = 1.0
+            quantized = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+            return quantized, scales.astype(np.float32)
+        if self.quantization == "float16":
+            return vectors.astype(np.float16), np.ones(len(vectors), dtype=np.float32)
+        return vectors.astype(np.float32), np.ones(len(vectors), dtype=np.float32)
+
+    def _float_rows(self, rows: np.ndarray) -> np.ndarray:
+        """Read full precision vectors for the given rows."""
+        if self.quantization == "none":
+            return self._matrix[rows]
+        if self._float_view is None or self._float_view.shape[0] < self._size:
+            self._float_file.flush()
+            self._float_view = np.memmap(self._float_path, dtype=np.float32, mode="r",
+                                         shape=(self._size, self.dimension))
+        return np.asarray(self._float_view[rows])
+
+    def upsert(self, vectors: Iterable[Tuple[str, Sequence[float], Dict[str, Any]]], **kwargs) -> Dict[str, int]:
+        """
+        Insert or replace vectors given as ``(id, values, metadata)`` tuples.
+        """
+        # Only the last occurrence of an id repeated within the batch is kept
+        vectors = list({v[0]: v for v in vectors}.values())
+        if not vectors:
+            return {"upserted_count": 0}
+        values = np.asarray([v[1] for v in vectors], dtype=np.float32)
+        if values.ndim != 2 or values.shape[1] != self.dimension:
+            raise ValueError(f"Expected vectors of dimension {self.dimension}, got {values.shape}")
+        values = self._normalize(values)
+
+        # Replaced ids are tombstoned and re-appended
+        self.delete(ids=[v[0] for v in vectors if v[0] in self._id_to_row])
+
+        quantized, scales = self._quantize(values)
+        self._grow(len(vectors))
+        start, end = self._size, self._size + len(vectors)
+        self._matrix[start:end] = quantized
+        self._scales[start:end] = scales
+        self._alive[start:end] = True
+        if self._float_file is not None:
+            self._float_file.write(values.tobytes())
+            self._float_view = None
+        for offset, (vector_id, _, metadata) in enumerate(vectors):
+            self._ids.append(vector_id)
+            self._metadata.append(dict(metadata or {}))
+            self._id_to_row[vector_id] = start + offset
+        self._size = end
+        return {"upserted_count": len(vectors)}
+
+    def delete(self, ids: Optional[Iterable[str]] = None, **kwargs) -> None:
+        """Remove vectors by id. Unknown ids are ignored."""
+        for vector_id in ids or []:
+            row = self._id_to_row.pop(vector_id, None)
+            if row is not None:
+                self._alive[row] = False
+
+    def _approximate_scores(self, query: np.ndarray, block_size: int = 65536) -> np.ndarray:
+        """Score the query against the quantized matrix in blocks."""
+        scores = np.empty(self._size, dtype=np.float32)
+        for start in range(0, self._size, block_size):
+            end = min(start + block_size, self._size)
+            block = self._matrix[start:end]
+            if block.dtype != np.float32:
+                block = block.astype(np.float32)
+            scores[start:end] = block @ query
+        if self.quantization == "int8":
+            scores *= self._scales[:self._size]
+        scores[~self._alive[:self._size]] = -np.inf
+        return scores
+
+    def search(self, vector: Sequence[float], top_k: int = 10, rescore: bool = True) -> List[Tuple[int, float]]:
+        """
+        Return ``(row, score)`` pairs for the best matches.
+
+        Candidates are selected on the quantized vectors; when ``rescore`` is
+        set the top ``top_k * rescore_factor`` candidates are re-ranked with
+        exact float32 scores.
+        """
+        live = len(self)
+        if live == 0 or top_k <= 0:
+            return []
+        query = self._normalize(np.asarray(vector, dtype=np.float32).reshape(1, -1))[0]
+        scores = self._approximate_scores(query)
+
+        exact = rescore and self.quantization != "none"
+        candidates = min(live, top_k * self.rescore_factor if exact else top_k)
+        rows = np.argpartition(-scores, candidates - 1)[:candidates]
+        if exact:
+            rows = np.sort(rows)
+            candidate_scores = self._float_rows(rows) @ query
+        else:
+            candidate_scores = scores[rows]
+        order = np.argsort(-candidate_scores)[:top_k]
+        return [(int(rows[i]), float(candidate_scores[i])) for i in order]
+
+    def query(self, vector: Sequence[float], top_k: int = 10, include_metadata: bool = True,
+              include_values: bool = False, **kwargs) -> Dict[str, List[Dict[str, Any]]]:
+        """Pinecone compatible query returning ``{"matches": [...]}``."""
+        matches = []
+        for row, score in self.search(vector, top_k=top_k):
+            match = {"id": self._ids[row], "score": score}
+            if include_metadata:
+                match["metadata"] = self._metadata[row]
+            if include_values:
+                match["values"] = self._float_rows(np.array([row]))[0].tolist()
+            matches.append(match)
+        return {"matches": matches}
+
+    def memory_bytes(self) -> int:
+        """Bytes held in RAM by the searchable representation of live rows; tombstoned rows are not counted."""
+        per_row = self._matrix.dtype.itemsize * self.dimension
+        if self.quantization == "int8":
+            per_row += self._scales.dtype.itemsize
+        return per_row * len(self)
+
+    def describe_index_stats(self, **kwargs) -> Dict[str, Any]:
+        return {
+            "dimension": self.dimension,
+            "total_vector_count": len(self),
+            "quantization": self.quantization,
+            "memory_bytes": self.memory_bytes(),
+        }
+
+    def close(self) -> None:
+        """Release the rescoring file, and delete its directory if this store created it."""
+        self._float_view = None
+        if self._float_file is not None:
+            self._float_file.close()
+            self._float_file = None
+        if self._owned_dir is not None:
+            shutil.rmtree(self._owned_dir, ignore_errors=True)
+            self._owned_dir = None
+
+
+class NamespacedEmbeddingStore:
+    """
+    Pinecone style namespaces over :class:`EmbeddingStore`.
+
+    Each namespace is a separate store, so a query with a namespace only
+    scans the vectors of that partition.
+    """
+
+    def __init__(self, dimension: int, quantization: Optional[str] = None,
+                 rescore_factor: Optional[int] = None, storage_dir: Optional[str] = None):
+        self.dimension = dimension
+        self._options = {"quantization": quantization, "rescore_factor": rescore_factor}
+        self._storage_dir = storage_dir
+        self._namespaces: Dict[str, EmbeddingStore] = {}
+
+    def _store(self, namespace: Optional[str]) -> EmbeddingStore:
+        namespace = namespace or ""
+        store = self._namespaces.get(namespace)
+        if store is None:
+            storage_dir = os.path.join(self._storage_dir, namespace or "_default") if self._storage_dir else None
+            store = self._namespaces[namespace] = EmbeddingStore(self.dimension, storage_dir=storage_dir,
+                                                                 **self._options)
+        return store
+
+    def upsert(self, vectors, namespace: Optional[str] = None, **kwargs) -> Dict[str, int]:
+        return self._store(namespace).upsert(vectors)
+
+    def delete(self, ids=None, namespace: Optional[str] = None, **kwargs) -> None:
+        self._store(namespace).delete(ids=ids)
+
+    def query(self, vector, top_k: int = 10, namespace: Optional[str] = None, **kwargs):
+        return self._store(namespace).query(vector, top_k=top_k, **kwargs)
+
+    def describe_index_stats(self, **kwargs) -> Dict[str, Any]:
+        return {
+            "dimension": self.dimension,
+            "total_vector_count": sum(len(s) for s in self._namespaces.values()),
+            "namespaces": {ns: {"vector_count": len(s)} for ns, s in self._namespaces.items()},
+        }
+
+    def close(self) -> None:
+        for store in self._namespaces.values():
+            store.close()
+
+
+def quantization_report(vectors: np.ndarray, queries: np.ndarray, top_k: int = 10,
+                        modes: Sequence[str] = ("float16", "int8"), rescore_factor: int = 4) -> Dict[str, Any]:
+    """
+    Compare quantized search against unquantized float32 search.
+
+    For every mode, reports recall@k of the quantized search with and without
+    exact rescoring (relative to the float32 top k), mean and p95 query
+    latency in milliseconds and the RAM footprint of the stored vectors.
+    """
+    ids = [str(i) for i in range(len(vectors))]
+
+    def build(mode: str) -> EmbeddingStore:
+        store = EmbeddingStore(vectors.shape[1], quantization=mode, rescore_factor=rescore_factor)
+        store.upsert(zip(ids, vectors, [{}] * len(ids)))
+        return store
+
+    def run(store: EmbeddingStore, rescore: bool) -> Tuple[List[set], List[float]]:
+        results, latencies = [], []
+        for query in queries:
+            started = time.perf_counter()
+            matches = store.search(query, top_k=top_k, rescore=rescore)
+            latencies.append((time.perf_counter() - started) * 1000)
+            results.append({row for row, _ in matches})
+        return results, latencies
+
+    def recall(results: List[set], truth: List[set]) -> float:
+        return float(np.mean([len(r & t) / max(len(t), 1) for r, t in zip(results, truth)]))
+
+    baseline = build("none")
+    truth, baseline_latencies = run(baseline, rescore=False)
+    report = {
+        "vectors": len(vectors),
+        "dimension": int(vectors.shape[1]),
+        "queries": len(queries),
+        "top_k": top_k,
+        "none": {
+            "recall": 1.0,
+            "latency_ms_mean": float(np.mean(baseline_latencies)),
+            "latency_ms_p95": float(np.percentile(baseline_latencies, 95)),
+            "memory_bytes": baseline.memory_bytes(),
+        },
+    }
+    for mode in modes:
+        store = build(mode)
+        approximate, _ = run(store, rescore=False)
+        rescored, latencies = run(store, rescore=True)
+        report[mode] = {
+            "recall_no_rescore": recall(approximate, truth),
+            "recall": recall(rescored, truth),
+            "latency_ms_mean": float(np.mean(latencies)),
+            "latency_ms_p95": float(np.percentile(latencies, 95)),
+            "memory_bytes": store.memory_bytes(),
+            "compression": baseline.memory_bytes() / max(store.memory_bytes(), 1),
+        }
+        store.close()
+    baseline.close()
+    return report
+
+
+# Example usage
+if __name__ == "__main__":
+    rng = np.random.default_rng(42)
+    sample_vectors = rng.standard_normal((20000, 1024)).astype(np.float32)
+    sample_queries = sample_vectors[rng.choice(len(sample_vectors), 50, replace=False)]
+    sample_queries = sample_queries + 0.1 * rng.standard_normal(sample_queries.shape).astype(np.float32)
+    print(json.dumps(quantization_report(sample_vectors, sample_queries), indent=2))
@@ -0,0 +1,156 @@
+import os
+import sys
+import json
+import time
+import threading
+import multiprocessing
+import concurrent.futures
+import numpy as np
+from typing import Any, Dict, List, Optional, Sequence
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+from util.envutils import EnvUtils
+from util.embedding_backend import EmbeddingBackend, get_embedding_backend
+
+# Model used inside a worker process
+_worker_backend: Optional[EmbeddingBackend] = None
+
+
+def _pin_threads(threads: int) -> None:
+    """Limit the math libraries of this process to ``threads`` intra-op threads."""
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[var] = str(threads)
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+
+
+def _init_worker(threads: int, model_name: Optional[str], runtime: Optional[str], quantize: Optional[bool]) -> None:
+    global _worker_backend
+    _pin_threads(threads)
+    _worker_backend = EmbeddingBackend(model_name, runtime, quantize, num_threads=threads)
+
+
+def _encode_in_worker(texts: List[str], batch_size: int) -> np.ndarray:
+    return _worker_backend.encode_batched(texts, batch_size=batch_size)
+
+
+class EmbeddingWorkerPool:
+    """
+    Encodes texts on a pool of worker processes, each with a pinned number
+    of intra-op threads.
+
+    Workers are always spawned and load their own model copy. Forking is
+    not offered: the pool's workers start lazily, by which time the parent
+    runs pipeline threads and a busy OpenMP runtime a child must not inherit.
+
+    ``encode_batched`` sorts the texts by length and cuts them into tasks of
+    at most ``task_batches`` model batches, smaller when that is needed to
+    give every worker a share, so the pool is a drop-in replacement for
+    ``EmbeddingBackend`` when embedding chunk batches.
+    """
+
+    def __init__(self, backend: Optional[EmbeddingBackend] = None, processes: Optional[int] = None,
+                 threads_per_worker: Optional[int] = None, task_batches: Optional[int] = None):
+        env_utils = EnvUtils()
+        self.backend = backend or get_embedding_backend()
+        cpus = os.cpu_count() or 1
+        self.processes = max(1, int(processes or env_utils.get_env("EMBEDDING_WORKERS", 1)))
+        # Split the cores between workers so that processes x threads does not exceed them
+        self.threads_per_worker = max(1, int(threads_per_worker or
+                                             env_utils.get_env("EMBEDDING_WORKER_THREADS", cpus // self.processes)))
+        self.task_batches = int(task_batches or env_utils.get_env("EMBEDDING_TASK_BATCHES", 2))
+        self.batch_size = self.backend.batch_size
+        self.dimension = self.backend.dimension
+        self._executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=self.processes, mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.threads_per_worker, self.backend.model_name, self.backend.runtime, self.backend.quantize))
+
+    @property
+    def name(self) -> str:
+        return self.backend.name
+
+    def encode_batched(self, texts: Sequence[str], batch_size: Optional[int] = None) -> np.ndarray:
+        """Encode texts on the workers; rows of the result follow the order of ``texts``."""
+        batch_size = batch_size or self.batch_size
+        if not texts:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        task_size = min(batch_size * self.task_batches, max(-(-len(texts) // self.processes), 8))
+        tasks = [order[start:start + task_size] for start in range(0, len(order), task_size)]
+        futures = [self._executor.submit(_encode_in_worker, [texts[i] for i in task], batch_size)
+                   for task in tasks]
+        embeddings = np.empty((len(texts), self.dimension), dtype=np.float32)
+        for task, future in zip(tasks, futures):
+            embeddings[task] = future.result()
+        return embeddings
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.encode_batched(list(texts)).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.backend.embed_query(text)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+
+
+_pool: Optional[EmbeddingWorkerPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_embedding_encoder(backend: Optional[EmbeddingBackend] = None):
+    """
+    Return the process-wide worker pool when ``EMBEDDING_WORKERS`` is above
+    one, otherwise the in-process backend.
+    """
+    global _pool
+    backend = backend or get_embedding_backend()
+    if int(EnvUtils().get_env("EMBEDDING_WORKERS", 1)) <= 1:
+        return backend
+    with _pool_lock:
+        if _pool is None or _pool.backend is not backend:
+            _pool = EmbeddingWorkerPool(backend)
+        return _pool
+
+
+def benchmark_worker_scaling(texts: List[str], worker_counts: Sequence[int]) -> Dict[str, Any]:
+    """
+    Encode the same texts with pools of different sizes and report texts
+    per second and speed-up over the in-process backend.
+    """
+    backend = get_embedding_backend()
+    # Warm up, then time the in-process baseline
+    backend.encode_batched(texts[:backend.batch_size])
+    started = time.perf_counter()
+    backend.encode_batched(texts)
+    baseline = len(texts) / (time.perf_counter() - started)
+    results = [{"workers": 0, "threads_per_worker": None, "texts_per_sec": baseline, "speedup": 1.0}]
+    for count in worker_counts:
+        pool = EmbeddingWorkerPool(backend, processes=count)
+        try:
+            pool.encode_batched(texts[:pool.batch_size * count])
+            started = time.perf_counter()
+            pool.encode_batched(texts)
+            rate = len(texts) / (time.perf_counter() - started)
+        finally:
+            pool.close()
+        results.append({"workers": count, "threads_per_worker": pool.threads_per_worker,
+                        "texts_per_sec": rate, "speedup": rate / baseline})
+    return {"texts": len(texts), "cpus": os.cpu_count(), "model": backend.name, "results": results}
+
+
+# Example usage
+if __name__ == "__main__":
+    sample_texts = [
+        f"Transaction review note {i}: customer made {i % 7 + 2} cash deposits just below the reporting "
+        f"threshold across {i % 3 + 1} branches, a pattern consistent with structuring." * (1 + i % 4)
+        for i in range(2000)
+    ]
+    cpus = os.cpu_count() or 1
+    counts = sorted({n for n in (1, 2, 4, 8, cpus) if n <= cpus})
+    print(json.dumps(benchmark_worker_scaling(sample_texts, counts), indent=2))
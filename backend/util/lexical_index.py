@@ -0,0 +1,212 @@
+import os
+import re
+import sys
+import math
+import pickle
+import threading
+from array import array
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+from util.envutils import EnvUtils
+
+DEFAULT_INDEX_PATH = os.path.join(parent_dir, "data", "lexical_index.pkl")
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has in is it its of on or that the this to was were will with".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens with common English stopwords removed."""
+    return [t for t in _TOKEN_PATTERN.findall(text.lower()) if t not in _STOPWORDS]
+
+
+class BM25Index:
+    """
+    Incremental inverted index with BM25 scoring.
+
+    Each term maps to a pair of typed arrays holding the internal document
+    numbers (in insertion order) and the term frequencies, which keeps
+    posting lists compact compared to per-posting Python objects. Documents
+    are keyed by their vector id; re-adding an id or removing it tombstones
+    the old entry so ingestion can call ``add`` without a prior lookup.
+
+    Posting lists are kept per partition (the document class), so a search
+    restricted to one partition only walks that partition's postings.
+    """
+
+    def __init__(self, path: Optional[str] = None, k1: float = 1.5, b: float = 0.75):
+        self.path = path or EnvUtils().get_env("LEXICAL_INDEX_PATH", DEFAULT_INDEX_PATH)
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._doc_ids: List[str] = []
+        self._doc_meta: List[Dict[str, Any]] = []
+        self._doc_len = array("I")
+        self._doc_partition: List[str] = []
+        self._postings: Dict[str, Dict[str, Tuple[array, array]]] = defaultdict(dict)
+        self._id_to_doc: Dict[str, int] = {}
+        self._deleted = set()
+        self._partition_docs: Dict[str, int] = defaultdict(int)
+        self._partition_len: Dict[str, int] = defaultdict(int)
+        self._mtime = None
+
+    def __len__(self) -> int:
+        return len(self._id_to_doc)
+
+    def add(self, doc_id: str, text: str, metadata: Optional[Dict[str, Any]] = None,
+            partition: str = "") -> None:
+        """Index a chunk under ``doc_id``, replacing any previous version."""
+        tokens = tokenize(text)
+        counts: Dict[str, int] = defaultdict(int)
+        for token in tokens:
+            counts[token] += 1
+        with self._lock:
+            self._remove_locked(doc_id)
+            doc_num = len(self._doc_ids)
+            self._doc_ids.append(doc_id)
+            meta = dict(metadata or {})
+            meta.setdefault("text", text)
+            self._doc_meta.append(meta)
+            self._doc_len.append(len(tokens))
+            self._doc_partition.append(partition)
+            self._partition_docs[partition] += 1
+            self._partition_len[partition] += len(tokens)
+            self._id_to_doc[doc_id] = doc_num
+            partition_postings = self._postings[partition]
+            for term, tf in counts.items():
+                postings = partition_postings.get(term)
+                if postings is None:
+                    postings = partition_postings[term] = (array("I"), array("H"))
+                postings[0].append(doc_num)
+                postings[1].append(min(tf, 65535))
+
+    def remove(self, doc_ids: Iterable[str]) -> None:
+        """Tombstone the given ids; they are dropped on the next ``compact``."""
+        with self._lock:
+            for doc_id in doc_ids:
+                self._remove_locked(doc_id)
+
+    def _remove_locked(self, doc_id: str) -> None:
+        doc_num = self._id_to_doc.pop(doc_id, None)
+        if doc_num is not None:
+            self._deleted.add(doc_num)
+            partition = self._doc_partition[doc_num]
+            self._partition_docs[partition] -= 1
+            self._partition_len[partition] -= self._doc_len[doc_num]
+
+    def search(self, query: str, top_k: int = 5,
+               partition: Optional[str] = None) -> List[Tuple[str, float, Dict[str, Any]]]:
+        """
+        Return ``(doc_id, score, metadata)`` tuples ranked by BM25.
+
+        With ``partition`` set only that partition is scanned and its own
+        collection statistics are used.
+        """
+        terms = set(tokenize(query))
+        with self._lock:
+            partitions = [partition] if partition is not None else list(self._postings)
+            live = sum(self._partition_docs.get(p, 0) for p in partitions)
+            if live <= 0 or not terms:
+                return []
+            total_len = sum(self._partition_len.get(p, 0) for p in partitions)
+            k1, b = self.k1, self.b
+            length_factor = b / max(total_len / live, 1e-9)
+            doc_len, deleted = self._doc_len, self._deleted
+            scores: Dict[int, float] = defaultdict(float)
+            for term in terms:
+                term_postings = [self._postings[p][term] for p in partitions
+                                 if p in self._postings and term in self._postings[p]]
+                if not term_postings:
+                    continue
+                df = sum(len(doc_nums) for doc_nums, _ in term_postings)
+                weight = math.log(1 + (live - df + 0.5) / (df + 0.5)) * (k1 + 1)
+                for doc_nums, freqs in term_postings:
+                    for doc_num, tf in zip(doc_nums, freqs):
+                        if deleted and doc_num in deleted:
+                            continue
+                        scores[doc_num] += weight * tf / (tf + k1 * (1 - b + length_factor * doc_len[doc_num]))
+            best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+            return [(self._doc_ids[n], score, self._doc_meta[n]) for n, score in best]
+
+    def compact(self) -> None:
+        """Rebuild posting lists without tombstoned documents."""
+        with self._lock:
+            if not self._deleted:
+                return
+            live = [(self._doc_ids[n], self._doc_meta[n], self._doc_partition[n])
+                    for n in sorted(self._id_to_doc.values())]
+            self._reset()
+            for doc_id, meta, partition in live:
+                self.add(doc_id, meta.get("text", ""), meta, partition=partition)
+
+    def save(self, path: Optional[str] = None) -> None:
+        """Compact and atomically write the index to disk."""
+        path = path or self.path
+        with self._lock:
+            self.compact()
+            state = {
+                "doc_ids": self._doc_ids,
+                "doc_meta": self._doc_meta,
+                "doc_len": self._doc_len,
+                "doc_partition": self._doc_partition,
+                "postings": dict(self._postings),
+            }
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "wb") as f:
+                pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+            self._mtime = os.path.getmtime(path)
+
+    def load(self, path: Optional[str] = None) -> bool:
+        """Load the index from disk. Returns False if no index file exists."""
+        path = path or self.path
+        if not os.path.exists(path):
+            return False
+        with open(path, "rb") as f:
+            state = pickle.load(f)
+        with self._lock:
+            self._reset()
+            self._doc_ids = state["doc_ids"]
+            self._doc_meta = state["doc_meta"]
+            self._doc_len = state["doc_len"]
+            self._doc_partition = state.get("doc_partition", [""] * len(self._doc_ids))
+            postings = state["postings"]
+            if postings and not isinstance(next(iter(postings.values())), dict):
+                # Index written before partitioning: everything is in the default partition
+                postings = {"": postings}
+            self._postings.update(postings)
+            self._id_to_doc = {doc_id: n for n, doc_id in enumerate(self._doc_ids)}
+            for doc_num, partition in enumerate(self._doc_partition):
+                self._partition_docs[partition] += 1
+                self._partition_len[partition] += self._doc_len[doc_num]
+            self._mtime = os.path.getmtime(path)
+        return True
+
+    def refresh(self) -> None:
+        """Reload the index if another process has rewritten the file."""
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return
+        if mtime != self._mtime:
+            self.load()
+
+
+def reciprocal_rank_fusion(rankings: Iterable[List[str]], k: int = 60) -> List[str]:
+    """
+    Fuse several ranked lists of keys into one using reciprocal rank fusion.
+    """
+    scores: Dict[str, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, key in enumerate(ranking):
+            scores[key] += 1.0 / (k + rank + 1)
+    return [key for key, _ in sorted(scores.items(), key=lambda item: item[1], reverse=True)]
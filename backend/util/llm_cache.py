@@ -0,0 +1,204 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import sqlite3
+import argparse
+import threading
+from typing import Any, Dict, Optional, Sequence
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+from util.envutils import EnvUtils
+
+DEFAULT_CACHE_PATH = os.path.join(parent_dir, "data", "llm_cache.db")
+
+
+def canonical_json(data: Any) -> str:
+    """JSON with sorted keys and no whitespace, so equal payloads serialize identically."""
+    if isinstance(data, str):
+        data = json.loads(data)
+    return json.dumps(data, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def response_key(model: str, template: str, payload: Any, chunks: Sequence[str]) -> str:
+    """
+    SHA-256 over the model, the prompt template, the canonical payload JSON
+    and the context chunks in prompt order.
+    """
+    digest = hashlib.sha256()
+    for part in (model, template, canonical_json(payload), *chunks):
+        encoded = part.encode("utf-8")
+        # Length prefixes keep the boundaries between parts unambiguous
+        digest.update(str(len(encoded)).encode("ascii") + b":" + encoded)
+    return digest.hexdigest()
+
+
+class LLMResponseCache:
+    """
+    SQLite cache of LLM responses for deterministic (temperature 0) prompts.
+
+    Entries expire ``ttl_seconds`` after they were written and the least
+    recently used ones are evicted once the stored responses exceed
+    ``max_bytes``. The database runs in WAL mode, so API workers in
+    separate processes share one cache file. Every entry records how long
+    the original completion took; a hit adds that latency, minus the
+    lookup time, to the entry's saved total.
+    """
+
+    def __init__(self, path: Optional[str] = None, ttl_seconds: Optional[float] = None,
+                 max_bytes: Optional[int] = None):
+        env_utils = EnvUtils()
+        self.path = path or env_utils.get_env("LLM_CACHE_PATH", DEFAULT_CACHE_PATH)
+        self.ttl_seconds = float(ttl_seconds or env_utils.get_env("LLM_CACHE_TTL_SECONDS", 7 * 24 * 3600))
+        self.max_bytes = int(max_bytes or env_utils.get_env("LLM_CACHE_MAX_BYTES", 100 * 1024 * 1024))
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.saved_ms = 0.0
+        # Other processes may hold the write lock briefly; wait instead of failing
+        self.connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                model TEXT,
+                response TEXT,
+                size INTEGER,
+                latency_ms REAL,
+                created_at REAL,
+                last_used_at REAL,
+                hits INTEGER DEFAULT 0,
+                saved_ms REAL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS responses_by_use ON responses (last_used_at);
+        """)
+        self.connection.commit()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Return ``{"response", "latency_ms", "saved_ms"}`` for a live entry,
+        or None on a miss. Expired entries count as misses and are removed.
+        """
+        started = time.perf_counter()
+        now = time.time()
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT response, latency_ms, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[2] > self.ttl_seconds:
+                if row is not None:
+                    self.connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self.connection.commit()
+                self.misses += 1
+                return None
+            response, latency_ms, _ = row
+            saved_ms = max(latency_ms - (time.perf_counter() - started) * 1000, 0.0)
+            self.connection.execute(
+                "UPDATE responses SET hits = hits + 1, saved_ms = saved_ms + ?, last_used_at = ? WHERE key = ?",
+                (saved_ms, now, key)
+            )
+            self.connection.commit()
+            self.hits += 1
+            self.saved_ms += saved_ms
+        return {"response": response, "latency_ms": latency_ms, "saved_ms": saved_ms}
+
+    def put(self, key: str, model: str, response: str, latency_ms: float) -> None:
+        """Store a response with the latency of the completion that produced it, then evict."""
+        now = time.time()
+        with self._lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO responses (key, model, response, size, latency_ms, created_at, last_used_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, model, response, len(response.encode("utf-8")), latency_ms, now, now)
+            )
+            self._evict(now)
+            self.connection.commit()
+
+    def _evict(self, now: float) -> int:
+        removed = self.connection.execute(
+            "DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,)
+        ).rowcount
+        total = self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return removed
+        # Walk from the least recently used entry until enough bytes are freed
+        excess, victims = total - self.max_bytes, []
+        for key, size in self.connection.execute("SELECT key, size FROM responses ORDER BY last_used_at"):
+            victims.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        self.connection.executemany("DELETE FROM responses WHERE key = ?", victims)
+        return removed + len(victims)
+
+    def purge(self) -> int:
+        """Drop expired entries and enforce the size bound; returns the number removed."""
+        with self._lock:
+            removed = self._evict(time.time())
+            self.connection.commit()
+        return removed
+
+    def clear(self) -> None:
+        with self._lock:
+            self.connection.execute("DELETE FROM responses")
+            self.connection.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters of this process and totals over all processes sharing the file."""
+        with self._lock:
+            entries, size, hits, saved_ms = self.connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(hits), 0), COALESCE(SUM(saved_ms), 0) "
+                "FROM responses"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "saved_seconds": self.saved_ms / 1000,
+            "total_hits": hits,
+            "total_saved_seconds": saved_ms / 1000,
+        }
+
+
+_cache: Optional[LLMResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> Optional[LLMResponseCache]:
+    """
+    Return the process-wide response cache, or None when
+    ``LLM_CACHE_ENABLED`` is false.
+    """
+    global _cache
+    if EnvUtils().get_env("LLM_CACHE_ENABLED", "true").lower() != "true":
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = LLMResponseCache()
+        return _cache
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect, purge or clear the LLM response cache")
+    parser.add_argument("--purge", action="store_true", help="drop expired entries and enforce the size bound")
+    parser.add_argument("--clear", action="store_true", help="remove every entry")
+    parser.add_argument("--path", default=None, help="cache database")
+    args = parser.parse_args()
+    cache = LLMResponseCache(args.path)
+    if args.clear:
+        cache.clear()
+    elif args.purge:
+        print(f"Removed {cache.purge()} entries")
+    print(json.dumps(cache.stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
 import React, { useState } from 'react';
-import { fetchTransactions, analyzeTransaction } from '../services/transactionService';
+import { fetchTransactions, streamTransactionAnalysis } from '../services/transactionService';
 
 const TransactionTable = () => {
   const [startDate, setStartDate] = useState('');
@@ -11,6 +11,8 @@ const TransactionTable = () => {
   const [totalRecords, setTotalRecords] = useState(0);
   const [pageSize] = useState(10);
   const [analysisMessage, setAnalysisMessage] = useState('')
+  const [analysisStage, setAnalysisStage] = useState('');
+  const [analysisText, setAnalysisText] = useState('');
 
   const handleSearch = async () => {
     setLoading(true);
@@ -27,20 +29,43 @@ const TransactionTable = () => {
     }
   };
 
-  const handleAnalyze = async (customerId) => {
+  const stageLabels = {
+    fetched: 'Customer transactions fetched',
+    scored: 'Fraud types predicted',
+    triaged: (data) => (data.outcome === 'clear'
+      ? 'Triage: all transactions look legitimate, no LLM review needed'
+      : `Triage: ${data.outcome}, starting full analysis`),
+    retrieved: 'Compliance context retrieved, generating report...',
+    analyzed_group: (data) =>
+      `Analyzed ${data.completed} of ${data.groups} transaction groups` +
+      (data.groups_failed ? `, ${data.groups_failed} failed` : ''),
+  };
+
+  const handleAnalyze = (customerId) => {
     setAnalyzing(customerId);
-    try {
-      console.log('Analyzing customer:', customerId);
-      const data = await analyzeTransaction(customerId);
-      setAnalysisMessage('Analysis completed and report generated');
-      setTimeout(() => {
-        setAnalysisMessage('');
-      }, 9000);
-      console.log('Analysis result:', data);
-      // Handle the analysis result as needed
-    } finally {
-      setAnalyzing('');
-    }
+    setAnalysisStage('');
+    setAnalysisText('');
+    console.log('Analyzing customer:', customerId);
+    streamTransactionAnalysis(customerId, {
+      onProgress: (stage, data) => {
+        const label = stageLabels[stage];
+        setAnalysisStage(typeof label === 'function' ? label(data) : label);
+      },
+      onToken: (text) => setAnalysisText((previous) => previous + text),
+      onComplete: (data) => {
+        console.log('Analysis result:', data);
+        setAnalyzing('');
+        setAnalysisStage('');
+        setAnalysisMessage('Analysis completed and report generated');
+        setTimeout(() => {
+          setAnalysisMessage('');
+        }, 9000);
+      },
+      onError: (detail) => {
+        setAnalyzing('');
+        setAnalysisStage(`Analysis failed: ${detail}`);
+      },
+    });
   };
 
   const totalPages = Math.ceil(totalRecords / pageSize);
@@ -85,6 +110,14 @@ const TransactionTable = () => {
         </span>
         </div>
     )}
+      {(analysisStage || analysisText) && (
+        <div className="mb-4 border border-gray-200 rounded-lg p-4">
+          {analysisStage && <div className="text-sm text-gray-600 mb-2">{analysisStage}</div>}
+          {analysisText && (
+            <pre className="text-xs text-gray-800 whitespace-pre-wrap max-h-96 overflow-y-auto">{analysisText}</pre>
+          )}
+        </div>
+      )}
       {loading && (
         <div className="w-full h-2 bg-gray-200 rounded overflow-hidden">
           <div className="h-full bg-blue-600 animate-[loading_1s_ease-in-out_infinite]" style={{width: '100%'}}></div>
@@ -29,4 +29,23 @@ export const analyzeTransaction = async (customerId) => {
     console.error('Error analyzing transaction:', error);
     throw error;
   }
-};
\ No newline at end of file
+};
+export const streamTransactionAnalysis = (customerId, { onProgress, onToken, onComplete, onError } = {}) => {
+  const source = new EventSource(`${BASE_URL}/analyze-transaction/${customerId}/stream`);
+  ['fetched', 'scored', 'triaged', 'retrieved', 'analyzed_group'].forEach((stage) => {
+    source.addEventListener(stage, (event) => onProgress?.(stage, JSON.parse(event.data)));
+  });
+  source.addEventListener('token', (event) => onToken?.(JSON.parse(event.data).text));
+  source.addEventListener('complete', (event) => {
+    source.close();
+    onComplete?.(JSON.parse(event.data));
+  });
+  source.addEventListener('error', (event) => {
+    // Server-sent error events carry data; connection errors do not
+    source.close();
+    const detail = event.data ? JSON.parse(event.data).detail : 'Connection to the analysis stream was lost';
+    console.error('Error streaming analysis:', detail);
+    onError?.(detail);
+  });
+  return () => source.close();
+};